@@ -1,6 +1,23 @@
+import warnings
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # precomputed table built with "python manage.py precompute_maneuvers"
+        table_path = getattr(settings, 'MANEUVER_TABLE_PATH', None)
+        if table_path:
+            from . import utils
+            from .table import ManeuverTable
+            try:
+                utils.maneuver_table = ManeuverTable.load(table_path)
+            except ValueError as error: # built by another planner version, the results are computed
+                warnings.warn(str(error), RuntimeWarning)
+
+        # hot path instrumentation, see core/metrics.py
+        from .metrics import install
+        install()
@@ -0,0 +1,419 @@
+import math
+import numpy as np
+from itertools import islice
+from .utils import G, EARTH_MASS, STRATEGY_COUNT, APSIS_ABS_TOL, APSIS_REL_TOL, ANGLE_TOL, Orbit, max_length_earth_pos, valid_orbit
+
+# Vectorized version of utils.process_maneuver_data
+# Every strategy is evaluated for all orbit pairs at once. The arithmetic is done in the same order as in the
+# scalar planner so that both return bit for bit the same burns, totals and chosen strategy
+
+MAX_ORBITS = 4 # start orbit, at most 2 transfer orbits, end orbit
+MAX_BURNS = MAX_ORBITS - 1
+
+ORBIT_DTYPE = np.dtype([
+    ("axis", "f8"),
+    ("ecc", "f8"),
+    ("arg", "f8"),
+    ("start_arg", "f8"),
+    ("end_arg", "f8") # nan for the end orbit
+])
+
+MANEUVER_DTYPE = np.dtype([
+    ("strat_id", "i8"),
+    ("n_orbits", "i8"),
+    ("orbits", ORBIT_DTYPE, (MAX_ORBITS,)), # unused entries are nan
+    ("burns", "i8", (MAX_BURNS,)), # unused entries are 0
+    ("total_delta_v", "i8"),
+    ("total_delta_t", "i8"),
+    ("total_delta_v_list", "i8", (STRATEGY_COUNT,)),
+    ("total_delta_t_list", "i8", (STRATEGY_COUNT,))
+])
+
+PARETO_DTYPE = np.dtype([
+    ("pareto", "?", (STRATEGY_COUNT,)), # strategies of the Pareto front of delta-v and delta-t
+    ("fuel_strat_id", "i8"),
+    ("time_strat_id", "i8"),
+    ("n_orbits", "i8", (STRATEGY_COUNT,)),
+    ("orbits", ORBIT_DTYPE, (STRATEGY_COUNT, MAX_ORBITS)),
+    ("burns", "i8", (STRATEGY_COUNT, MAX_BURNS)),
+    ("total_delta_v_list", "i8", (STRATEGY_COUNT,)),
+    ("total_delta_t_list", "i8", (STRATEGY_COUNT,))
+])
+
+# result of maneuver_costs: the chosen strategy and its totals, without the orbits and the burns
+COST_DTYPE = np.dtype([("total_delta_v", "i8"), ("total_delta_t", "i8"), ("strat_id", "i1")])
+
+TWO_PI = 2 * math.pi
+
+
+def _periapsis(axis, ecc):
+    return axis * (1 - ecc)
+
+def _apoapsis(axis, ecc):
+    return axis * (1 + ecc)
+
+def _normalize_angle(angle):
+    return np.mod(angle, TWO_PI)
+
+def _same_apsis(r1, r2):
+    # same as math.isclose in utils.same_apsis
+    return np.abs(r1 - r2) <= np.maximum(APSIS_REL_TOL * np.maximum(np.abs(r1), np.abs(r2)), APSIS_ABS_TOL)
+
+def _same_angle(angle1, angle2):
+    delta = _normalize_angle(angle1 - angle2)
+    return (delta <= ANGLE_TOL) | (delta >= TWO_PI - ANGLE_TOL)
+
+def _velocity(r, semi_major_axis): # m/s
+    return np.sqrt(G * EARTH_MASS * (2/(r * 1000) - 1/(semi_major_axis * 1000)))
+
+def _nonzero_arg(angle):
+    # you don't want the end arg of an orbit to be 0
+    return np.where(_same_angle(angle, 0), TWO_PI, angle)
+
+
+class _StrategyState:
+    # orbits, burns and current orbit of one strategy for every orbit pair
+
+    def __init__(self, start, size):
+        self.axis = np.full((size, MAX_ORBITS), np.nan)
+        self.ecc = np.full((size, MAX_ORBITS), np.nan)
+        self.arg = np.full((size, MAX_ORBITS), np.nan)
+        self.start_arg = np.full((size, MAX_ORBITS), np.nan)
+        self.end_arg = np.full((size, MAX_ORBITS), np.nan)
+        self.burns = np.zeros((size, MAX_BURNS), dtype=np.int64)
+        self.count = np.ones(size, dtype=np.int64)
+        self.done = np.zeros(size, dtype=bool)
+
+        self.axis[:, 0], self.ecc[:, 0], self.arg[:, 0] = start
+        self.start_arg[:, 0] = 0
+        self.cur_axis, self.cur_ecc, self.cur_arg = (np.array(values, dtype=np.float64) for values in start)
+        self.cur_start_arg = np.zeros(size)
+
+    def push(self, mask, end_arg, axis, ecc, arg, start_arg, burn):
+        # closes the current orbit at end_arg and appends the new orbit for the pairs in mask
+        rows = np.nonzero(mask)[0]
+        if rows.size == 0:
+            return
+        col = self.count[rows]
+        end_arg = end_arg[rows]
+        end_arg = np.where(end_arg < self.cur_start_arg[rows], end_arg + TWO_PI, end_arg)
+
+        self.end_arg[rows, col - 1] = end_arg
+        self.burns[rows, col - 1] = burn[rows]
+        self.axis[rows, col] = axis[rows]
+        self.ecc[rows, col] = ecc[rows]
+        self.arg[rows, col] = arg[rows]
+        self.start_arg[rows, col] = start_arg[rows]
+        self.count[rows] += 1
+
+        self.cur_axis[rows] = axis[rows]
+        self.cur_ecc[rows] = ecc[rows]
+        self.cur_arg[rows] = arg[rows]
+        self.cur_start_arg[rows] = start_arg[rows]
+
+    def finish_if_equal(self, mask, end):
+        # same as utils.is_equal
+        end_axis, end_ecc, end_arg = end
+        cur_peri, cur_apo = _periapsis(self.cur_axis, self.cur_ecc), _apoapsis(self.cur_axis, self.cur_ecc)
+        self.done |= (mask & _same_apsis(cur_peri, _periapsis(end_axis, end_ecc)) & _same_apsis(cur_apo, _apoapsis(end_axis, end_ecc)) &
+                      (_same_apsis(cur_peri, cur_apo) | _same_angle(self.cur_arg, end_arg)))
+
+    def total_delta_v(self):
+        return np.abs(self.burns).sum(axis=1)
+
+    def total_delta_t(self):
+        total_delta_t = np.zeros(self.count.size)
+        for col in range(1, MAX_ORBITS - 1): # time in transfer orbits only
+            angle_in_orbit = self.end_arg[:, col] - self.start_arg[:, col]
+            delta_t = angle_in_orbit * np.sqrt(((self.axis[:, col] * 1000) ** 3)/(G * EARTH_MASS))
+            total_delta_t = total_delta_t + np.where(col < self.count - 1, delta_t, 0)
+        return np.round(total_delta_t).astype(np.int64)
+
+
+def _run_strategy(strat, start, end):
+    end_axis, end_ecc, end_orbit_arg = end
+    size = end_axis.size
+    state = _StrategyState(start, size)
+    end_is_circle = _same_apsis(_periapsis(end_axis, end_ecc), _apoapsis(end_axis, end_ecc))
+
+    # STEP 0
+    if strat in [4, 5, 6, 7]:
+        mask = ~_same_apsis(_periapsis(state.cur_axis, state.cur_ecc), _apoapsis(state.cur_axis, state.cur_ecc)) & ~end_is_circle
+        if strat in [4, 6]:
+            apsis = _periapsis(state.cur_axis, state.cur_ecc)
+            step0_end_arg, arg_offset = TWO_PI, 0
+        else:
+            apsis = _apoapsis(state.cur_axis, state.cur_ecc)
+            step0_end_arg, arg_offset = math.pi, math.pi
+
+        burn = np.round(_velocity(apsis, apsis) - _velocity(apsis, state.cur_axis))
+        state.push(mask, np.full(size, step0_end_arg), apsis, np.zeros(size),
+                   _normalize_angle(state.cur_arg + arg_offset), np.zeros(size), burn)
+        state.finish_if_equal(mask, end)
+
+    # STEP 1
+    # r is the apsis of the current orbit where the burn happens, target is the apsis of end_orbit it reaches
+    # and other is the apsis of the current orbit that is compared to target to know if the step is needed
+    peri = _periapsis(state.cur_axis, state.cur_ecc)
+    apo = _apoapsis(state.cur_axis, state.cur_ecc)
+    end_peri = _periapsis(end_axis, end_ecc)
+    end_apo = _apoapsis(end_axis, end_ecc)
+    reach_apoapsis = strat in [0, 1, 4, 5]
+    burn_at_periapsis = strat in [0, 3, 4, 5]
+
+    r, other = (peri, apo) if burn_at_periapsis else (apo, peri)
+    target = end_apo if reach_apoapsis else end_peri
+    mask = ~state.done & ~_same_apsis(other, target)
+
+    is_circle = _same_apsis(peri, apo)
+    if reach_apoapsis:
+        circle_end_arg = _nonzero_arg(_normalize_angle(end_orbit_arg - state.cur_arg))
+        circle_arg = np.where(peri < end_apo, end_orbit_arg, _normalize_angle(end_orbit_arg + math.pi))
+    else:
+        circle_end_arg = _nonzero_arg(_normalize_angle(end_orbit_arg - state.cur_arg + math.pi))
+        circle_arg = np.where(apo < end_peri, _normalize_angle(end_orbit_arg + math.pi), end_orbit_arg)
+
+    flipped_arg = _normalize_angle(state.cur_arg + math.pi)
+    below = (r <= target) | _same_apsis(r, target)
+    if burn_at_periapsis:
+        ellipse_end_arg = TWO_PI
+        ellipse_arg = np.where(below, state.cur_arg, flipped_arg)
+    else:
+        ellipse_end_arg = math.pi
+        ellipse_arg = np.where(below, flipped_arg, state.cur_arg)
+
+    new_axis = (r + target)/2
+    new_ecc = np.where(below, (target - r)/(target + r), (r - target)/(r + target))
+    new_start_arg = np.where(below, 0, math.pi)
+    burn = np.round(_velocity(r, new_axis) - _velocity(r, state.cur_axis))
+
+    state.push(mask, np.where(is_circle, circle_end_arg, ellipse_end_arg), new_axis, new_ecc,
+               np.where(is_circle, circle_arg, ellipse_arg), new_start_arg, burn)
+    state.finish_if_equal(mask, end)
+
+    # STEP 2: Make the orbit circular if you need to change arg later
+    if strat in [0, 1, 2, 3]:
+        peri = _periapsis(state.cur_axis, state.cur_ecc)
+        apo = _apoapsis(state.cur_axis, state.cur_ecc)
+        if reach_apoapsis:
+            correct_apsis, angle_offset_1, angle_offset_2 = end_apo, math.pi, 0
+        else:
+            correct_apsis, angle_offset_1, angle_offset_2 = end_peri, 0, math.pi
+
+        mask = (~state.done &
+                ~(_same_apsis(peri, correct_apsis) & _same_angle(state.cur_arg + angle_offset_1, end_orbit_arg)) &
+                ~(_same_apsis(apo, correct_apsis) & _same_angle(state.cur_arg + angle_offset_2, end_orbit_arg)) &
+                ~_same_apsis(peri, apo) & ~end_is_circle)
+
+        near_apoapsis = np.abs(apo - correct_apsis) < np.abs(peri - correct_apsis)
+        burn = np.round(_velocity(correct_apsis, correct_apsis) - _velocity(correct_apsis, state.cur_axis))
+        state.push(mask, np.where(near_apoapsis, math.pi, TWO_PI), correct_apsis, np.zeros(size),
+                   np.where(near_apoapsis, _normalize_angle(state.cur_arg + math.pi), state.cur_arg),
+                   np.zeros(size), burn)
+
+    # STEP 3: Reach end_orbit's remaining correct apsis
+    peri = _periapsis(state.cur_axis, state.cur_ecc)
+    apo = _apoapsis(state.cur_axis, state.cur_ecc)
+    if reach_apoapsis:
+        correct_apsis, step3_start_arg = end_apo, math.pi
+    else:
+        correct_apsis, step3_start_arg = end_peri, 0
+
+    near_apoapsis = np.abs(apo - correct_apsis) < np.abs(peri - correct_apsis)
+    circle_end_arg = _nonzero_arg(_normalize_angle(end_orbit_arg - state.cur_arg + step3_start_arg))
+    is_circle = _same_apsis(peri, apo)
+
+    step3_end_arg = np.where(is_circle, circle_end_arg, np.where(near_apoapsis, math.pi, TWO_PI))
+    step3_new_start_arg = np.where(
+        is_circle | ~end_is_circle, step3_start_arg,
+        np.where(near_apoapsis, _normalize_angle(state.cur_arg - end_orbit_arg + math.pi),
+                 _normalize_angle(state.cur_arg - end_orbit_arg)))
+    burn = np.round(_velocity(correct_apsis, end_axis) - _velocity(correct_apsis, state.cur_axis))
+    state.push(~state.done, step3_end_arg, end_axis, end_ecc, end_orbit_arg, step3_new_start_arg, burn)
+
+    return state
+
+
+def _batch_inputs(*inputs):
+    # same conversions as process_maneuver_data, args are integer degrees
+    inputs = np.broadcast_arrays(*inputs)
+
+    def orbit_arrays(axis, ecc, arg):
+        return (np.asarray(axis).astype(np.int64).astype(np.float64).ravel(),
+                np.asarray(ecc, dtype=np.float64).ravel(),
+                np.radians(np.asarray(arg).astype(np.int64)).ravel())
+
+    return inputs[0].shape, orbit_arrays(*inputs[:3]), orbit_arrays(*inputs[3:6]), inputs[6:]
+
+def _run_strategies(start, end):
+    # every strategy for every pair, the work shared by both optimization criteria
+    states = [_run_strategy(strat, start, end) for strat in range(STRATEGY_COUNT)]
+    total_delta_v = np.stack([state.total_delta_v() for state in states], axis=1)
+    total_delta_t = np.stack([state.total_delta_t() for state in states], axis=1)
+    n_orbits = np.stack([state.count for state in states], axis=1)
+    return states, total_delta_v, total_delta_t, n_orbits
+
+def _best_strategy(optimization, total_delta_v, total_delta_t, n_orbits):
+    # first and second criterion for sorting when finding min, then the number of orbits.
+    # lexsort is stable so ties go to the smallest strategy id like min() does
+    first = np.where(optimization[:, None], total_delta_v, total_delta_t)
+    second = np.where(optimization[:, None], total_delta_t, total_delta_v)
+    return np.lexsort((n_orbits, second, first), axis=-1)[:, 0]
+
+def process_maneuver_batch(start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization):
+    shape, start, end, (optimization,) = _batch_inputs(start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization)
+    optimization = np.asarray(optimization).astype(np.int64).ravel() != 0 # 1 is to save fuel, 0 is to save time
+
+    states, total_delta_v, total_delta_t, n_orbits = _run_strategies(start, end)
+    strat_id = _best_strategy(optimization, total_delta_v, total_delta_t, n_orbits)
+
+    size = strat_id.size
+    rows = np.arange(size)
+    result = np.zeros(size, dtype=MANEUVER_DTYPE)
+    result["strat_id"] = strat_id
+    result["n_orbits"] = n_orbits[rows, strat_id]
+    result["total_delta_v"] = total_delta_v[rows, strat_id]
+    result["total_delta_t"] = total_delta_t[rows, strat_id]
+    result["total_delta_v_list"] = total_delta_v
+    result["total_delta_t_list"] = total_delta_t
+
+    for strat, state in enumerate(states):
+        chosen = strat_id == strat
+        result["burns"][chosen] = state.burns[chosen]
+        for field in ORBIT_DTYPE.names:
+            result["orbits"][field][chosen] = getattr(state, field)[chosen]
+
+    return result.reshape(shape)
+
+
+def maneuver_costs(start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization):
+    # same inputs and same choice of strategy as process_maneuver_batch, only returns the strategy and its totals,
+    # e.g. for the cost matrices of core/constellation.py
+    shape, start, end, (optimization,) = _batch_inputs(start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization)
+    optimization = np.asarray(optimization).astype(np.int64).ravel() != 0
+    _, total_delta_v, total_delta_t, n_orbits = _run_strategies(start, end)
+    strat_id = _best_strategy(optimization, total_delta_v, total_delta_t, n_orbits)
+
+    rows = np.arange(strat_id.size)
+    costs = np.empty(strat_id.size, dtype=COST_DTYPE)
+    costs["total_delta_v"] = total_delta_v[rows, strat_id]
+    costs["total_delta_t"] = total_delta_t[rows, strat_id]
+    costs["strat_id"] = strat_id
+    return costs.reshape(shape)
+
+
+def process_pareto_batch(start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg):
+    # vectorized version of utils.process_maneuver_pareto: the strategies are run once for every pair, then the
+    # Pareto front and the best strategy of both optimization criteria are found from the same totals
+    shape, start, end, _ = _batch_inputs(start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg)
+    states, total_delta_v, total_delta_t, n_orbits = _run_strategies(start, end)
+    size = total_delta_v.shape[0]
+    fuel_strat_id = _best_strategy(np.ones(size, dtype=bool), total_delta_v, total_delta_t, n_orbits)
+    time_strat_id = _best_strategy(np.zeros(size, dtype=bool), total_delta_v, total_delta_t, n_orbits)
+
+    # strategy j beats strategy i if it is at least as good on both totals and strictly better on one of them, or if
+    # it has the same totals and comes first in best_strategy's order
+    v_i, v_j = total_delta_v[:, :, None], total_delta_v[:, None, :]
+    t_i, t_j = total_delta_t[:, :, None], total_delta_t[:, None, :]
+    strats = np.arange(STRATEGY_COUNT)
+    first = (n_orbits[:, None, :] < n_orbits[:, :, None]) | ((n_orbits[:, None, :] == n_orbits[:, :, None]) & (strats[None, :] < strats[:, None]))
+    beaten = ((v_j <= v_i) & (t_j <= t_i) & ((v_j < v_i) | (t_j < t_i) | first)).any(axis=2)
+
+    result = np.zeros(size, dtype=PARETO_DTYPE)
+    result["pareto"] = ~beaten
+    result["fuel_strat_id"] = fuel_strat_id
+    result["time_strat_id"] = time_strat_id
+    result["n_orbits"] = n_orbits
+    result["total_delta_v_list"] = total_delta_v
+    result["total_delta_t_list"] = total_delta_t
+    for strat, state in enumerate(states):
+        result["burns"][:, strat] = state.burns
+        for field in ORBIT_DTYPE.names:
+            result["orbits"][field][:, strat] = getattr(state, field)
+    return result.reshape(shape)
+
+
+def _orbits_to_dicts(orbits, n_orbits) -> list:
+    dicts = []
+    for id, orbit in enumerate(orbits[:n_orbits]):
+        orbit_dict = {field: float(orbit[field]) for field in ORBIT_DTYPE.names}
+        if id == n_orbits - 1:
+            del orbit_dict["end_arg"]
+        dicts.append(orbit_dict)
+    return dicts
+
+def maneuver_to_dict(maneuver) -> dict:
+    # converts one element of process_maneuver_batch's result to the output of process_maneuver_data
+    n_orbits = int(maneuver["n_orbits"])
+    orbits = _orbits_to_dicts(maneuver["orbits"], n_orbits)
+
+    max_length, earth_pos = max_length_earth_pos([Orbit.from_dict(orbit) for orbit in orbits]).values()
+    return {"orbits": orbits, "burns": [int(burn) for burn in maneuver["burns"][:n_orbits - 1]],
+            "max_length": max_length, "earth_pos": earth_pos,
+            "total_delta_v_list": [int(v) for v in maneuver["total_delta_v_list"]],
+            "total_delta_t_list": [int(t) for t in maneuver["total_delta_t_list"]],
+            "strat_id": int(maneuver["strat_id"])}
+
+
+def pareto_to_dict(pareto) -> dict:
+    # converts one element of process_pareto_batch's result to the output of process_maneuver_pareto
+    candidates = []
+    for strat in np.nonzero(pareto["pareto"])[0]:
+        n_orbits = int(pareto["n_orbits"][strat])
+        candidates.append({"strat_id": int(strat), "orbits": _orbits_to_dicts(pareto["orbits"][strat], n_orbits),
+                           "burns": [int(burn) for burn in pareto["burns"][strat][:n_orbits - 1]],
+                           "total_delta_v": int(pareto["total_delta_v_list"][strat]),
+                           "total_delta_t": int(pareto["total_delta_t_list"][strat])})
+    candidates.sort(key = lambda candidate: candidate["total_delta_v"])
+
+    orbits = [Orbit.from_dict(orbit) for candidate in candidates for orbit in candidate["orbits"]]
+    max_length, earth_pos = max_length_earth_pos(orbits).values()
+    return {"candidates": candidates, "max_length": max_length, "earth_pos": earth_pos,
+            "total_delta_v_list": [int(v) for v in pareto["total_delta_v_list"]],
+            "total_delta_t_list": [int(t) for t in pareto["total_delta_t_list"]],
+            "fuel_strat_id": int(pareto["fuel_strat_id"]), "time_strat_id": int(pareto["time_strat_id"])}
+
+
+# maneuver requests computed at once by process_maneuver_stream and the batch views
+STREAM_CHUNK_SIZE = 256
+
+def _parse_maneuver(maneuver, pareto=False):
+    # the optimization is not needed for the Pareto front
+    # raises ValueError when an orbit can't be computed, so that it is reported with its index instead of stopping the
+    # whole batch once the response has started
+    start_orbit, end_orbit = maneuver["start_orbit"], maneuver["end_orbit"]
+    inputs = (int(start_orbit["axis"]), float(start_orbit["ecc"]), int(start_orbit["arg"]),
+              int(end_orbit["axis"]), float(end_orbit["ecc"]), int(end_orbit["arg"])) + (() if pareto else (int(maneuver["optimization"]),))
+    if not (valid_orbit(*inputs[0:2]) and valid_orbit(*inputs[3:5])):
+        raise ValueError("invalid orbit")
+    return inputs
+
+def process_maneuver_chunk(chunk: list, pareto=False, index=0) -> list:
+    # results of a list of maneuver requests, the first one is at index in the batch
+    # runs in the process pool of the async batch view (see core/pool.py)
+    process_batch, to_dict = (process_pareto_batch, pareto_to_dict) if pareto else (process_maneuver_batch, maneuver_to_dict)
+    parsed = []
+    for maneuver in chunk:
+        try:
+            parsed.append(_parse_maneuver(maneuver, pareto))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            parsed.append(None)
+
+    valid = [inputs for inputs in parsed if inputs is not None]
+    results = iter(process_batch(*np.array(valid).T)) if valid else iter([])
+    return [{"index": index + id, "error": "invalid maneuver request"} if inputs is None else {"index": index + id, **to_dict(next(results))}
+            for id, inputs in enumerate(parsed)]
+
+def process_maneuver_stream(maneuvers, chunk_size=STREAM_CHUNK_SIZE, pareto=False):
+    # maneuvers is an iterable of {"start_orbit": {...}, "end_orbit": {...}, "optimization": ...} that is consumed
+    # lazily, chunk_size maneuvers at a time, so that very large batches never have to be in memory all at once
+    # yields the output of process_maneuver_data (process_maneuver_pareto if pareto) for every maneuver, in order,
+    # with its index in the batch
+    maneuvers = iter(maneuvers)
+    index = 0
+    while True:
+        chunk = list(islice(maneuvers, chunk_size))
+        if not chunk:
+            return
+        yield from process_maneuver_chunk(chunk, pareto, index)
+        index += len(chunk)
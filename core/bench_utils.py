@@ -0,0 +1,64 @@
+# Micro-benchmark of ellipse_bounding_box: python core/bench_utils.py
+# Compares it with the previous implementation that called numpy on python floats
+
+import math
+import random
+import timeit
+import numpy as np
+import utils
+
+def numpy_ellipse_bounding_box(a, e, theta):
+    b = a * math.sqrt(1 - (e ** 2))
+
+    if (e == 0):
+        return [2 * a, 2 * a]
+    elif (theta % math.pi == 0):
+        return [2 * a, 2 * b]
+    elif (theta % math.pi == math.pi/2):
+        return [2 * b, 2 * a]
+
+    def x(t):
+        return a * np.cos(theta) * np.cos(t) - b * np.sin(theta) * np.sin(t)
+    def y(t):
+        return a * np.sin(theta) * np.cos(t) + b * np.cos(theta) * np.sin(t)
+    def dx_dt_0(k: int):
+        return np.arctan(-b * np.tan(theta)/a) + k * np.pi
+    def dy_dt_0(k: int):
+        return np.arctan((b * np.cos(theta))/(a * np.sin(theta))) + k * np.pi
+
+    x_dx_0 = [x(dx_dt_0(0)), x(dx_dt_0(1))]
+    y_dy_0 = [y(dy_dt_0(0)), y(dy_dt_0(1))]
+    return [abs(x_dx_0[0] - x_dx_0[1]), abs(y_dy_0[0] - y_dy_0[1])]
+
+def time_per_call(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5))/number * 1e6 # µs
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    inputs = []
+    for _ in range(10000):
+        a = rng.randint(6531, 50000)
+        inputs.append((a, round(rng.uniform(0, 1 - 6531/a), 3), math.radians(rng.randint(0, 359))))
+
+    different = 0
+    max_relative_difference = 0
+    for a, e, theta in inputs:
+        for new, old in zip(utils.ellipse_bounding_box(a, e, theta), numpy_ellipse_bounding_box(a, e, theta)):
+            if new != old:
+                different += 1
+                max_relative_difference = max(max_relative_difference, abs(new - old)/old)
+    print(f"bounding boxes different from the numpy implementation: {different}/{2 * len(inputs)}, max relative difference: {max_relative_difference:.1e}")
+
+    a, e, theta = inputs[0]
+    new_time = time_per_call(lambda: utils.ellipse_bounding_box(a, e, theta), 20000)
+    old_time = time_per_call(lambda: numpy_ellipse_bounding_box(a, e, theta), 20000)
+    print(f"ellipse_bounding_box: {new_time:.2f} µs, numpy: {old_time:.2f} µs")
+
+    # a request calls max_length_earth_pos once, with the 2 to 4 orbits of the chosen strategy
+    orbits = [utils.Orbit.from_dict(orbit) for orbit in
+              utils.process_maneuver_data({"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": 9660, "ecc": 0.226, "arg": 137}, 1)["orbits"]]
+    new_time = time_per_call(lambda: utils.max_length_earth_pos(orbits), 20000)
+    utils.ellipse_bounding_box, new_ellipse_bounding_box = numpy_ellipse_bounding_box, utils.ellipse_bounding_box
+    old_time = time_per_call(lambda: utils.max_length_earth_pos(orbits), 20000)
+    utils.ellipse_bounding_box = new_ellipse_bounding_box
+    print(f"max_length_earth_pos ({len(orbits)} orbits): {new_time:.2f} µs, numpy: {old_time:.2f} µs, saving per request: {old_time - new_time:.2f} µs")
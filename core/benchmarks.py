@@ -0,0 +1,145 @@
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+from .utils import ellipse_bounding_box, process_orbit_data, process_maneuver_data
+from .batch import process_maneuver_batch
+from .cache import orbit_cache, maneuver_cache
+
+# Benchmark suite of the maneuver engine and of the form endpoints, run with "python manage.py benchmark"
+# Workloads are generated from a seed so that results of different commits can be compared
+
+MIN_AXIS = 6531
+MAX_AXIS = 50000
+OPTIMIZATIONS = {"time": 0, "fuel": 1}
+
+
+def max_ecc(axis: int) -> float:
+    # same as the form, see maxEcc in main.js
+    return math.floor((1 - MIN_AXIS/axis) * 1000)/1000
+
+def random_orbit(rng, ecc=None):
+    axis = rng.randint(MIN_AXIS, MAX_AXIS)
+    if ecc is None:
+        ecc = round(rng.uniform(0, max_ecc(axis)), 3)
+    elif ecc == "max":
+        ecc = max_ecc(axis)
+    return {"axis": axis, "ecc": ecc, "arg": rng.randint(0, 359)}
+
+def maneuver_workloads(count: int, seed: int) -> dict:
+    # lists of (start_orbit, end_orbit) for each kind of workload
+    rng = random.Random(seed)
+    workloads = {"random": [], "circular": [], "near_max_ecc": [], "equal_orbits": []}
+    for _ in range(count):
+        workloads["random"].append((random_orbit(rng), random_orbit(rng)))
+        workloads["circular"].append((random_orbit(rng, 0), random_orbit(rng, rng.choice([0, None]))))
+        workloads["near_max_ecc"].append((random_orbit(rng, "max"), random_orbit(rng, rng.choice(["max", None]))))
+
+        # same orbit, or same shape with a different arg
+        start_orbit = random_orbit(rng)
+        end_orbit = rng.choice([dict(start_orbit), {**start_orbit, "arg": rng.randint(0, 359)}])
+        workloads["equal_orbits"].append((start_orbit, end_orbit))
+    return workloads
+
+
+def summarize(latencies) -> dict:
+    latencies = np.asarray(latencies)
+    return {"calls": int(latencies.size), "total_s": float(latencies.sum()),
+            "throughput_per_s": float(latencies.size/latencies.sum()),
+            "mean_us": float(latencies.mean() * 1e6), "p50_us": float(np.percentile(latencies, 50) * 1e6),
+            "p99_us": float(np.percentile(latencies, 99) * 1e6)}
+
+def measure(function, inputs, warmup: int = 10) -> dict:
+    for args in inputs[:warmup]:
+        function(*args)
+    latencies = []
+    for args in inputs:
+        start = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def maneuver_form_data(start_orbit, end_orbit, optimization) -> dict:
+    return {"maneuver-axis-1-value": start_orbit["axis"], "maneuver-ecc-1-value": start_orbit["ecc"], "maneuver-arg-1-value": start_orbit["arg"],
+            "maneuver-axis-2-value": end_orbit["axis"], "maneuver-ecc-2-value": end_orbit["ecc"], "maneuver-arg-2-value": end_orbit["arg"],
+            "optimization-toggle": optimization}
+
+def run_benchmarks(count: int = 1000, seed: int = 0, http: bool = True) -> dict:
+    results = {}
+    workloads = maneuver_workloads(count, seed)
+
+    orbits = [start_orbit for maneuvers in workloads.values() for start_orbit, _ in maneuvers]
+    results["ellipse_bounding_box"] = measure(ellipse_bounding_box, [(orbit["axis"], orbit["ecc"], math.radians(orbit["arg"])) for orbit in orbits])
+    results["process_orbit_data"] = measure(process_orbit_data, [(orbit["axis"], orbit["ecc"], orbit["arg"]) for orbit in orbits])
+
+    for name, maneuvers in workloads.items():
+        for mode, optimization in OPTIMIZATIONS.items():
+            results[f"process_maneuver_data/{name}/{mode}"] = measure(
+                lambda start_orbit, end_orbit: process_maneuver_data(start_orbit, end_orbit, optimization), maneuvers)
+
+            arrays = np.array([[start_orbit["axis"], start_orbit["ecc"], start_orbit["arg"], end_orbit["axis"], end_orbit["ecc"], end_orbit["arg"], optimization]
+                               for start_orbit, end_orbit in maneuvers]).T
+            start = time.perf_counter()
+            process_maneuver_batch(*arrays)
+            elapsed = time.perf_counter() - start
+            results[f"process_maneuver_batch/{name}/{mode}"] = {"calls": 1, "maneuvers": len(maneuvers), "total_s": elapsed,
+                                                               "throughput_per_s": len(maneuvers)/elapsed}
+
+    if http:
+        # the result caches are disabled so that every request computes its result
+        cache_sizes = orbit_cache.maxsize, maneuver_cache.maxsize
+        orbit_cache.maxsize = maneuver_cache.maxsize = 0
+        try:
+            client = Client()
+            orbit_url, maneuver_url = reverse("submit_orbit_form"), reverse("submit_maneuver_form")
+            results["http/submit_orbit_form"] = measure(lambda orbit: client.post(orbit_url, {
+                "orbit-axis-value": orbit["axis"], "orbit-ecc-value": orbit["ecc"], "orbit-arg-value": orbit["arg"]}), [(orbit,) for orbit in orbits])
+            for name, maneuvers in workloads.items():
+                for mode, optimization in OPTIMIZATIONS.items():
+                    results[f"http/submit_maneuver_form/{name}/{mode}"] = measure(
+                        lambda data: client.post(maneuver_url, data), [(maneuver_form_data(*maneuver, optimization),) for maneuver in maneuvers])
+        finally:
+            orbit_cache.maxsize, maneuver_cache.maxsize = cache_sizes
+
+    return results
+
+
+# run in a new interpreter: boots Django like a gunicorn worker does and loads the URLconf, which imports the views
+# and the engine, then reports the boot time, the peak resident memory and the heavy modules that were imported
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+boot_s = time.perf_counter() - start
+try:
+    # ru_maxrss is kept across exec, so it can be the one of the benchmark process
+    with open("/proc/self/status") as status:
+        max_rss_kb = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+except OSError:
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"boot_s": boot_s, "max_rss_kb": max_rss_kb, "heavy_modules": [name for name in ("numpy", "scipy") if name in sys.modules]}))
+"""
+
+def startup_benchmark(repeat: int = 10) -> dict:
+    # boot_ms doesn't include the start of the interpreter, process_ms does (until the process exits)
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE, "PYTHONPATH": os.pathsep.join(sys.path)}
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], env=env, capture_output=True, text=True, check=True).stdout
+        runs.append({**json.loads(output), "process_s": time.perf_counter() - start})
+    boot, process = np.array([run["boot_s"] for run in runs]), np.array([run["process_s"] for run in runs])
+    return {"runs": repeat, "throughput_per_s": float(1/np.median(process)),
+            "boot_p50_ms": float(np.median(boot) * 1e3), "process_p50_ms": float(np.median(process) * 1e3),
+            "max_rss_kb": int(np.median([run["max_rss_kb"] for run in runs])), "heavy_modules": runs[0]["heavy_modules"]}
@@ -0,0 +1,205 @@
+import copy
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from . import utils
+from .utils import PLANNER_VERSION, process_orbit_data, process_maneuver_data, table_maneuver_data, process_maneuver_pareto
+from .pool import compute_pool
+from .search import process_maneuver_search
+from .store import result_store
+
+# Results of process_orbit_data and process_maneuver_data only depend on their normalized inputs, so they are cached
+# RESULT_CACHE_SIZE: max number of results kept in memory by each worker, 0 disables the cache (default 1024)
+# RESULT_CACHE_ALIAS: name of a cache in CACHES (e.g. memcached or redis) shared by all of the gunicorn workers,
+#                     checked when a result is not in the worker's memory (default None, not used)
+# The results of process_maneuver_data are then looked up in the database when RESULT_STORE is set (see core/store.py)
+
+class ResultCache:
+    def __init__(self, name: str, maxsize: int = 1024, backend_alias: str = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.backend_alias = backend_alias
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _backend_key(self, key):
+        return f"{self.name}:{PLANNER_VERSION}:" + ":".join(map(repr, key))
+
+    def get_or_compute(self, key: tuple, compute):
+        # always returns a copy so that callers can't modify the cached result
+        if self.maxsize <= 0:
+            return compute()
+
+        result = self._get_local(key)
+        if result is not None:
+            return result
+
+        if self.backend_alias is not None:
+            result = caches[self.backend_alias].get(self._backend_key(key))
+        self._count(result)
+
+        if result is None:
+            result = compute()
+            if self.backend_alias is not None:
+                caches[self.backend_alias].set(self._backend_key(key), result)
+
+        self._store(key, copy.deepcopy(result))
+        return result
+
+    async def aget_or_compute(self, key: tuple, compute):
+        # same as get_or_compute for the async views, compute returns an awaitable
+        if self.maxsize <= 0:
+            return await compute()
+
+        result = self._get_local(key)
+        if result is not None:
+            return result
+
+        if self.backend_alias is not None:
+            result = await caches[self.backend_alias].aget(self._backend_key(key))
+        self._count(result)
+
+        if result is None:
+            result = await compute()
+            if self.backend_alias is not None:
+                await caches[self.backend_alias].aset(self._backend_key(key), result)
+
+        self._store(key, copy.deepcopy(result))
+        return result
+
+    def _get_local(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._entries[key])
+        return None
+
+    def _count(self, backend_result):
+        with self._lock:
+            if backend_result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def _store(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self._entries), "maxsize": self.maxsize}
+
+
+orbit_cache = ResultCache("orbit", getattr(settings, "RESULT_CACHE_SIZE", 1024), getattr(settings, "RESULT_CACHE_ALIAS", None))
+maneuver_cache = ResultCache("maneuver", getattr(settings, "RESULT_CACHE_SIZE", 1024), getattr(settings, "RESULT_CACHE_ALIAS", None))
+
+
+def orbit_key(semi_major_axis, ecc, arg) -> tuple:
+    return (int(semi_major_axis), float(ecc), int(arg))
+
+def maneuver_key(start_orbit: dict, end_orbit: dict, optimization) -> tuple:
+    return (int(start_orbit["axis"]), float(start_orbit["ecc"]), int(start_orbit["arg"]),
+            int(end_orbit["axis"]), float(end_orbit["ecc"]), int(end_orbit["arg"]), int(optimization))
+
+def maneuver_inputs(key: tuple) -> tuple:
+    return {"axis": key[0], "ecc": key[1], "arg": key[2]}, {"axis": key[3], "ecc": key[4], "arg": key[5]}, key[6]
+
+def cached_process_orbit_data(semi_major_axis, ecc, arg) -> dict:
+    key = orbit_key(semi_major_axis, ecc, arg)
+    return orbit_cache.get_or_compute(key, lambda: process_orbit_data(*key))
+
+def stored_maneuver_data(key: tuple) -> dict:
+    # the precomputed table is faster than the database, so its results are never stored
+    processed_data = table_maneuver_data(*maneuver_inputs(key))
+    if processed_data is not None:
+        return processed_data
+    if result_store.enabled:
+        processed_data = result_store.get(key)
+        if processed_data is not None:
+            return processed_data
+    processed_data = process_maneuver_data(*maneuver_inputs(key))
+    if result_store.enabled:
+        result_store.put(key, processed_data)
+    return processed_data
+
+def cached_process_maneuver_data(start_orbit: dict, end_orbit: dict, optimization) -> dict:
+    key = maneuver_key(start_orbit, end_orbit, optimization)
+    return maneuver_cache.get_or_compute(key, lambda: stored_maneuver_data(key))
+
+def cached_process_maneuver_pareto(start_orbit: dict, end_orbit: dict) -> dict:
+    # shares maneuver_cache, the optimization isn't part of the key
+    key = maneuver_key(start_orbit, end_orbit, 0)[:6]
+    return maneuver_cache.get_or_compute(("pareto",) + key, lambda: process_maneuver_pareto(*maneuver_inputs(key + (0,))[:2]))
+
+def search_key(start_orbit: dict, end_orbit: dict, optimization, start_anomaly, target_anomaly, arrival_time) -> tuple:
+    # key of process_maneuver_data followed by the constraints of the search
+    constraints = tuple(None if value in (None, "") else float(value) for value in (start_anomaly, target_anomaly, arrival_time))
+    return maneuver_key(start_orbit, end_orbit, optimization) + constraints
+
+def cached_process_maneuver_search(start_orbit: dict, end_orbit: dict, optimization, start_anomaly=None, target_anomaly=None,
+                                   arrival_time=None) -> dict:
+    # shares maneuver_cache, the keys are longer than the ones of process_maneuver_data
+    key = search_key(start_orbit, end_orbit, optimization, start_anomaly, target_anomaly, arrival_time)
+    return maneuver_cache.get_or_compute(("search",) + key, lambda: process_maneuver_search(*maneuver_inputs(key[:7]), *key[7:]))
+
+async def acached_process_orbit_data(semi_major_axis, ecc, arg) -> dict:
+    # computed in the event loop, it's faster than sending it to the process pool
+    key = orbit_key(semi_major_axis, ecc, arg)
+
+    async def compute():
+        return process_orbit_data(*key)
+
+    return await orbit_cache.aget_or_compute(key, compute)
+
+async def acached_process_maneuver_data(start_orbit: dict, end_orbit: dict, optimization) -> dict:
+    # the maneuvers that are not in the precomputed table are computed by the process pool, raises PoolFull
+    key = maneuver_key(start_orbit, end_orbit, optimization)
+
+    async def compute():
+        processed_data = table_maneuver_data(*maneuver_inputs(key))
+        if processed_data is None and result_store.enabled:
+            processed_data = await result_store.aget(key)
+        if processed_data is None:
+            if utils.instrumentation is not None: # the planner metrics are recorded in this process
+                processed_data = await utils.instrumentation.run_in_pool(compute_pool, *maneuver_inputs(key))
+            else:
+                processed_data = await compute_pool.run(process_maneuver_data, *maneuver_inputs(key))
+            if result_store.enabled:
+                result_store.put(key, processed_data)
+        return processed_data
+
+    return await maneuver_cache.aget_or_compute(key, compute)
+
+async def acached_process_maneuver_pareto(start_orbit: dict, end_orbit: dict) -> dict:
+    # computed by the process pool, raises PoolFull
+    key = maneuver_key(start_orbit, end_orbit, 0)[:6]
+
+    async def compute():
+        return await compute_pool.run(process_maneuver_pareto, *maneuver_inputs(key + (0,))[:2])
+
+    return await maneuver_cache.aget_or_compute(("pareto",) + key, compute)
+
+async def acached_process_maneuver_search(start_orbit: dict, end_orbit: dict, optimization, start_anomaly=None, target_anomaly=None,
+                                          arrival_time=None) -> dict:
+    # computed by the process pool, raises PoolFull
+    key = search_key(start_orbit, end_orbit, optimization, start_anomaly, target_anomaly, arrival_time)
+
+    async def compute():
+        return await compute_pool.run(process_maneuver_search, *maneuver_inputs(key[:7]), *key[7:])
+
+    return await maneuver_cache.aget_or_compute(("search",) + key, compute)
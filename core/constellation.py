@@ -0,0 +1,123 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .batch import COST_DTYPE, maneuver_costs, process_maneuver_batch, maneuver_to_dict
+from .utils import valid_orbit
+
+# Reconfiguration of a constellation: N satellites are moved to N target slots, one satellite per slot
+# The N x N matrix of the costs of every satellite-slot maneuver is computed with the vectorized planner of
+# core/batch.py, by blocks of rows in parallel processes, then the assignment with the lowest total cost is solved
+# exactly. To save fuel the assignment has the lowest total delta-v and then the lowest total delta-t among those,
+# the other way around to save time. Each maneuver is the one process_maneuver_data would plan for its pair
+
+def _orbit_arrays(orbits: list):
+    return [np.array([orbit[field] for orbit in orbits]) for field in ("axis", "ecc", "arg")]
+
+def cost_rows(satellites: list, slots: list, optimization, rows: slice) -> np.ndarray:
+    # costs of the satellites[rows] to every slot, runs in the worker processes
+    start = [values[rows, None] for values in _orbit_arrays(satellites)]
+    end = [values[None, :] for values in _orbit_arrays(slots)]
+    return maneuver_costs(*start, *end, optimization)
+
+def cost_matrix(satellites: list, slots: list, optimization, chunk_size: int = 65536, workers: int = None) -> np.ndarray:
+    # N x N costs computed by blocks of about chunk_size maneuvers, workers is the number of processes
+    # (default os.cpu_count()), with 1 they're computed in this process
+    costs = np.empty((len(satellites), len(slots)), dtype=COST_DTYPE)
+    block_size = max(chunk_size // max(len(slots), 1), 1)
+    blocks = [slice(row, min(row + block_size, len(satellites))) for row in range(0, len(satellites), block_size)]
+    workers = min(workers or os.cpu_count(), len(blocks))
+    if workers <= 1:
+        for rows in blocks:
+            costs[rows] = cost_rows(satellites, slots, optimization, rows)
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            for rows, block in zip(blocks, executor.map(cost_rows, *zip(*((satellites, slots, optimization, rows) for rows in blocks)))):
+                costs[rows] = block
+    return costs
+
+
+def _shortest_augmenting_paths(cost: np.ndarray):
+    # Jonker-Volgenant, with the lazy updates of the potentials of Crouse's version used by
+    # scipy.optimize.linear_sum_assignment: the rows are assigned one at a time along the shortest path to a free
+    # column, each Dijkstra step is vectorized over the columns. Returns the column of each row and the potentials
+    n = cost.shape[0]
+    u = np.zeros(n) # row potentials
+    # column reduction: every column starts assigned to its cheapest row when that row isn't taken yet, the
+    # potentials keep every reduced cost >= 0 and the assigned ones at 0
+    v = cost.min(axis=0) # column potentials
+    row_of = np.full(n, -1) # row assigned to each column, -1 when the column is free
+    column_of = np.full(n, -1) # column assigned to each row
+    cheapest = cost.argmin(axis=0)
+    _, first_columns = np.unique(cheapest, return_index=True)
+    row_of[first_columns] = cheapest[first_columns]
+    column_of[cheapest[first_columns]] = first_columns
+
+    for start_row in np.nonzero(column_of < 0)[0]:
+        distance = np.full(n, np.inf) # length of the shortest path found to each column
+        previous = np.full(n, -1) # row before each column along its shortest path
+        scanned = np.zeros(n, dtype=bool)
+        scanned_rows = []
+        row = start_row
+        min_distance = 0.0
+        while True:
+            scanned_rows.append(row)
+            reduced = min_distance + cost[row] - u[row] - v
+            improved = (reduced < distance) & ~scanned
+            distance[improved] = reduced[improved]
+            previous[improved] = row
+            # the free columns win the ties, the path ends sooner
+            candidates = np.where(scanned, np.inf, distance)
+            min_distance = candidates.min()
+            closest = np.flatnonzero(candidates == min_distance)
+            free = closest[row_of[closest] < 0]
+            column = free[0] if free.size else closest[0]
+            scanned[column] = True
+            if row_of[column] < 0:
+                break
+            row = row_of[column]
+
+        # potentials of the scanned rows and columns, then the columns along the path are shifted to the previous rows
+        scanned_rows = np.array(scanned_rows)
+        u[start_row] += min_distance
+        others = scanned_rows[1:]
+        u[others] += min_distance - distance[column_of[others]]
+        v[scanned] -= min_distance - distance[scanned]
+        while True:
+            row = previous[column]
+            row_of[column] = row
+            column_of[row], column = column, column_of[row]
+            if row == start_row:
+                break
+    return column_of, u, v
+
+def solve_assignment(cost: np.ndarray, tie_cost: np.ndarray = None) -> np.ndarray:
+    # column assigned to each row of the N x N cost matrix with the lowest total cost, tie_cost breaks the ties
+    # between the assignments with the lowest total cost. The costs must be integers under 2^53 so that the sums are exact
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.ndim != 2 or cost.shape[0] != cost.shape[1]:
+        raise ValueError("expected a square cost matrix")
+    column_of, u, v = _shortest_augmenting_paths(cost)
+    if tie_cost is None:
+        return column_of
+    # every assignment with the lowest total cost only uses the pairs with a reduced cost of 0
+    tight = cost - u[:, None] - v[None, :] == 0
+    column_of, _, _ = _shortest_augmenting_paths(np.where(tight, np.asarray(tie_cost, dtype=np.float64), np.inf))
+    return column_of
+
+
+def plan_constellation(satellites: list, slots: list, optimization, workers: int = None) -> dict:
+    # satellites and slots are lists of {"axis", "ecc", "arg"} like the inputs of process_maneuver_data
+    # returns the slot of each satellite, the maneuver of each satellite to its slot and the totals of the assignment
+    if not satellites or len(satellites) != len(slots):
+        raise ValueError("expected as many slots as satellites")
+    if not all(valid_orbit(float(orbit["axis"]), float(orbit["ecc"])) for orbit in satellites + slots):
+        raise ValueError("expected orbits with axis > 0 and 0 <= ecc < 1")
+    optimization = int(optimization) # 1 is to save fuel, 0 is to save time
+    costs = cost_matrix(satellites, slots, optimization, workers=workers)
+    first, second = ("total_delta_v", "total_delta_t") if optimization else ("total_delta_t", "total_delta_v")
+    slot_ids = solve_assignment(costs[first], costs[second])
+
+    satellite_arrays, slot_arrays = _orbit_arrays(satellites), _orbit_arrays(slots)
+    maneuvers = process_maneuver_batch(*satellite_arrays, *(values[slot_ids] for values in slot_arrays), optimization)
+    return {"slots": slot_ids.tolist(), "maneuvers": [maneuver_to_dict(maneuver) for maneuver in maneuvers],
+            "total_delta_v": int(maneuvers["total_delta_v"].sum()), "total_delta_t": int(maneuvers["total_delta_t"].sum())}
@@ -0,0 +1,88 @@
+import math
+import numpy as np
+from .utils import MU
+
+# Time sampled positions and velocities of the satellite along a maneuver, same motion as the canvas simulation:
+# the satellite goes through each orbit from its start_arg to its end_arg (mean anomalies) and then switches to
+# the next orbit. Positions are in km from the center of the earth, velocities in m/s and times in s
+
+
+def mean_motion(axis):
+    # rad/s, axis in km
+    return np.sqrt(MU/((np.asarray(axis, dtype=np.float64) * 1000) ** 3))
+
+def solve_kepler(mean_anomaly, ecc, tol=1e-14, max_iterations=50):
+    # Newton's method with Kepler's equation M = E - e * sin(E) for all of the mean anomalies at once
+    # only the values that haven't converged yet are iterated, and it stops as soon as all of them have converged
+    mean_anomaly, ecc = np.broadcast_arrays(np.asarray(mean_anomaly, dtype=np.float64), np.asarray(ecc, dtype=np.float64))
+    mean_anomaly = np.mod(mean_anomaly, 2 * math.pi)
+    ecc = ecc.ravel()
+    m = mean_anomaly.ravel()
+
+    E = m + ecc * np.sin(m) # initial guess closer than M for eccentric orbits
+    active = np.arange(E.size)
+    iterations = 0
+    while active.size and iterations < max_iterations:
+        E_active, e_active = E[active], ecc[active]
+        delta = (E_active - e_active * np.sin(E_active) - m[active])/(1 - e_active * np.cos(E_active))
+        E[active] = E_active - delta
+        active = active[np.abs(delta) > tol]
+        iterations += 1
+
+    return E.reshape(mean_anomaly.shape), iterations
+
+def true_anomaly(eccentric_anomaly, ecc):
+    theta = 2 * np.arctan2(np.sqrt(1 + ecc) * np.sin(eccentric_anomaly/2), np.sqrt(1 - ecc) * np.cos(eccentric_anomaly/2))
+    return np.mod(theta, 2 * math.pi)
+
+def orbit_state(axis, ecc, arg, mean_anomaly):
+    # position (km) and velocity (m/s) in the plane of the simulation, arg is the argument of periapsis
+    axis, ecc, arg = (np.asarray(value, dtype=np.float64) for value in (axis, ecc, arg))
+    E, _ = solve_kepler(mean_anomaly, ecc)
+    semi_minor_axis = axis * np.sqrt(1 - ecc ** 2)
+
+    # perifocal frame: periapsis on the x axis
+    x = axis * (np.cos(E) - ecc)
+    y = semi_minor_axis * np.sin(E)
+    dE_dt = mean_motion(axis)/(1 - ecc * np.cos(E))
+    vx = -axis * 1000 * np.sin(E) * dE_dt
+    vy = semi_minor_axis * 1000 * np.cos(E) * dE_dt
+
+    cos_arg, sin_arg = np.cos(arg), np.sin(arg)
+    position = np.stack([x * cos_arg - y * sin_arg, x * sin_arg + y * cos_arg], axis=-1)
+    velocity = np.stack([vx * cos_arg - vy * sin_arg, vx * sin_arg + vy * cos_arg], axis=-1)
+    return position, velocity, E
+
+
+def maneuver_ephemeris(orbits: list, step: float = 60, times=None, end_orbit_duration: float = None, max_samples: int = None) -> dict:
+    # orbits is the list returned by process_maneuver_data
+    # samples every step seconds, or at times if given, from the start of the maneuver until end_orbit_duration
+    # seconds (one period by default) after the arrival in the end orbit
+    # with max_samples the step is increased so that there are at most max_samples samples
+    axis = np.array([orbit["axis"] for orbit in orbits], dtype=np.float64)
+    ecc = np.array([orbit["ecc"] for orbit in orbits], dtype=np.float64)
+    arg = np.array([orbit["arg"] for orbit in orbits], dtype=np.float64)
+    start_arg = np.array([orbit.get("start_arg", 0) for orbit in orbits], dtype=np.float64)
+    n = mean_motion(axis)
+
+    if end_orbit_duration is None:
+        end_orbit_duration = 2 * math.pi/n[-1]
+    durations = np.append([(orbit["end_arg"] - orbit["start_arg"]) for orbit in orbits[:-1]], 0)/n
+    durations[-1] = end_orbit_duration
+    burn_times = np.cumsum(durations)[:-1]
+    segment_start_times = np.append(0, burn_times)
+
+    if times is None:
+        span = segment_start_times[-1] + end_orbit_duration
+        if max_samples is not None and span/step + 1 > max_samples:
+            step = span/max(max_samples - 1, 1)
+        times = np.arange(0, span + step/2, step)
+    times = np.asarray(times, dtype=np.float64)
+
+    # the burn happens at the end of an orbit, so a sample at a burn time is already in the next orbit
+    orbit_id = np.searchsorted(burn_times, times, side="right")
+    mean_anomaly = start_arg[orbit_id] + n[orbit_id] * (times - segment_start_times[orbit_id])
+    position, velocity, E = orbit_state(axis[orbit_id], ecc[orbit_id], arg[orbit_id], mean_anomaly)
+
+    return {"t": times, "orbit_id": orbit_id, "position": position, "velocity": velocity,
+            "true_anomaly": true_anomaly(E, ecc[orbit_id]), "burn_times": burn_times}
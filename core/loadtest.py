@@ -0,0 +1,264 @@
+import http.client
+import math
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+from .benchmarks import random_orbit, maneuver_form_data
+from .metrics import Histogram
+from .views import canonical_number
+
+# Load tests of a running instance, run with "python manage.py loadtest"
+# A seeded mix of orbit and maneuver requests is replayed by concurrent clients over keep-alive connections, either
+# against a URL (e.g. the docker-compose stack through nginx on port 8080) or against local servers started for each
+# configuration, so that the worker counts, the worker classes and the sync (WSGI) and async (ASGI) paths can be
+# compared on the same machine. Only the standard library is used on the client side
+
+LATENCY_BUCKETS = (1e-3, 2.5e-3, 5e-3, 10e-3, 25e-3, 50e-3, 100e-3, 250e-3, 500e-3, 1, 2.5, 5, 10) # s
+
+# requests of the frontend: the GET endpoints, and the form endpoints of older clients
+REQUEST_KINDS = ["orbit-data", "maneuver-data", "submit-orbit-form", "submit-maneuver-form"]
+DEFAULT_MIX = {"orbit-data": 0.2, "maneuver-data": 0.6, "submit-orbit-form": 0.05, "submit-maneuver-form": 0.15}
+
+# SERVER: KIND:WORKERS[:THREADS], KIND is one of
+# sync: gunicorn sync workers, WSGI and sync views, one request at a time per worker
+# gthread: gunicorn threaded workers, WSGI and sync views, THREADS requests at a time per worker (default 4)
+# uvicorn: uvicorn workers, ASGI and async views (the form and GET views of every request kind), the maneuvers are
+#          computed by the process pool of each worker
+SERVER_KINDS = ["sync", "gthread", "uvicorn"]
+
+
+def default_servers() -> list:
+    # gunicorn's recommended 2 x CPUs + 1 sync workers, as many threaded workers as CPUs, and the ASGI server of
+    # entrypoint.sh with one worker (its process pool uses every CPU) and with one worker per CPU
+    cpus = os.cpu_count()
+    return [f"sync:{2 * cpus + 1}", f"gthread:{cpus}:4", "uvicorn:1", f"uvicorn:{cpus}"]
+
+
+def canonical_query(values: dict) -> str:
+    # the GET endpoints redirect the other spellings of the numbers (e.g. 0.0) to this one
+    return urlencode({name: canonical_number(value) for name, value in values.items()})
+
+def request_mix(count: int, seed: int = 0, mix: dict = None, repeat: float = 0.5, popular: int = 100) -> list:
+    # list of (kind, method, path, body), repeat is the share of requests for one of the popular inputs (the demo
+    # orbits that everyone submits), which are answered from the result caches after the first time
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    popular_inputs = [(random_orbit(rng), random_orbit(rng), rng.randint(0, 1)) for _ in range(popular)]
+    requests = []
+    for kind in rng.choices(list(mix), weights=list(mix.values()), k=count):
+        if rng.random() < repeat:
+            start_orbit, end_orbit, optimization = rng.choice(popular_inputs)
+        else:
+            start_orbit, end_orbit, optimization = random_orbit(rng), random_orbit(rng), rng.randint(0, 1)
+        if kind == "orbit-data":
+            requests.append((kind, "GET", "/orbit-data/?" + canonical_query(start_orbit), None))
+        elif kind == "maneuver-data":
+            query = {**{"start_" + key: value for key, value in start_orbit.items()},
+                     **{"end_" + key: value for key, value in end_orbit.items()}, "optimization": optimization}
+            requests.append((kind, "GET", "/maneuver-data/?" + canonical_query(query), None))
+        elif kind == "submit-orbit-form":
+            body = {"orbit-axis-value": start_orbit["axis"], "orbit-ecc-value": start_orbit["ecc"], "orbit-arg-value": start_orbit["arg"]}
+            requests.append((kind, "POST", "/submit-orbit-form/", urlencode(body)))
+        else:
+            requests.append((kind, "POST", "/submit-maneuver-form/", urlencode(maneuver_form_data(start_orbit, end_orbit, optimization))))
+    return requests
+
+
+def latency_summary(latencies: list) -> dict:
+    latencies = sorted(latencies)
+    if len(latencies) > 1:
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    else:
+        percentiles = [latencies[0] if latencies else math.nan] * 99
+    return {"p50_ms": percentiles[49] * 1e3, "p90_ms": percentiles[89] * 1e3, "p99_ms": percentiles[98] * 1e3}
+
+
+class LoadResult:
+    def __init__(self):
+        self.histograms = {kind: Histogram(LATENCY_BUCKETS) for kind in REQUEST_KINDS}
+        self.latencies = {kind: [] for kind in REQUEST_KINDS}
+        self.statuses = {}
+        self.errors = {kind: 0 for kind in REQUEST_KINDS}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, latency: float, status):
+        # status is None when the request failed without a response (connection refused or reset, timeout...)
+        with self._lock:
+            self.histograms[kind].observe(latency)
+            self.latencies[kind].append(latency)
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            if status is None or status >= 400:
+                self.errors[kind] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        # totals of the run, and the same for each kind of request since they don't hit the same views
+        latencies = [latency for kind_latencies in self.latencies.values() for latency in kind_latencies]
+        kinds = {kind: {"requests": len(self.latencies[kind]), "error_rate": self.errors[kind]/len(self.latencies[kind]),
+                        **latency_summary(self.latencies[kind])} for kind in REQUEST_KINDS if self.latencies[kind]}
+        return {"requests": len(latencies), "elapsed_s": elapsed, "throughput_per_s": len(latencies)/elapsed,
+                "error_rate": sum(self.errors.values())/max(len(latencies), 1), "statuses": self.statuses,
+                **latency_summary(latencies), "kinds": kinds,
+                "histograms": {kind: {"buckets": list(LATENCY_BUCKETS), "counts": histogram.counts, "sum_s": histogram.sum}
+                               for kind, histogram in self.histograms.items() if histogram.sum}}
+
+
+def run_load(url: str, requests: list, concurrency: int, timeout: float = 30) -> dict:
+    # closed loop: each client sends its next request as soon as it has the response of the previous one
+    split = urlsplit(url)
+    pending = iter(requests)
+    pending_lock = threading.Lock()
+    result = LoadResult()
+
+    def client():
+        connection = http.client.HTTPConnection(split.hostname, split.port or 80, timeout=timeout)
+        while True:
+            with pending_lock:
+                request = next(pending, None)
+            if request is None:
+                break
+            kind, method, path, body = request
+            headers = {"Content-Type": "application/x-www-form-urlencoded"} if body is not None else {}
+            start = time.perf_counter()
+            try:
+                connection.request(method, split.path.rstrip("/") + path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close() # reconnects for the next request
+                status = None
+            result.record(kind, time.perf_counter() - start, status)
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return result.summary(time.perf_counter() - start)
+
+
+def parse_server(spec: str) -> dict:
+    # KIND:WORKERS[:THREADS], raises ValueError
+    kind, workers, *threads = spec.split(":")
+    if kind not in SERVER_KINDS or len(threads) > (kind == "gthread"):
+        raise ValueError(f"invalid server {spec}, expected one of {', '.join(SERVER_KINDS)} followed by :WORKERS, and :THREADS for gthread")
+    return {"name": spec, "kind": kind, "workers": int(workers), "threads": int(threads[0]) if threads else 4}
+
+def server_command(server: dict, port: int) -> list:
+    bind = f"127.0.0.1:{port}"
+    if server["kind"] == "uvicorn":
+        # same as entrypoint.sh, with one process pool per worker
+        return [sys.executable, "-m", "uvicorn", "orbital_maneuver_simulator.asgi:application", "--host", "127.0.0.1",
+                "--port", str(port), "--workers", str(server["workers"]), "--log-level", "warning"]
+    command = [sys.executable, "-m", "gunicorn", "orbital_maneuver_simulator.wsgi:application", "--bind", bind,
+               "--workers", str(server["workers"]), "--worker-class", server["kind"], "--log-level", "warning"]
+    if server["kind"] == "gthread":
+        command += ["--threads", str(server["threads"])]
+    return command
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, process, timeout: float = 60):
+    split = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"the server exited with code {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection(split.hostname, split.port, timeout=5)
+            connection.request("GET", "/orbit-data/?axis=10000&ecc=0&arg=0")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"the server didn't answer within {timeout} s")
+
+class LocalServer:
+    # starts a server of the configuration on a free port of 127.0.0.1, stops it when leaving the with block
+    def __init__(self, server: dict):
+        self.server = server
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = None
+
+    def __enter__(self):
+        # DJANGO_SETTINGS_MODULE is inherited, manage.py and --settings set it
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        # in its own process group, so that its workers and their process pools are stopped with it
+        self.process = subprocess.Popen(server_command(self.server, self.port), env=env, stdout=subprocess.DEVNULL, start_new_session=True)
+        try:
+            wait_until_ready(self.url, self.process)
+        except RuntimeError:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        os.killpg(self.process.pid, signal.SIGTERM)
+        try:
+            self.process.wait(30)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL) # workers left behind by the server
+        except ProcessLookupError:
+            pass
+
+
+def run_load_tests(targets: list, concurrencies: list, requests: list, warmup: int = 50) -> list:
+    # targets are (name, url) pairs or server configurations, which are started one after the other
+    # the first warmup requests aren't measured, then each concurrency gets its own slice of the other requests, the
+    # same slice for every target so that all of them get the same share of requests already in their caches
+    results = []
+    for target in targets:
+        if isinstance(target, dict):
+            with LocalServer(target) as server:
+                results += _run_target(target["name"], server.url, concurrencies, requests, warmup)
+        else:
+            results += _run_target(*target, concurrencies, requests, warmup)
+    return results
+
+def _run_target(name, url, concurrencies, requests, warmup):
+    if warmup:
+        run_load(url, requests[:warmup], max(concurrencies))
+    size = (len(requests) - warmup)//len(concurrencies)
+    return [{"target": name, "concurrency": concurrency, **run_load(url, requests[warmup + i * size:warmup + (i + 1) * size], concurrency)}
+            for i, concurrency in enumerate(concurrencies)]
+
+
+def tuning_report(results: list, slo_ms: float = 200, max_error_rate: float = 0.01) -> str:
+    # markdown tables of the runs and of their request kinds, and the configuration with the highest throughput that
+    # keeps its p99 latency under slo_ms and its error rate under max_error_rate
+    lines = ["| target | concurrency | requests/s | p50 ms | p90 ms | p99 ms | errors |", "|---|---:|---:|---:|---:|---:|---:|"]
+    for run in results:
+        lines.append(f"| {run['target']} | {run['concurrency']} | {run['throughput_per_s']:.0f} | {run['p50_ms']:.1f} | "
+                     f"{run['p90_ms']:.1f} | {run['p99_ms']:.1f} | {run['error_rate']:.2%} |")
+    lines += ["", "| target | concurrency | request | requests | p50 ms | p99 ms | errors |", "|---|---:|---|---:|---:|---:|---:|"]
+    for run in results:
+        for kind, summary in run["kinds"].items():
+            lines.append(f"| {run['target']} | {run['concurrency']} | {kind} | {summary['requests']} | {summary['p50_ms']:.1f} | "
+                         f"{summary['p99_ms']:.1f} | {summary['error_rate']:.2%} |")
+
+    within = [run for run in results if run["p99_ms"] <= slo_ms and run["error_rate"] <= max_error_rate]
+    lines.append("")
+    if within:
+        best = max(within, key=lambda run: run["throughput_per_s"])
+        lines.append(f"Best: {best['target']} at concurrency {best['concurrency']}, {best['throughput_per_s']:.0f} requests/s "
+                     f"with a p99 of {best['p99_ms']:.1f} ms (SLO: p99 <= {slo_ms:g} ms, errors <= {max_error_rate:.0%})")
+    else:
+        lines.append(f"No run kept its p99 under {slo_ms:g} ms with errors under {max_error_rate:.0%}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,65 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_test_environment
+from core.benchmarks import run_benchmarks, startup_benchmark
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the maneuver engine and the form endpoints on seeded workloads and writes the results as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1000, help="maneuvers per workload")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="JSON file where the results are written")
+        parser.add_argument("--compare", help="JSON file of a previous run to compare the results with")
+        parser.add_argument("--no-http", action="store_true", help="skip the benchmarks of the endpoints")
+        parser.add_argument("--startup", type=int, default=0, metavar="RUNS", help="also measures the boot time and memory of RUNS new workers")
+
+    def handle(self, *args, **options):
+        setup_test_environment() # lets the test client send requests to "testserver"
+        report = {
+            "commit": current_commit(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "count": options["count"],
+            "seed": options["seed"],
+            "results": run_benchmarks(options["count"], options["seed"], not options["no_http"])
+        }
+
+        if options["startup"]:
+            report["results"]["startup"] = startup_benchmark(options["startup"])
+
+        previous = None
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                previous = json.load(file)["results"]
+
+        self.stdout.write(f"{'benchmark':<50}{'throughput/s':>14}{'p50 µs':>10}{'p99 µs':>10}")
+        for name, result in report["results"].items():
+            line = f"{name:<50}{result['throughput_per_s']:>14.0f}{result.get('p50_us', float('nan')):>10.1f}{result.get('p99_us', float('nan')):>10.1f}"
+            if previous is not None and name in previous:
+                line += f"  throughput x{result['throughput_per_s']/previous[name]['throughput_per_s']:.2f}"
+            self.stdout.write(line)
+
+        startup = report["results"].get("startup")
+        if startup is not None:
+            line = (f"worker startup: boot {startup['boot_p50_ms']:.0f} ms, process {startup['process_p50_ms']:.0f} ms, "
+                    f"max RSS {startup['max_rss_kb']/1024:.1f} MiB, heavy modules: {', '.join(startup['heavy_modules']) or 'none'}")
+            if previous is not None and "startup" in previous:
+                line += f"  (previous: boot {previous['startup']['boot_p50_ms']:.0f} ms, max RSS {previous['startup']['max_rss_kb']/1024:.1f} MiB)"
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,59 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from core.loadtest import DEFAULT_MIX, REQUEST_KINDS, default_servers, request_mix, parse_server, run_load_tests, tuning_report
+
+
+def parse_mix(value: str) -> dict:
+    # e.g. maneuver-data=0.8,orbit-data=0.2
+    mix = {}
+    for item in value.split(","):
+        kind, _, weight = item.partition("=")
+        if kind not in REQUEST_KINDS:
+            raise CommandError(f"unknown request kind {kind}, expected one of {', '.join(REQUEST_KINDS)}")
+        mix[kind] = float(weight)
+    return mix
+
+
+class Command(BaseCommand):
+    help = ("Replays a seeded mix of orbit and maneuver requests against local servers (one per --server) or running "
+            "instances (--url) at each concurrency, and reports the throughput, the latencies and the error rates")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", nargs="+", default=[], metavar="KIND:WORKERS[:THREADS]",
+                            help="servers started on 127.0.0.1, KIND is sync, gthread (gunicorn, WSGI) or uvicorn (ASGI), "
+                                 "e.g. sync:4 gthread:2:8 uvicorn:2 (default without --url: " + " ".join(default_servers()) + ")")
+        parser.add_argument("--url", nargs="+", default=[], help="running instances, e.g. http://localhost:8080 for the docker-compose stack")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="number of concurrent clients (default %(default)s)")
+        parser.add_argument("--requests", type=int, default=2000, help="requests per target and concurrency (default %(default)s)")
+        parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="weights of the request kinds, e.g. maneuver-data=0.8,orbit-data=0.2")
+        parser.add_argument("--repeat", type=float, default=0.5, help="share of requests for one of the 100 popular inputs (default %(default)s)")
+        parser.add_argument("--warmup", type=int, default=50, help="requests sent to each target before measuring (default %(default)s)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--slo-ms", type=float, default=200, help="p99 latency target of the recommendation (default %(default)s)")
+        parser.add_argument("--output", help="JSON file where the results and the latency histograms are written")
+        parser.add_argument("--report", help="markdown file where the report is written")
+
+    def handle(self, *args, **options):
+        servers = options["server"] or ([] if options["url"] else default_servers())
+        try:
+            targets = [parse_server(spec) for spec in servers]
+        except ValueError as error:
+            raise CommandError(error)
+        targets += [(url, url) for url in options["url"]]
+
+        count = options["warmup"] + options["requests"] * len(options["concurrency"])
+        requests = request_mix(count, options["seed"], options["mix"], options["repeat"])
+        try:
+            results = run_load_tests(targets, options["concurrency"], requests, options["warmup"])
+        except RuntimeError as error:
+            raise CommandError(error)
+        report = tuning_report(results, options["slo_ms"])
+        self.stdout.write(report)
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump({"options": {name: options[name] for name in ("concurrency", "requests", "mix", "repeat", "seed")},
+                           "results": results}, file, indent=2)
+        if options["report"]:
+            with open(options["report"], "w") as file:
+                file.write(report)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.table import build_table
+
+
+def grid_dimension(values, scale=1):
+    # [first, last, step] -> [first value, number of values, step] of the grid, scaled to integers
+    first, last, step = (round(float(value) * scale) for value in values)
+    if step <= 0 or last < first:
+        raise CommandError("invalid range: " + " ".join(values))
+    return [first, (last - first) // step + 1, step]
+
+
+class Command(BaseCommand):
+    help = "Precomputes the maneuvers over a grid of the form's inputs into a table that is served when MANEUVER_TABLE_PATH is set"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="directory where the table is written")
+        for orbit in ["start", "end"]:
+            parser.add_argument(f"--{orbit}-axis", nargs=3, default=["6531", "46531", "5000"], metavar=("FIRST", "LAST", "STEP"), help="semi major axis in km")
+            parser.add_argument(f"--{orbit}-ecc", nargs=3, default=["0", "0.5", "0.1"], metavar=("FIRST", "LAST", "STEP"), help="eccentricity, at most 3 decimals")
+            parser.add_argument(f"--{orbit}-arg", nargs=3, default=["0", "270", "90"], metavar=("FIRST", "LAST", "STEP"), help="argument of periapsis in degrees")
+
+    def handle(self, *args, **options):
+        grid = {}
+        for orbit in ["start", "end"]:
+            grid[f"{orbit}_axis"] = grid_dimension(options[f"{orbit}_axis"])
+            grid[f"{orbit}_ecc"] = grid_dimension(options[f"{orbit}_ecc"], 1000)
+            grid[f"{orbit}_arg"] = grid_dimension(options[f"{orbit}_arg"])
+
+        def progress(done, total):
+            self.stdout.write(f"\r{done}/{total} maneuvers", ending="")
+
+        build_table(options["path"], grid, progress=progress)
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(f"Table written to {options['path']}"))
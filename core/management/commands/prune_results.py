@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.store import prune_results
+
+
+class Command(BaseCommand):
+    help = "Deletes the oldest maneuver results of the result store so that it holds at most --max-rows of them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-rows", type=int, default=getattr(settings, "RESULT_STORE_MAX_ROWS", 1000000),
+                            help="number of results kept (default RESULT_STORE_MAX_ROWS or %(default)s)")
+
+    def handle(self, *args, **options):
+        deleted = prune_results(max(options["max_rows"], 0))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} results"))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.sweep import run_sweep, export_npz
+from .precompute_maneuvers import grid_dimension
+
+FORM_DEFAULTS = {"start_axis": "15168", "start_ecc": "0.569", "start_arg": "39", "end_axis": "9660", "end_ecc": "0.226", "end_arg": "137"}
+
+
+class Command(BaseCommand):
+    help = "Sweeps the maneuvers over ranges of the inputs in parallel, resumes the sweep if the directory already holds it"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="directory where the sweep is written")
+        for dimension, default in FORM_DEFAULTS.items():
+            parser.add_argument("--" + dimension.replace("_", "-"), nargs="+", default=[default], metavar="VALUE",
+                                help="FIRST LAST STEP to sweep it or a single fixed value (default %(default)s)")
+        parser.add_argument("--optimization", type=int, choices=[0, 1], default=1, help="1 to save fuel, 0 to save time")
+        parser.add_argument("--chunk-size", type=int, default=65536, help="number of maneuvers computed by a worker at once")
+        parser.add_argument("--workers", type=int, default=None, help="number of processes (default: the number of CPUs)")
+        parser.add_argument("--npz", default=None, help="also writes the swept values and the results to this .npz file")
+
+    def handle(self, *args, **options):
+        grid = {}
+        for dimension in FORM_DEFAULTS:
+            values = options[dimension]
+            scale = 1000 if dimension.endswith("ecc") else 1
+            if len(values) == 1:
+                grid[dimension] = [round(float(values[0]) * scale), 1, 1]
+            elif len(values) == 3:
+                grid[dimension] = grid_dimension(values, scale)
+            else:
+                raise CommandError(f"--{dimension.replace('_', '-')} takes FIRST LAST STEP or a single value")
+
+        def progress(done, total):
+            self.stdout.write(f"\r{done}/{total} chunks", ending="")
+
+        try:
+            run_sweep(options["path"], grid, options["optimization"], options["chunk_size"], options["workers"], progress)
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write("")
+        if options["npz"]:
+            export_npz(options["path"], options["npz"])
+        self.stdout.write(self.style.SUCCESS(f"Sweep written to {options['path']}"))
@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from . import utils
+from .utils import STRATEGY_COUNT, plan_strategy, best_strategy, max_length_earth_pos
+from .cache import orbit_cache, maneuver_cache
+from .pool import compute_pool
+from .store import result_store
+
+# Optional instrumentation of process_maneuver_data, installed as utils.instrumentation when the app starts
+# PLANNER_METRICS: records the time spent in each phase and in each strategy of the planner, exposed by /metrics/ in
+#                  the Prometheus text format (default False). Every gunicorn worker has its own metrics
+# PLANNER_TIMING: adds a Server-Timing header with the timings of the request to every maneuver response (default False)
+#                 when only PLANNER_METRICS is set, the requests with an X-Planner-Timing header get it
+# When both are unset process_maneuver_data only checks that utils.instrumentation is None
+# Under ASGI the maneuvers are computed in the processes of the compute pool (see core/pool.py), which send the timings
+# of the planner back with the results, so that they're recorded by the metrics of the process serving /metrics/
+
+PHASES = ["strategies", "selection", "max_length_earth_pos"]
+BUCKETS = (25e-6, 50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2.5e-3, 5e-3, 10e-3, 25e-3, 50e-3, 100e-3) # s
+
+# timings of the current request, None if the request didn't ask for them
+request_timings = ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str) -> list:
+        lines = []
+        count = 0
+        for le, bucket_count in zip(list(map(repr, self.buckets)) + ["+Inf"], self.counts):
+            count += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum!r}")
+        lines.append(f"{name}_count{{{labels}}} {count}")
+        return lines
+
+
+class PlannerMetrics:
+    def __init__(self):
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self.strategies = [Histogram() for _ in range(STRATEGY_COUNT)]
+        self.selected = [0] * STRATEGY_COUNT
+        self._lock = threading.Lock()
+
+    def plan(self, start_orbit, end_orbit, optimization):
+        # same steps as process_maneuver_data, with a clock reading after each strategy and each phase
+        clock = time.perf_counter
+        maneuvers = []
+        times = [clock()]
+        for strat in range(STRATEGY_COUNT):
+            maneuvers.append(plan_strategy(strat, start_orbit, end_orbit))
+            times.append(clock())
+        strat_id = best_strategy(maneuvers, optimization)
+        selected = clock()
+        max_length, earth_pos = max_length_earth_pos(maneuvers[strat_id].orbits).values()
+        end = clock()
+
+        strategy_times = [times[strat + 1] - times[strat] for strat in range(STRATEGY_COUNT)]
+        timings = {"strategies": times[-1] - times[0], "selection": selected - times[-1], "max_length_earth_pos": end - selected}
+        timings.update((f"strategy-{strat}", seconds) for strat, seconds in enumerate(strategy_times))
+        self.record(timings, strat_id)
+        return maneuvers, strat_id, max_length, earth_pos
+
+    def record(self, timings: dict, strat_id: int):
+        # timings of one call of the planner, with the phases and the strategy-N durations in seconds
+        with self._lock:
+            for phase, histogram in self.phases.items():
+                histogram.observe(timings[phase])
+            for strat, histogram in enumerate(self.strategies):
+                histogram.observe(timings[f"strategy-{strat}"])
+            self.selected[strat_id] += 1
+
+        request = request_timings.get()
+        if request is not None:
+            request.update(timings)
+
+    async def run_in_pool(self, pool, start_orbit, end_orbit, optimization) -> dict:
+        # computes the maneuver in the process pool and records the timings of the planner here, raises PoolFull
+        processed_data, timings = await pool.run(timed_process_maneuver_data, start_orbit, end_orbit, optimization)
+        self.record(timings, processed_data["strat_id"])
+        return processed_data
+
+    def samples(self) -> list:
+        with self._lock:
+            lines = ["# HELP planner_phase_seconds Time spent in each phase of process_maneuver_data",
+                     "# TYPE planner_phase_seconds histogram"]
+            for phase, histogram in self.phases.items():
+                lines += histogram.samples("planner_phase_seconds", f'phase="{phase}"')
+            lines += ["# HELP planner_strategy_seconds Time spent planning each strategy",
+                      "# TYPE planner_strategy_seconds histogram"]
+            for strat, histogram in enumerate(self.strategies):
+                lines += histogram.samples("planner_strategy_seconds", f'strategy="{strat}"')
+            lines += ["# HELP planner_strategy_selected_total Number of times each strategy was the best one",
+                      "# TYPE planner_strategy_selected_total counter"]
+            lines += [f'planner_strategy_selected_total{{strategy="{strat}"}} {count}' for strat, count in enumerate(self.selected)]
+        return lines
+
+
+def timed_process_maneuver_data(start_orbit, end_orbit, optimization):
+    # runs in a process of the compute pool, returns the result of process_maneuver_data and the timings of its planner
+    if utils.instrumentation is None: # the processes may not have inherited the instrumentation of the app
+        utils.instrumentation = PlannerMetrics()
+    timings = {}
+    token = request_timings.set(timings)
+    try:
+        processed_data = utils.process_maneuver_data(start_orbit, end_orbit, optimization)
+    finally:
+        request_timings.reset(token)
+    return processed_data, timings
+
+
+def cache_samples() -> list:
+    info = {cache.name: cache.info() for cache in (orbit_cache, maneuver_cache)}
+    lines = []
+    for counter in ["hits", "misses", "evictions"]:
+        lines += [f"# HELP result_cache_{counter}_total Result cache {counter}", f"# TYPE result_cache_{counter}_total counter"]
+        lines += [f'result_cache_{counter}_total{{cache="{name}"}} {cache_info[counter]}' for name, cache_info in info.items()]
+    lines += ["# HELP result_cache_size Number of results in the result cache", "# TYPE result_cache_size gauge"]
+    lines += [f'result_cache_size{{cache="{name}"}} {cache_info["size"]}' for name, cache_info in info.items()]
+    return lines
+
+def pool_samples() -> list:
+    info = compute_pool.info()
+    return ["# HELP compute_pool_pending Computations running or waiting in the process pool", "# TYPE compute_pool_pending gauge",
+            f"compute_pool_pending {info['pending']}",
+            "# HELP compute_pool_rejected_total Requests answered with 503 because the process pool was full",
+            "# TYPE compute_pool_rejected_total counter", f"compute_pool_rejected_total {info['rejected']}"]
+
+def store_samples() -> list:
+    info = result_store.info()
+    lines = ["# HELP result_store_pending Results waiting to be written to the result store", "# TYPE result_store_pending gauge",
+             f"result_store_pending {info['pending']}"]
+    for counter in ["written", "dropped", "failed"]:
+        lines += [f"# HELP result_store_{counter}_total Results {counter} by the result store", f"# TYPE result_store_{counter}_total counter",
+                  f"result_store_{counter}_total {info[counter]}"]
+    return lines
+
+def render_metrics() -> str:
+    lines = cache_samples()
+    if compute_pool.started:
+        lines += pool_samples()
+    if result_store.enabled:
+        lines += store_samples()
+    if utils.instrumentation is not None:
+        lines += utils.instrumentation.samples()
+    return "\n".join(lines) + "\n"
+
+def install():
+    # called by MainConfig.ready()
+    if getattr(settings, "PLANNER_METRICS", False) or getattr(settings, "PLANNER_TIMING", False):
+        utils.instrumentation = PlannerMetrics()
+
+
+def server_timing(view):
+    # adds the Server-Timing header (durations in ms) to the responses that asked for the timings of the planner
+    # the planner timings are missing when the result came from the cache or the precomputed table
+    # works with the sync and the async views
+    def wants_timings(request):
+        return utils.instrumentation is not None and (getattr(settings, "PLANNER_TIMING", False) or "X-Planner-Timing" in request.headers)
+
+    def add_header(response, timings, start):
+        timings["total"] = time.perf_counter() - start
+        response["Server-Timing"] = ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items())
+        return response
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not wants_timings(request):
+                return await view(request, *args, **kwargs)
+
+            timings = {}
+            token = request_timings.set(timings)
+            start = time.perf_counter()
+            try:
+                response = await view(request, *args, **kwargs)
+            finally:
+                request_timings.reset(token)
+            return add_header(response, timings, start)
+        return markcoroutinefunction(async_wrapper)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not wants_timings(request):
+            return view(request, *args, **kwargs)
+
+        timings = {}
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            request_timings.reset(token)
+        return add_header(response, timings, start)
+    return wrapper
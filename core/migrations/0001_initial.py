@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ManeuverResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_axis', models.IntegerField()),
+                ('start_ecc', models.FloatField()),
+                ('start_arg', models.IntegerField()),
+                ('end_axis', models.IntegerField()),
+                ('end_ecc', models.FloatField()),
+                ('end_arg', models.IntegerField()),
+                ('optimization', models.SmallIntegerField()),
+                ('data', models.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('start_axis', 'start_ecc', 'start_arg', 'end_axis', 'end_ecc', 'end_arg', 'optimization'), name='unique_maneuver_inputs')],
+            },
+        ),
+    ]
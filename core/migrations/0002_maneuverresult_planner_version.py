@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='maneuverresult',
+            name='unique_maneuver_inputs',
+        ),
+        # the results stored before the planner was versioned get version 0 and are never read again
+        migrations.AddField(
+            model_name='maneuverresult',
+            name='planner_version',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='maneuverresult',
+            constraint=models.UniqueConstraint(fields=('start_axis', 'start_ecc', 'start_arg', 'end_axis', 'end_ecc', 'end_arg', 'optimization', 'planner_version'), name='unique_maneuver_inputs_version'),
+        ),
+    ]
@@ -1,3 +1,23 @@
 from django.db import models
 
-# Create your models here.
+# Results of process_maneuver_data persisted by core/store.py, keyed by the normalized inputs of core/cache.py and
+# the version of the planner that computed them
+
+
+class ManeuverResult(models.Model):
+    start_axis = models.IntegerField()
+    start_ecc = models.FloatField()
+    start_arg = models.IntegerField()
+    end_axis = models.IntegerField()
+    end_ecc = models.FloatField()
+    end_arg = models.IntegerField()
+    optimization = models.SmallIntegerField()
+    planner_version = models.IntegerField()
+    data = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["start_axis", "start_ecc", "start_arg", "end_axis", "end_ecc", "end_arg", "optimization", "planner_version"],
+                                    name="unique_maneuver_inputs_version")
+        ]
@@ -0,0 +1,76 @@
+import math
+import struct
+
+# Packed binary format for the responses, sent instead of JSON when the request's Accept header contains PACKED_CONTENT_TYPE
+# Decoded by unpackArrays in core/static/submitForms.js
+#
+# header: "OMSP", version (u8), padding (u8), number of arrays (u16)
+# then for each array: length of the name (u8), number of dimensions (u8), name (utf-8), shape (u32 per dimension),
+# padding so that the data starts at a multiple of 8 bytes, data (float64, C order)
+# everything is little-endian
+# Only the standard library is needed to pack the responses, NumPy arrays are packed as they are
+
+PACKED_CONTENT_TYPE = "application/vnd.oms.packed"
+MAGIC = b"OMSP"
+VERSION = 1
+
+ORBIT_FIELDS = ["axis", "ecc", "arg", "start_arg", "end_arg"]
+
+
+def _array_data(array):
+    # shape and little-endian float64 data of a NumPy array, a nested list or a scalar
+    if hasattr(array, "dtype"):
+        import numpy as np
+        array = np.ascontiguousarray(array, dtype="<f8")
+        return array.shape, array.tobytes()
+    shape = []
+    values = [array]
+    while isinstance(values[0] if values else None, (list, tuple)):
+        shape.append(len(values[0]))
+        values = [value for row in values for value in row]
+    return tuple(shape), struct.pack(f"<{len(values)}d", *values)
+
+def pack_arrays(arrays: dict) -> bytes:
+    parts = [struct.pack("<4sBBH", MAGIC, VERSION, 0, len(arrays))]
+    offset = len(parts[0])
+    for name, array in arrays.items():
+        shape, data = _array_data(array)
+        name = name.encode()
+        header = struct.pack("<BB", len(name), len(shape)) + name + struct.pack(f"<{len(shape)}I", *shape)
+        header += bytes(-(offset + len(header)) % 8)
+        parts += [header, data]
+        offset += len(header) + len(data)
+    return b"".join(parts)
+
+def unpack_arrays(data: bytes) -> dict:
+    # returns NumPy arrays, used by the tests and the clients written in python
+    import numpy as np
+    magic, version, _, count = struct.unpack_from("<4sBBH", data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a packed response")
+    offset = 8
+    arrays = {}
+    for _ in range(count):
+        name_length, ndim = struct.unpack_from("<BB", data, offset)
+        offset += 2
+        name = data[offset:offset + name_length].decode()
+        offset += name_length
+        shape = struct.unpack_from(f"<{ndim}I", data, offset)
+        offset += 4 * ndim
+        offset += -offset % 8
+        size = math.prod(shape)
+        arrays[name] = np.frombuffer(data, dtype="<f8", count=size, offset=offset).reshape(shape)
+        offset += 8 * size
+    return arrays
+
+
+def maneuver_arrays(processed_data: dict) -> dict:
+    # output of process_maneuver_data as arrays, the orbits are rows of ORBIT_FIELDS (end_arg of the end orbit is nan)
+    orbits = [[orbit.get(field, math.nan) for field in ORBIT_FIELDS] for orbit in processed_data["orbits"]]
+    return {"orbits": orbits, "burns": processed_data["burns"], "max_length": processed_data["max_length"],
+            "earth_pos": processed_data["earth_pos"], "total_delta_v_list": processed_data["total_delta_v_list"],
+            "total_delta_t_list": processed_data["total_delta_t_list"], "strat_id": processed_data["strat_id"]}
+
+def accepts_packed(request) -> bool:
+    # JSON stays the default, also for */*
+    return PACKED_CONTENT_TYPE in request.headers.get("Accept", "")
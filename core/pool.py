@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from .utils import process_maneuver_data
+
+# Process pool of the async views (see orbital_maneuver_simulator/asgi.py), so that computing a maneuver doesn't block
+# the event loop and the maneuvers are computed in parallel
+# COMPUTE_POOL_WORKERS: number of processes (default os.cpu_count())
+# COMPUTE_POOL_QUEUE: max number of computations in the pool at once, running or waiting (default 4 per process),
+#                     the async views answer 503 instead of queuing more of them
+
+class PoolFull(Exception):
+    pass
+
+
+def warm_up(_):
+    # imports the planner and runs it once in the process
+    process_maneuver_data({"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": 9660, "ecc": 0.226, "arg": 137}, 1)
+    return os.getpid()
+
+
+class ComputePool:
+    def __init__(self, workers: int = None, max_pending: int = None):
+        self.workers = workers or os.cpu_count()
+        self.max_pending = max_pending or 4 * self.workers
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock() # held while the processes start, run() doesn't wait for it
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        # every process is started and warmed up now instead of during the first requests
+        with self._start_lock:
+            if self._executor is None:
+                executor = ProcessPoolExecutor(self.workers)
+                list(executor.map(warm_up, range(self.workers)))
+                self._executor = executor
+
+    def shutdown(self):
+        with self._start_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    async def run(self, function, *args):
+        # function and args are pickled to be sent to a process, raises PoolFull if there are too many pending computations
+        if self._executor is None: # started in a thread, starting the processes would block the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.start)
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolFull()
+            self.pending += 1
+        return await self._submit(function, *args)
+
+    async def run_queued(self, function, *args):
+        # same as run but waits until a computation ends instead of raising PoolFull, for the responses that have
+        # already started
+        if self._executor is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.start)
+        while True:
+            with self._lock:
+                if self.pending < self.max_pending:
+                    self.pending += 1
+                    break
+            await asyncio.sleep(0.01)
+        return await self._submit(function, *args)
+
+    async def _submit(self, function, *args):
+        try:
+            return await asyncio.wrap_future(self._executor.submit(function, *args))
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "pending": self.pending, "max_pending": self.max_pending, "rejected": self.rejected}
+
+
+compute_pool = ComputePool(getattr(settings, "COMPUTE_POOL_WORKERS", None), getattr(settings, "COMPUTE_POOL_QUEUE", None))
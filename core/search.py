@@ -0,0 +1,248 @@
+import math
+from typing import NamedTuple, Optional
+from .utils import (MU, Orbit, Maneuver, normalize_angle, same_apsis, same_angle, nonzero_arg, velocity, axis_from_apsides,
+                    ecc_from_apsides, input_orbit, plan_maneuvers, best_strategy, max_length_earth_pos)
+
+# Branch-and-bound search over burn sequences, a generalization of the 8 strategies of process_maneuver_data
+# A burn sequence goes from the start orbit to the end orbit with tangential impulse burns at the apsides, or anywhere
+# on circular orbits (where the burn is placed so that the new orbit lines up with the end orbit). Each burn moves the
+# opposite apsis to a candidate radius: an apsis of the end orbit, the current radius (circularization) or, for
+# bi-elliptic transfers, an intermediate radius beyond both orbits. The 8 strategies are all part of this search space
+#
+# Optionally the satellite starts at start_anomaly on the start orbit and has to be at target_anomaly on the end orbit
+# (true anomalies), at arrival_time if given. To be on time it can wait whole revolutions in the start and end orbits
+# and go around a phasing orbit, tangent to the end orbit at the arrival point, for one or more revolutions
+#
+# Branches are cut when their delta-v (or delta-t) plus a lower bound of what is left can't beat the best sequence
+# found so far. The delta-v bound comes from the specific energy and angular momentum that still have to change:
+# a tangential burn of dv at radius r with speeds v1, v2 changes them by dv * (v1 + v2)/2 and r * dv
+# Angles are in radians, times in seconds
+
+MIN_RADIUS = 6531 # km, lowest periapsis of the form
+MAX_RADIUS = 200000 # km, highest apoapsis of the intermediate orbits
+BIELLIPTIC_FACTORS = (2, 4) # intermediate radii, in multiples of the highest apsis of the start and end orbits
+MAX_BURNS = 4 # not counting the 2 burns of a phasing orbit
+MAX_REVOLUTIONS = 4 # of a phasing orbit, and waited in the start and end orbits
+TIME_TOLERANCE = 1 # s, radii and angles use the tolerances of core/utils.py
+
+
+class SearchResult(NamedTuple):
+    maneuver: Maneuver
+    arrival_time: float # s since the start, when the satellite is at target_anomaly (or enters the end orbit)
+    nodes: int # burn sequences that were expanded
+    pruned: int # burn sequences that were cut by the bounds
+
+
+def mean_anomaly(true_anomaly, ecc):
+    eccentric_anomaly = 2 * math.atan2(math.sqrt(1 - ecc) * math.sin(true_anomaly/2), math.sqrt(1 + ecc) * math.cos(true_anomaly/2))
+    return normalize_angle(eccentric_anomaly - ecc * math.sin(eccentric_anomaly))
+
+def next_anomaly(start_arg, anomaly):
+    # first time after start_arg that the mean anomaly is anomaly (modulo 2 pi), never start_arg itself
+    return start_arg + nonzero_arg(normalize_angle(anomaly - start_arg))
+
+def energy(orbit): # J/kg
+    return -MU/(2 * orbit.axis * 1000)
+
+def angular_momentum(orbit): # m^2/s
+    return math.sqrt(MU * orbit.axis * 1000 * (1 - orbit.ecc ** 2))
+
+def apsis_orbit(r, R, direction):
+    # orbit with an apsis of radius r in the given direction and the opposite one at R, and the mean anomaly at r
+    if R > r:
+        return Orbit.create(axis_from_apsides(r, R), ecc_from_apsides(r, R), normalize_angle(direction)), 0
+    elif R < r:
+        return Orbit.create(axis_from_apsides(R, r), ecc_from_apsides(R, r), normalize_angle(direction + math.pi)), math.pi
+    return Orbit.create(r, 0, normalize_angle(direction)), 0
+
+def phasing_orbit(r, direction, period):
+    # orbit tangent to the end orbit at r with the given period, None if it would go below MIN_RADIUS or above MAX_RADIUS
+    axis = (MU * (period/(2 * math.pi)) ** 2) ** (1/3)/1000
+    R = 2 * axis - r
+    if not (MIN_RADIUS <= R <= MAX_RADIUS):
+        return None
+    return apsis_orbit(r, R, direction)
+
+
+def search_maneuver(start_orbit: Orbit, end_orbit: Orbit, optimization, target_anomaly: float = None,
+                    arrival_time: float = None, max_burns: int = MAX_BURNS, incumbent: Maneuver = None) -> Optional[SearchResult]:
+    # start_orbit.start_arg is the mean anomaly of the satellite at the start
+    # incumbent is a maneuver that is already known (e.g. the best of the 8 strategies without constraints), the
+    # search only looks for better ones and returns it if there are none
+    # returns None if no burn sequence can be at target_anomaly at arrival_time (i.e. arrival_time is too early)
+    highest_apsis = max(start_orbit.apoapsis, end_orbit.apoapsis)
+    radii = [end_orbit.periapsis, end_orbit.apoapsis] if not end_orbit.is_circle else [end_orbit.axis]
+    radii += [factor * highest_apsis for factor in BIELLIPTIC_FACTORS if factor * highest_apsis <= MAX_RADIUS]
+
+    # highest speed and radius of any orbit of the search, for the delta-v bound
+    all_radii = radii + [start_orbit.periapsis, start_orbit.apoapsis]
+    lowest, highest = min(all_radii), max(all_radii)
+    if arrival_time is not None:
+        lowest, highest = MIN_RADIUS, max(highest, MAX_RADIUS)
+    max_speed = velocity(lowest, axis_from_apsides(lowest, highest))
+    end_energy, end_angular_momentum = energy(end_orbit), angular_momentum(end_orbit)
+
+    end_target = None if target_anomaly is None else mean_anomaly(target_anomaly, end_orbit.ecc)
+    by_fuel = bool(optimization)
+    best = {"key": None, "result": None}
+    stats = {"nodes": 0, "pruned": 0}
+    dominated = {}
+
+    def key(delta_v, delta_t, n_orbits):
+        return (delta_v, round(delta_t), n_orbits) if by_fuel else (round(delta_t), delta_v, n_orbits)
+
+    if incumbent is not None:
+        best["key"] = key(incumbent.total_delta_v, incumbent.total_delta_t, len(incumbent.orbits))
+        best["result"] = (incumbent, sum((orbit.end_arg - orbit.start_arg) * orbit.seconds_per_radian for orbit in incumbent.orbits[:-1]))
+
+    def is_pruned(delta_v, delta_t, orbit, burns_left):
+        if best["key"] is None:
+            return False
+        bound_v = max(abs(end_energy - energy(orbit))/max_speed, abs(end_angular_momentum - angular_momentum(orbit))/(highest * 1000))
+        bound_v -= 0.5 * burns_left # burns are rounded to m/s
+        bound_t = 0
+        if orbit is not start_orbit and not orbit.is_circle: # the satellite has to get to an apsis before the next burn
+            bound_t = (min(next_anomaly(orbit.start_arg, 0), next_anomaly(orbit.start_arg, math.pi)) - orbit.start_arg) * orbit.seconds_per_radian
+        lower = (delta_v + bound_v, delta_t + bound_t) if by_fuel else (delta_t + bound_t, delta_v + bound_v)
+        return lower[0] > best["key"][0] + 0.5
+
+    def offer(orbits, burns, delta_t, arrival):
+        delta_v = sum(map(abs, burns))
+        candidate = key(delta_v, delta_t, len(orbits))
+        if best["key"] is None or candidate < best["key"]:
+            best["key"] = candidate
+            best["result"] = (Maneuver(tuple(orbits), tuple(burns), delta_v, round(delta_t)), arrival)
+
+    def arrive(orbits, burns, delta_t, time, v_before):
+        # orbits[-1] is the end orbit entered at time, v_before is the speed before the last burn
+        end = orbits[-1]
+        coast = 0 if end_target is None else (next_anomaly(end.start_arg, end_target) - end.start_arg) % (2 * math.pi) * end.seconds_per_radian
+        if arrival_time is None:
+            offer(orbits, burns, delta_t + coast, time + coast)
+            return
+
+        r = end.periapsis if end.start_arg == 0 else end.apoapsis
+        direction = end.arg + end.start_arg
+        start_period = 2 * math.pi * start_orbit.seconds_per_radian
+        for start_revolutions in range(MAX_REVOLUTIONS + 1):
+            # waiting in the start orbit doesn't count in delta-t
+            wait = start_revolutions * start_period
+            waited_orbits = list(orbits)
+            if start_revolutions:
+                waited_orbits[0] = waited_orbits[0].with_end_arg(waited_orbits[0].end_arg + 2 * math.pi * start_revolutions)
+            for end_revolutions in range(MAX_REVOLUTIONS + 1):
+                end_coast = coast + end_revolutions * end.period
+                phasing_time = arrival_time - (time + wait) - end_coast
+                if abs(phasing_time) <= TIME_TOLERANCE:
+                    offer(waited_orbits, burns, delta_t + end_coast, arrival_time)
+                elif phasing_time > 0:
+                    for revolutions in range(1, MAX_REVOLUTIONS + 1):
+                        phasing = phasing_orbit(r, direction, phasing_time/revolutions)
+                        if phasing is None:
+                            continue
+                        orbit, start_arg = phasing
+                        orbit = orbit.with_start_arg(start_arg).with_end_arg(start_arg + 2 * math.pi * revolutions)
+                        v_phasing = velocity(r, orbit.axis)
+                        phasing_burns = burns[:-1] + [round(v_phasing - v_before), round(velocity(r, end.axis) - v_phasing)]
+                        offer(waited_orbits[:-1] + [orbit, end], phasing_burns, delta_t + phasing_time + end_coast, arrival_time)
+
+    def expand(orbits, burns, delta_t, time):
+        current = orbits[-1]
+        stats["nodes"] += 1
+        is_start = len(orbits) == 1
+
+        # burn points: (direction, radius, mean anomaly, speed)
+        if not current.is_circle:
+            points = [(current.arg, current.periapsis, 0, current.v_periapsis), (current.arg + math.pi, current.apoapsis, math.pi, current.v_apoapsis)]
+        else:
+            points = [(end_orbit.arg + offset, current.axis, normalize_angle(end_orbit.arg + offset - current.arg), current.v_periapsis) for offset in (0, math.pi)]
+
+        children = []
+        for direction, r, anomaly, v1 in points:
+            end_arg = next_anomaly(current.start_arg, anomaly)
+            coast = (end_arg - current.start_arg) * current.seconds_per_radian
+            child_delta_t = delta_t + (0 if is_start else coast)
+            child_time = time + coast
+            burned = current.with_end_arg(end_arg)
+
+            # last burn, the orbit becomes the end orbit
+            if end_orbit.is_circle:
+                arrival = normalize_angle(direction - end_orbit.arg) if same_apsis(r, end_orbit.axis) else None
+            elif same_apsis(r, end_orbit.periapsis) and same_angle(direction, end_orbit.arg):
+                arrival = 0
+            elif same_apsis(r, end_orbit.apoapsis) and same_angle(direction, end_orbit.arg + math.pi):
+                arrival = math.pi
+            else:
+                arrival = None
+            if arrival is not None:
+                v2 = end_orbit.v_periapsis if arrival == 0 or end_orbit.is_circle else end_orbit.v_apoapsis
+                arrive(orbits[:-1] + [burned, end_orbit.with_start_arg(arrival)], burns + [round(v2 - v1)], child_delta_t, child_time, v1)
+
+            if len(burns) + 1 >= max_burns:
+                continue
+            # radii almost equal to r would give an orbit that is almost but not exactly circular
+            other_apsis = current.apoapsis if r == current.periapsis else current.periapsis
+            for R in [R for R in radii if not same_apsis(R, r)] + ([r] if not current.is_circle else []):
+                if same_apsis(R, other_apsis):
+                    continue # the burn wouldn't change the orbit
+                orbit, start_arg = apsis_orbit(r, R, direction)
+                orbit = orbit.with_start_arg(start_arg)
+                burn = round(velocity(r, orbit.axis) - v1)
+                children.append((abs(burn), orbits[:-1] + [burned, orbit], burns + [burn], child_delta_t, child_time))
+
+        # cheapest burns first so that good sequences are found early and the bounds cut more
+        children.sort(key=lambda child: child[0] if by_fuel else child[3])
+        for _, child_orbits, child_burns, child_delta_t, child_time in children:
+            orbit = child_orbits[-1]
+            delta_v = sum(map(abs, child_burns))
+            if is_pruned(delta_v, child_delta_t, orbit, max_burns - len(child_burns)):
+                stats["pruned"] += 1
+                continue
+
+            # the same orbit, entered at the same point (and time if it matters), already reached more cheaply
+            state = (round(orbit.periapsis), round(orbit.apoapsis), round(orbit.arg, 9), orbit.start_arg, len(child_burns),
+                     None if arrival_time is None else round(child_time))
+            previous = dominated.get(state)
+            if previous is not None and previous[0] <= delta_v and previous[1] <= child_delta_t:
+                stats["pruned"] += 1
+                continue
+            dominated[state] = (delta_v, child_delta_t)
+
+            expand(child_orbits, child_burns, child_delta_t, child_time)
+
+    expand([start_orbit], [], 0, 0)
+    if best["result"] is None:
+        return None
+    maneuver, arrival = best["result"]
+    return SearchResult(maneuver, arrival, stats["nodes"], stats["pruned"])
+
+
+def process_maneuver_search(start_orbit: dict, end_orbit: dict, optimization, start_anomaly=0, target_anomaly=None, arrival_time=None) -> dict:
+    # same output as process_maneuver_data, anomalies are true anomalies in degrees and arrival_time is in s
+    # total_delta_v_list and total_delta_t_list have the 8 strategies (always starting at the periapsis, without target)
+    # and the searched sequence last. Without constraints the search starts from the best strategy and strat_id stays
+    # the id of that strategy unless a better sequence is found
+    optimization = int(optimization)
+    start, end = input_orbit(start_orbit), input_orbit(end_orbit)
+    target_anomaly = None if target_anomaly is None else math.radians(float(target_anomaly))
+    arrival_time = None if arrival_time is None else float(arrival_time)
+    start_anomaly = float(start_anomaly or 0)
+    constrained = start_anomaly != 0 or target_anomaly is not None or arrival_time is not None
+
+    maneuvers = plan_maneuvers(start, end)
+    best_id = best_strategy(maneuvers, optimization)
+    incumbent = None if constrained else maneuvers[best_id]
+    result = search_maneuver(start.with_start_arg(mean_anomaly(math.radians(start_anomaly), start.ecc)), end, optimization,
+                             target_anomaly, arrival_time, incumbent=incumbent)
+    if result is None:
+        raise ValueError("the end orbit can't be reached at the target anomaly at arrival_time")
+
+    maneuvers.append(result.maneuver)
+    strat_id = best_id if result.maneuver is incumbent else len(maneuvers) - 1
+    best_strat = maneuvers[strat_id]
+
+    max_length, earth_pos = max_length_earth_pos(best_strat.orbits).values()
+    return {"orbits": [orbit.to_dict() for orbit in best_strat.orbits], "burns": list(best_strat.burns), "max_length": max_length,
+            "earth_pos": earth_pos, "total_delta_v_list": [maneuver.total_delta_v for maneuver in maneuvers],
+            "total_delta_t_list": [maneuver.total_delta_t for maneuver in maneuvers], "strat_id": strat_id,
+            "search": {"arrival_time": result.arrival_time, "nodes": result.nodes, "pruned": result.pruned}}
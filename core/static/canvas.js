@@ -15,6 +15,30 @@ const EARTH_MASS = 5.972e24;
  * argument of periapsis is the counterclockwise angle between the semi-major axis and the x-axis
  */
 
+// true anomaly tables of kepler.js by eccentricity, shared by the orbits, null while the worker builds it
+// least recently used first: past KEPLER_TABLES_MAX tables (64 kB each) the oldest one is dropped, an orbit whose
+// table was dropped solves Kepler's equation directly
+const KEPLER_TABLES_MAX = 16;
+const trueAnomalyTables = new Map();
+function setTrueAnomalyTable(e, table) {
+    trueAnomalyTables.delete(e); // the Map keeps the insertion order, so e becomes the most recent
+    trueAnomalyTables.set(e, table);
+    if (trueAnomalyTables.size > KEPLER_TABLES_MAX) {
+        trueAnomalyTables.delete(trueAnomalyTables.keys().next().value);
+    }
+}
+// the tables are built on the main thread when the worker can't start
+const keplerWorker = (() => {
+    try {
+        return new Worker(new URL("kepler.js", document.currentScript.src));
+    } catch {
+        return null;
+    }
+})();
+if (keplerWorker) {
+    keplerWorker.onmessage = (event) => setTrueAnomalyTable(event.data.e, event.data.table);
+}
+
 class ManeuverSimulation {
     constructor(orbits, burns, maxLength, earthPos) {
         this.animation;
@@ -74,33 +98,8 @@ class ManeuverSimulation {
             return (this.time * 36 * 2 * Math.PI)/orbit.orbitalPeriod + (orbit.startArg ? orbit.startArg : 0);
         }
 
-        this.eccentricAnomalie = function () {
-            let orbit = this.orbits[this.currentOrbitId];
-            // Newton's method with Kepler's equation M = E - e * sin(E). 
-            // It is a transcendental equation: no closed form solution, so numerical methods are necessary to estimate E
-            const f = (E) => E - orbit.e * Math.sin(E) - this.meanAnomalie();
-            const df_dE = (E) => 1 - orbit.e * Math.cos(E);
-            let E = this.meanAnomalie(); // initial guess for E
-            let E_next;
-            // 8 iterations reduce max error to under 1e-15 for the highest eccentricity possible (0.869)
-            for (let i = 0; i < 8; i++) {
-                E_next = E - f(E)/df_dE(E);
-                E = E_next;
-            }
-            return E;
-        }
-
         this.trueAnomalie = function () {
-            let orbit = this.orbits[this.currentOrbitId];
-            if (orbit.isCircular) {
-                return this.meanAnomalie(); // for circular orbits, true anomalie is the same as mean anomalie
-            } else {
-                let theta = 2 * Math.atan2(Math.sqrt(1 + orbit.e) * Math.tan(this.eccentricAnomalie()/2), Math.sqrt(1 - orbit.e));
-                if (theta < 0) {
-                    theta += 2* Math.PI;
-                } 
-                return theta;
-            }
+            return this.orbits[this.currentOrbitId].trueAnomaly(this.meanAnomalie());
         }
 
         // satellite position according to the center of the earth
@@ -373,31 +372,8 @@ class OrbitSimulation {
             return (this.time * 36 * 2 * Math.PI)/orbit.orbitalPeriod;
         }
 
-        this.eccentricAnomalie = function () {
-            // Newton's method with Kepler's equation M = E - e * sin(E). 
-            // It is a transcendental equation: no closed form solution, so numerical methods are necessary to estimate E
-            const f = (E) => E - orbit.e * Math.sin(E) - this.meanAnomalie();
-            const df_dE = (E) => 1 - orbit.e * Math.cos(E);
-            let E = this.meanAnomalie(); // initial guess for E
-            let E_next;
-            // 8 iterations reduce max error to under 1e-15 for the highest eccentricity possible (0.869)
-            for (let i = 0; i < 8; i++) {
-                E_next = E - f(E)/df_dE(E);
-                E = E_next;
-            }
-            return E;
-        }
-
         this.trueAnomalie = function () {
-            if (orbit.isCircular) {
-                return this.meanAnomalie(); // for circular orbits, true anomalie is the same as mean anomalie
-            } else {
-                let theta = 2 * Math.atan2(Math.sqrt(1 + orbit.e) * Math.tan(this.eccentricAnomalie()/2), Math.sqrt(1 - orbit.e));
-                if (theta < 0) {
-                    theta += 2* Math.PI;
-                } 
-                return theta;
-            }
+            return orbit.trueAnomaly(this.meanAnomalie());
         }
 
         // sattelite position according to the center of the earth
@@ -407,12 +383,15 @@ class OrbitSimulation {
             return [Math.cos(theta) * radius, -Math.sin(theta) * radius];
         }
 
+        // vectors
+        this.maxVelocityFactor = Math.sqrt(2/this.pixelOrbit.periapsis - 1/this.pixelOrbit.semiMajorAxis); // when radius is equal to periapsis, speed will be the greatest
+        this.maxAccelerationFactor = 1/(this.pixelOrbit.periapsis ** 2); // When radius will be equal to periapsis, acceleration will be the greatest
+
         // velocity vector
         this.velocity = function() {
             let theta = this.trueAnomalie();
             let velocityFactor = Math.sqrt(2/this.satRadius(theta) - 1/this.pixelOrbit.semiMajorAxis);  // Proportional to true speed
-            let maxVelocityFactor = Math.sqrt(2/this.pixelOrbit.periapsis - 1/this.pixelOrbit.semiMajorAxis); // when radius is equal to periapsis, speed will be the greatest
-            let velocityRatio = velocityFactor/maxVelocityFactor;
+            let velocityRatio = velocityFactor/this.maxVelocityFactor;
             let [x,y] = this.satPosition();
             let velocityRatioX;
             let velocityRatioY;
@@ -436,8 +415,7 @@ class OrbitSimulation {
         this.acceleration = function() {
             let theta = this.trueAnomalie();
             let accelerationFactor = 1/(this.satRadius(theta) ** 2); // Proportional to true acceleration magnitude - Newton's law of universal gravitation
-            let maxAccelerationFactor = 1/(this.pixelOrbit.periapsis ** 2); // When radius will be equal to periapsis, acceleration will be the greatest
-            let accelerationRatio = accelerationFactor/maxAccelerationFactor;
+            let accelerationRatio = accelerationFactor/this.maxAccelerationFactor;
             let accelerationRatioX = -accelerationRatio * Math.cos(theta);
             let accelerationRatioY = accelerationRatio * Math.sin(theta);
             return [accelerationRatioX, accelerationRatioY];
@@ -602,6 +580,25 @@ class Orbit {
         }
         this.vPeriapsis = Math.sqrt(G * EARTH_MASS * (2/(this.periapsis * 1000) - 1/(this.semiMajorAxis * 1000))) // m/s
         this.vApoapsis = this.isCircular ? this.vPeriapsis: Math.sqrt(G * EARTH_MASS * (2/(this.apoapsis * 1000) - 1/(this.semiMajorAxis * 1000))) // m/s
+        if (!this.isCircular && trueAnomalyTables.has(this.e)) {
+            setTrueAnomalyTable(this.e, trueAnomalyTables.get(this.e)); // used again
+        } else if (!this.isCircular) {
+            if (keplerWorker) {
+                setTrueAnomalyTable(this.e, null); // requested
+                keplerWorker.postMessage({e: this.e});
+            } else {
+                setTrueAnomalyTable(this.e, trueAnomalyTable(this.e));
+            }
+        }
+    }
+
+    trueAnomaly(meanAnomaly) {
+        if (this.isCircular) {
+            return meanAnomaly; // for circular orbits, true anomalie is the same as mean anomalie
+        }
+        let table = trueAnomalyTables.get(this.e);
+        // Kepler's equation is solved directly until the worker sends the table
+        return table ? interpolateTrueAnomaly(table, meanAnomaly) : solveTrueAnomaly(meanAnomaly, this.e);
     }
 }
 
@@ -1,8 +1,10 @@
 const EARTH_RADIUS = 6371;
 const orbitTypeColorMap = {"start": "rgba(30, 144, 255, 1)", "transfer1": "rgba(255, 0, 255, 1)", 
-    "transfer2": "rgba(255, 140, 0, 1)", "end": "rgba(255, 255, 0, 1)"};
+    "transfer2": "rgba(255, 140, 0, 1)", "transfer3": "rgba(0, 220, 120, 1)", "transfer4": "rgba(255, 80, 80, 1)",
+    "transfer5": "rgba(180, 120, 255, 1)", "end": "rgba(255, 255, 0, 1)"};
 const orbitTypeTitleMap = {"start": "Initial Orbit", "transfer1": "Transfer Orbit 1", 
-    "transfer2": "Transfer Orbit 2", "end": "Final Orbit"};
+    "transfer2": "Transfer Orbit 2", "transfer3": "Transfer Orbit 3", "transfer4": "Transfer Orbit 4",
+    "transfer5": "Transfer Orbit 5", "end": "Final Orbit"};
 const stratAlgs = [
     "<b>1.</b> Current apoapsis := Final apoapsis <b>2.</b> Circularize orbit to reach final argument of periapsis <b>3.</b> Radius := Final periapsis",
     "<b>1.</b> Current periapsis := Final apoapsis <b>2.</b> Circularize orbit to reach final argument of periapsis <b>3.</b> Radius := Final periapsis",
@@ -11,7 +13,8 @@ const stratAlgs = [
     "<b>1.</b> Circularize orbit at the current periapsis to reach final argument of periapsis <b>2.</b> Radius := Final apoapsis <b>3.</b> Remaining apsis := Final periapsis",
     "<b>1.</b> Circularize orbit at the current apoapsis to reach final argument of periapsis <b>2.</b> Radius := Final apoapsis <b>3.</b> Remaining apsis := Final periapsis",
     "<b>1.</b> Circularize orbit at the current periapsis to reach final argument of periapsis <b>2.</b> Radius := Final periapsis <b>3.</b> Remaining apsis := Final apoapsis",
-    "<b>1.</b> Circularize orbit at the current apoapsis to reach final argument of periapsis <b>2.</b> Radius := Final periapsis <b>3.</b> Remaining apsis := Final apoapsis"
+    "<b>1.</b> Circularize orbit at the current apoapsis to reach final argument of periapsis <b>2.</b> Radius := Final periapsis <b>3.</b> Remaining apsis := Final apoapsis",
+    "Searched burn sequence: burns at the apsides (bi-elliptic transfers included), revolutions and phasing orbits to reach the target true anomaly at the arrival time"
 ];
 
 // toggles
@@ -349,7 +352,7 @@ function updateManeuverInfo(orbits, burns, totalDeltaVList, totalDeltaTList, str
     velocityChart = new Chart(velocityChartCtx, {
         type: 'bar',
         data: {
-          labels: ['1', '2', '3', '4', '5', '6', '7', '8'],
+          labels: totalDeltaVList.map((_, id) => String(id + 1)),
           datasets: [{
             label: 'Total Δv',
             data: totalDeltaVList,
@@ -418,7 +421,7 @@ function updateManeuverInfo(orbits, burns, totalDeltaVList, totalDeltaTList, str
     timeChart = new Chart(timeChartCtx, {
         type: 'bar',
         data: {
-          labels: ['1', '2', '3', '4', '5', '6', '7', '8'],
+          labels: totalDeltaVList.map((_, id) => String(id + 1)),
           datasets: [{
             label: 'Total Δt',
             data: totalDeltaTList,
@@ -490,10 +493,11 @@ function updateManeuverInfo(orbits, burns, totalDeltaVList, totalDeltaTList, str
     stratAlgHTML += '<div id="strat-tooltip-hover-container">';
     stratAlgHTML += '<b>' + "Strategy " + (stratId+1) + " Algorithm" + ': </b>' + stratAlgs[stratId] + '<br>';
     stratAlgHTML += '<span id="strat-tooltip">';
-    stratAlgs.forEach((alg, id) => {
+    // the searched sequence is only in the lists returned by /submit-maneuver-search/
+    stratAlgs.slice(0, totalDeltaVList.length).forEach((alg, id) => {
         stratAlgHTML += '<b> Strategy ' + (id + 1) +': </b>';
         stratAlgHTML += alg;
-        if (id != stratAlgs.length - 1) {
+        if (id != totalDeltaVList.length - 1) {
             stratAlgHTML += '<br>';
         }
     });
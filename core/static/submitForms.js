@@ -12,23 +12,35 @@ function submitManeuverForm(event) {
 
         const formData = new FormData(event.target);
         formValidator(formData);
+        targetValidator(formData);
 
-        fetch('/submit-maneuver-form/', {
+        // the search endpoint handles the optional target true anomaly and arrival time, the other maneuvers are
+        // requested with GET so that the repeated ones are served by the caches
+        const constrained = ['maneuver-anomaly-1-value', 'maneuver-anomaly-2-value', 'arrival-time-value'].some(name => formData.get(name));
+        const request = constrained ? fetch('/submit-maneuver-search/', {
             method: 'POST',
             body: formData,
+            headers: {'Accept': PACKED_CONTENT_TYPE},
+        }) : fetch('/maneuver-data/?' + maneuverQuery(formData), {
+            headers: {'Accept': PACKED_CONTENT_TYPE},
+        });
+        request
+        .then(response => {
+            if (!response.ok) { // e.g. the target true anomaly can't be reached at the arrival time
+                return response.json().then(data => { throw new Error(data.error); });
+            }
+            return response.arrayBuffer();
         })
-        .then(response => response.json())
-        .then(data => {
+        .then(buffer => {
+            let data = unpackManeuver(unpackArrays(buffer));
             let orbits = [];
             data.orbits.forEach((orbit, id) => {
                 if (id == 0) {
                     orbits.push(new Orbit(orbit.axis, orbit.ecc, orbit.arg, "start", orbit.start_arg, orbit.end_arg));
                 } else if (id == data.orbits.length - 1) {
                     orbits.push(new Orbit(orbit.axis, orbit.ecc, orbit.arg, "end", orbit.start_arg, false));
-                } else if (id == 1 && data.orbits.length >= 3) {
-                    orbits.push(new Orbit(orbit.axis, orbit.ecc, orbit.arg, "transfer1", orbit.start_arg, orbit.end_arg));
-                } else if (id == 2 && data.orbits.length == 4) {
-                    orbits.push(new Orbit(orbit.axis, orbit.ecc, orbit.arg, "transfer2", orbit.start_arg, orbit.end_arg));
+                } else {
+                    orbits.push(new Orbit(orbit.axis, orbit.ecc, orbit.arg, "transfer" + id, orbit.start_arg, orbit.end_arg));
                 }
             });
             simulation = new ManeuverSimulation(orbits, data.burns, data.max_length, data.earth_pos);
@@ -61,10 +73,8 @@ function submitOrbitForm(event) {
 
         let orbit = new Orbit(parseInt(formData.get("orbit-axis-value")), parseFloat(formData.get("orbit-ecc-value")), parseInt(formData.get("orbit-arg-value")) * (Math.PI / 180), "constant", false, false);
  
-        fetch('/submit-orbit-form/', {
-            method: 'POST',
-            body: formData,
-        })
+        fetch('/orbit-data/?' + new URLSearchParams({axis: parseInt(formData.get("orbit-axis-value")),
+            ecc: parseFloat(formData.get("orbit-ecc-value")), arg: parseInt(formData.get("orbit-arg-value"))}))
         .then(response => response.json())
         .then(data => {
             simulation = new OrbitSimulation(orbit, data.max_length);
@@ -79,6 +89,77 @@ function submitOrbitForm(event) {
     }
 }
 
+// canonical query of /maneuver-data/ (see core/views.py), other spellings of it are redirected
+function maneuverQuery(formData) {
+    return new URLSearchParams({
+        start_axis: parseInt(formData.get("maneuver-axis-1-value")), start_ecc: parseFloat(formData.get("maneuver-ecc-1-value")),
+        start_arg: parseInt(formData.get("maneuver-arg-1-value")), end_axis: parseInt(formData.get("maneuver-axis-2-value")),
+        end_ecc: parseFloat(formData.get("maneuver-ecc-2-value")), end_arg: parseInt(formData.get("maneuver-arg-2-value")),
+        optimization: parseInt(formData.get("optimization-toggle"))
+    });
+}
+
+// Packed binary responses, see core/packing.py for the format
+const PACKED_CONTENT_TYPE = "application/vnd.oms.packed";
+
+function unpackArrays(buffer) {
+    let view = new DataView(buffer);
+    let magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic != "OMSP" || view.getUint8(4) != 1) {
+        throw new Error("not a packed response");
+    }
+    let count = view.getUint16(6, true);
+    let offset = 8;
+    let arrays = {};
+    for (let i = 0; i < count; i++) {
+        let nameLength = view.getUint8(offset);
+        let ndim = view.getUint8(offset + 1);
+        offset += 2;
+        let name = new TextDecoder().decode(new Uint8Array(buffer, offset, nameLength));
+        offset += nameLength;
+        let shape = [];
+        for (let j = 0; j < ndim; j++) {
+            shape.push(view.getUint32(offset, true));
+            offset += 4;
+        }
+        offset += (8 - offset % 8) % 8; // data starts at a multiple of 8 bytes
+        let size = shape.reduce((a, b) => a * b, 1);
+        let data = new Float64Array(size);
+        for (let j = 0; j < size; j++) { // DataView so that it is little-endian on every platform
+            data[j] = view.getFloat64(offset + 8 * j, true);
+        }
+        arrays[name] = {shape: shape, data: data};
+        offset += 8 * size;
+    }
+    return arrays;
+}
+
+// same object as the JSON response of the maneuver form
+function unpackManeuver(arrays) {
+    const orbitFields = ["axis", "ecc", "arg", "start_arg", "end_arg"];
+    let orbits = [];
+    let nOrbits = arrays.orbits.shape[0];
+    for (let i = 0; i < nOrbits; i++) {
+        let orbit = {};
+        orbitFields.forEach((field, j) => {
+            orbit[field] = arrays.orbits.data[i * orbitFields.length + j];
+        });
+        if (i == nOrbits - 1) {
+            delete orbit.end_arg;
+        }
+        orbits.push(orbit);
+    }
+    return {
+        orbits: orbits,
+        burns: Array.from(arrays.burns.data),
+        max_length: arrays.max_length.data[0],
+        earth_pos: Array.from(arrays.earth_pos.data),
+        total_delta_v_list: Array.from(arrays.total_delta_v_list.data),
+        total_delta_t_list: Array.from(arrays.total_delta_t_list.data),
+        strat_id: arrays.strat_id.data[0]
+    };
+}
+
 function formValidator(formData) {
     let isManeuverForm = formData.has("maneuver-axis-1-value");
     let ids = isManeuverForm ? ["maneuver-axis-1", "maneuver-ecc-1",
@@ -157,4 +238,16 @@ function formValidator(formData) {
         }
         
     }
-}
\ No newline at end of file
+}
+
+// the target fields of the maneuver form are optional, the ones that aren't numbers are emptied
+function targetValidator(formData) {
+    ["maneuver-anomaly-1", "maneuver-anomaly-2", "arrival-time"].forEach(id => {
+        const value = formData.get(id + "-value");
+        if (value && !/^[0-9]+\.?([0-9]+)?$/.test(value)) {
+            alert("Invalid target input! Only digits and one decimal point are allowed, leave it empty for no target.");
+            formData.delete(id + "-value");
+            document.getElementById(id + "-value").value = '';
+        }
+    });
+}
@@ -0,0 +1,116 @@
+import atexit
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from .models import ManeuverResult
+from .utils import PLANNER_VERSION
+
+# Persistent store of the results of process_maneuver_data in the ManeuverResult table of the database, checked by
+# core/cache.py after the worker's cache and the shared cache, so the results survive restarts and deployments and are
+# shared by all of the gunicorn workers. The results are written behind: the requests only add them to a queue and a
+# thread inserts them in bulk, a full queue drops results instead of blocking the request
+# RESULT_STORE: enables the store (default False), the table is created by "python manage.py migrate"
+# RESULT_STORE_BATCH_SIZE: max number of results inserted at once (default 500)
+# RESULT_STORE_FLUSH_INTERVAL: max time in seconds a result waits in the queue (default 1)
+# RESULT_STORE_QUEUE_SIZE: max number of results waiting in the queue (default 10000)
+# RESULT_STORE_MAX_ROWS: number of results kept by "python manage.py prune_results" (default 1000000)
+# Only the results of the current PLANNER_VERSION (see core/utils.py) are read, the others are deleted by prune_results
+
+INPUT_FIELDS = ["start_axis", "start_ecc", "start_arg", "end_axis", "end_ecc", "end_arg", "optimization"]
+
+
+def stored_results(key: tuple):
+    return ManeuverResult.objects.filter(**dict(zip(INPUT_FIELDS, key)), planner_version=PLANNER_VERSION)
+
+
+class ResultStore:
+    def __init__(self, enabled: bool = False, batch_size: int = 500, flush_interval: float = 1.0, queue_size: int = 10000):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        # key is a maneuver_key of core/cache.py, None when the result isn't stored
+        try:
+            return stored_results(key).values_list("data", flat=True).first()
+        except DatabaseError: # e.g. the table doesn't exist yet, the result is computed
+            return None
+
+    async def aget(self, key: tuple):
+        try:
+            return await stored_results(key).values_list("data", flat=True).afirst()
+        except DatabaseError:
+            return None
+
+    def put(self, key: tuple, result: dict):
+        # never blocks, the result is written by the writer thread
+        self._start()
+        try:
+            self._queue.put_nowait((key, result))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="result-store-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush) # the queued results are written when the worker exits
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: list):
+        rows = [ManeuverResult(**dict(zip(INPUT_FIELDS, key)), planner_version=PLANNER_VERSION, data=result) for key, result in batch]
+        try:
+            # results already stored by another worker are skipped by the unique constraint
+            ManeuverResult.objects.bulk_create(rows, ignore_conflicts=True)
+            written, failed = len(rows), 0
+        except DatabaseError:
+            written, failed = 0, len(rows)
+        close_old_connections()
+        with self._lock:
+            self.written += written
+            self.failed += failed
+        for _ in batch:
+            self._queue.task_done()
+
+    def flush(self):
+        # waits until every queued result is written
+        if self._thread is not None:
+            self._queue.join()
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"pending": self._queue.qsize(), "written": self.written, "dropped": self.dropped, "failed": self.failed}
+
+
+result_store = ResultStore(getattr(settings, "RESULT_STORE", False), getattr(settings, "RESULT_STORE_BATCH_SIZE", 500),
+                           getattr(settings, "RESULT_STORE_FLUSH_INTERVAL", 1.0), getattr(settings, "RESULT_STORE_QUEUE_SIZE", 10000))
+
+
+def prune_results(max_rows: int) -> int:
+    # deletes the results of the other planner versions and the results inserted before the last max_rows ones,
+    # returns the number of deleted results
+    deleted, _ = ManeuverResult.objects.exclude(planner_version=PLANNER_VERSION).delete()
+    cutoff = list(ManeuverResult.objects.order_by("-id").values_list("id", flat=True)[max_rows:max_rows + 1])
+    if cutoff:
+        deleted += ManeuverResult.objects.filter(id__lte=cutoff[0]).delete()[0]
+    return deleted
@@ -0,0 +1,107 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .batch import STRATEGY_COUNT, process_maneuver_batch
+from .table import GRID_DIMENSIONS, grid_values
+
+# Sweeps of process_maneuver_data over a grid of the inputs (e.g. end axis vs end eccentricity for a delta-v heatmap)
+# A sweep is a directory with sweep.json, which describes the grid like core/table.py does (fixed inputs have a single
+# value), results.npy, which holds one record per grid point, and done.npy, which marks the chunks already computed.
+# Both .npy files are memory mapped: the workers write their chunks directly into results.npy, so the results are
+# never all in memory and an interrupted sweep resumes from the chunks that are not marked as done
+
+SWEEP_DTYPE = np.dtype([
+    ("strat_id", "u1"),
+    ("n_orbits", "u1"),
+    ("total_delta_v", "i4"),
+    ("total_delta_t", "i4"),
+    ("total_delta_v_list", "i4", (STRATEGY_COUNT,)),
+    ("total_delta_t_list", "i4", (STRATEGY_COUNT,))
+])
+
+
+def sweep_shape(grid: dict) -> tuple:
+    return tuple(grid[dimension][1] for dimension in GRID_DIMENSIONS)
+
+def chunk_count(sweep: dict) -> int:
+    return -(-int(np.prod(sweep_shape(sweep["grid"]))) // sweep["chunk_size"])
+
+
+def compute_chunk(path: str, sweep: dict, chunk: int) -> int:
+    # runs in the worker processes, writes the results of one chunk into results.npy
+    shape = sweep_shape(sweep["grid"])
+    size = int(np.prod(shape))
+    flat_index = np.arange(chunk * sweep["chunk_size"], min((chunk + 1) * sweep["chunk_size"], size))
+    index = np.unravel_index(flat_index, shape)
+    values = [grid_values(sweep["grid"], dimension)[i] for dimension, i in zip(GRID_DIMENSIONS, index)]
+    maneuvers = process_maneuver_batch(*values, sweep["optimization"])
+
+    results = np.load(os.path.join(path, "results.npy"), mmap_mode="r+")
+    for field in SWEEP_DTYPE.names:
+        results[field][flat_index] = maneuvers[field]
+    results.flush()
+    return chunk
+
+
+def run_sweep(path: str, grid: dict, optimization, chunk_size: int = 65536, workers: int = None, progress=None):
+    # starts the sweep, or resumes it if path already holds the same sweep. workers is the number of processes
+    # (default os.cpu_count()), with 1 the chunks are computed in this process
+    sweep = {"grid": grid, "optimization": int(optimization), "chunk_size": chunk_size}
+    sweep_path = os.path.join(path, "sweep.json")
+    if os.path.exists(sweep_path):
+        with open(sweep_path) as file:
+            if json.load(file) != sweep:
+                raise ValueError(f"{path} holds a different sweep")
+        done = np.load(os.path.join(path, "done.npy"), mmap_mode="r+")
+    else:
+        os.makedirs(path, exist_ok=True)
+        np.lib.format.open_memmap(os.path.join(path, "results.npy"), mode="w+", dtype=SWEEP_DTYPE,
+                                  shape=(int(np.prod(sweep_shape(grid))),)).flush()
+        done = np.lib.format.open_memmap(os.path.join(path, "done.npy"), mode="w+", dtype=bool, shape=(chunk_count(sweep),))
+        done.flush()
+        # sweep.json is written once the files exist so that a sweep interrupted here starts over
+        with open(sweep_path, "w") as file:
+            json.dump(sweep, file)
+
+    pending = np.nonzero(~done)[0].tolist()
+    workers = workers or os.cpu_count()
+
+    def finished(chunk):
+        done[chunk] = True
+        done.flush()
+        if progress is not None:
+            progress(int(done.sum()), done.size)
+
+    if workers == 1:
+        for chunk in pending:
+            finished(compute_chunk(path, sweep, chunk))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            for chunk in executor.map(compute_chunk, [path] * len(pending), [sweep] * len(pending), pending):
+                finished(chunk)
+    return load_sweep(path)
+
+
+def load_sweep(path: str):
+    # returns the description of the sweep and the memory mapped results, with one dimension per input
+    with open(os.path.join(path, "sweep.json")) as file:
+        sweep = json.load(file)
+    results = np.load(os.path.join(path, "results.npy"), mmap_mode="r")
+    return sweep, results.reshape(sweep_shape(sweep["grid"]))
+
+def is_complete(path: str) -> bool:
+    return bool(np.load(os.path.join(path, "done.npy"), mmap_mode="r").all())
+
+
+def export_npz(path: str, output: str):
+    # writes the grid values and the results of a complete sweep with the fixed inputs squeezed out, e.g. end_axis and
+    # end_ecc values and 2d total_delta_v, total_delta_t and strat_id arrays for a porkchop plot
+    if not is_complete(path):
+        raise ValueError(f"the sweep in {path} is not complete")
+    sweep, results = load_sweep(path)
+    swept = [dimension for dimension in GRID_DIMENSIONS if sweep["grid"][dimension][1] > 1]
+    arrays = {dimension: grid_values(sweep["grid"], dimension) for dimension in swept}
+    arrays.update({field: np.squeeze(results[field], axis=tuple(i for i, size in enumerate(results.shape) if size == 1))
+                   for field in SWEEP_DTYPE.names})
+    np.savez(output, **arrays)
@@ -0,0 +1,120 @@
+import json
+import math
+import os
+import numpy as np
+from .batch import ORBIT_DTYPE, MAX_ORBITS, MAX_BURNS, STRATEGY_COUNT, process_maneuver_batch
+from .utils import PLANNER_VERSION, Orbit, max_length_earth_pos
+
+# Precomputed results of process_maneuver_data over a grid of the form's inputs
+# A table is a directory with grid.json, which describes the grid, and maneuvers.npy, which holds one record per
+# grid point and is memory mapped so that looking up a result only reads that record from the disk
+# Each dimension of the grid is defined by [first value, number of values, step]. The form only allows integer
+# axes and args and eccentricities with 3 decimals so the eccentricity dimensions are in thousandths
+# grid.json also has the PLANNER_VERSION of the build (see core/utils.py), a table of another version can't be loaded
+
+GRID_DIMENSIONS = ["start_axis", "start_ecc", "start_arg", "end_axis", "end_ecc", "end_arg"]
+
+TABLE_DTYPE = np.dtype([
+    ("strat_id", "u1"),
+    ("n_orbits", "u1"),
+    ("orbits", ORBIT_DTYPE, (MAX_ORBITS,)),
+    ("burns", "i4", (MAX_BURNS,)),
+    ("max_length", "f8"),
+    ("earth_pos", "f8", (2,)),
+    ("total_delta_v_list", "i4", (STRATEGY_COUNT,)),
+    ("total_delta_t_list", "i4", (STRATEGY_COUNT,))
+])
+
+
+def grid_values(grid: dict, dimension: str):
+    first, count, step = grid[dimension]
+    values = first + step * np.arange(count)
+    return values/1000 if dimension.endswith("ecc") else values
+
+def grid_shape(grid: dict) -> tuple:
+    # last dimension is the optimization
+    return tuple(grid[dimension][1] for dimension in GRID_DIMENSIONS) + (2,)
+
+
+def build_table(path: str, grid: dict, chunk_size: int = 65536, progress=None):
+    os.makedirs(path, exist_ok=True)
+    shape = grid_shape(grid)
+    records = np.lib.format.open_memmap(os.path.join(path, "maneuvers.npy"), mode="w+", dtype=TABLE_DTYPE, shape=(int(np.prod(shape)),))
+    values = [grid_values(grid, dimension) for dimension in GRID_DIMENSIONS] + [np.arange(2)]
+
+    for chunk_start in range(0, records.size, chunk_size):
+        flat_index = np.arange(chunk_start, min(chunk_start + chunk_size, records.size))
+        index = np.unravel_index(flat_index, shape)
+        maneuvers = process_maneuver_batch(*(dimension_values[i] for dimension_values, i in zip(values, index)))
+
+        chunk = np.zeros(flat_index.size, dtype=TABLE_DTYPE)
+        for field in ["strat_id", "n_orbits", "orbits", "burns", "total_delta_v_list", "total_delta_t_list"]:
+            chunk[field] = maneuvers[field]
+        for id, maneuver in enumerate(maneuvers):
+            n_orbits = maneuver["n_orbits"]
+            orbits = [Orbit.create(*orbit[:3]) for orbit in maneuver["orbits"][:n_orbits].tolist()]
+            chunk["max_length"][id], chunk["earth_pos"][id] = max_length_earth_pos(orbits).values()
+        records[flat_index] = chunk
+
+        if progress is not None:
+            progress(flat_index[-1] + 1, records.size)
+
+    records.flush()
+    # grid.json is written last so that an interrupted build is never loaded
+    with open(os.path.join(path, "grid.json"), "w") as file:
+        json.dump({**grid, "planner_version": PLANNER_VERSION}, file)
+
+
+class ManeuverTable:
+    def __init__(self, grid: dict, records):
+        self.grid = grid
+        self.records = records
+        self.shape = grid_shape(grid)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(os.path.join(path, "grid.json")) as file:
+            grid = json.load(file)
+        if grid.pop("planner_version", None) != PLANNER_VERSION:
+            raise ValueError(f"the table {path} wasn't built by the planner version {PLANNER_VERSION}, rebuild it")
+        return cls(grid, np.load(os.path.join(path, "maneuvers.npy"), mmap_mode="r"))
+
+    def _grid_index(self, dimension: str, value):
+        first, count, step = self.grid[dimension]
+        if dimension.endswith("ecc"):
+            if not math.isfinite(value): # not in the table, the caller computes it and rejects it
+                return None
+            milli = round(value * 1000)
+            if milli/1000 != value: # eccentricity has more than 3 decimals
+                return None
+            value = milli
+        index, remainder = divmod(value - first, step)
+        return index if remainder == 0 and 0 <= index < count else None
+
+    def lookup(self, start_orbit: dict, end_orbit: dict, optimization):
+        # returns the output of process_maneuver_data, or None if the inputs are not on the grid
+        inputs = [int(start_orbit["axis"]), float(start_orbit["ecc"]), int(start_orbit["arg"]),
+                  int(end_orbit["axis"]), float(end_orbit["ecc"]), int(end_orbit["arg"])]
+        flat_index = 0
+        for dimension, value, size in zip(GRID_DIMENSIONS, inputs, self.shape):
+            index = self._grid_index(dimension, value)
+            if index is None:
+                return None
+            flat_index = flat_index * size + index
+        record = self.records[flat_index * 2 + (1 if int(optimization) else 0)]
+        return record_to_dict(record)
+
+
+def record_to_dict(record) -> dict:
+    n_orbits = int(record["n_orbits"])
+    orbits = []
+    for id, orbit in enumerate(record["orbits"][:n_orbits].tolist()):
+        orbit_dict = dict(zip(ORBIT_DTYPE.names, orbit))
+        if id == n_orbits - 1:
+            del orbit_dict["end_arg"]
+        orbits.append(orbit_dict)
+    return {"orbits": orbits, "burns": record["burns"][:n_orbits - 1].tolist(),
+            "max_length": float(record["max_length"]), "earth_pos": record["earth_pos"].tolist(),
+            "total_delta_v_list": record["total_delta_v_list"].tolist(),
+            "total_delta_t_list": record["total_delta_t_list"].tolist(),
+            "strat_id": int(record["strat_id"])}
@@ -14,6 +14,21 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(utils.standardize_angle(math.pi + 1e-16), math.pi)
         self.assertEqual(utils.standardize_angle(2 * math.pi + 3.4e-16), 2 * math.pi)
     
+    def test_same_apsis(self):
+        self.assertTrue(utils.same_apsis(12000, 12000.000000000002))
+        self.assertTrue(utils.same_apsis(12000, 12000.4))
+        self.assertFalse(utils.same_apsis(12000, 12001))
+        self.assertTrue(utils.same_apsis(1e10, 1e10 + 5)) # relative tolerance
+
+    def test_same_angle(self):
+        self.assertTrue(utils.same_angle(math.pi + 1e-12, math.pi))
+        self.assertTrue(utils.same_angle(2 * math.pi - 1e-12, 0))
+        self.assertTrue(utils.same_angle(-1e-12, 4 * math.pi))
+        self.assertFalse(utils.same_angle(1e-5, 0))
+        self.assertFalse(utils.same_angle(math.radians(1), 0))
+        self.assertEqual(utils.nonzero_arg(1e-13), 2 * math.pi)
+        self.assertEqual(utils.nonzero_arg(1), 1)
+
     def test_ellipse_bounding_box(self):
         self.assertEqual(utils.ellipse_bounding_box(10, 0, 0), [20, 20])
         self.assertEqual(utils.ellipse_bounding_box(5, 0.6, 0), [10, 8])
@@ -22,5 +37,12 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(utils.ellipse_bounding_box(5, 0.6, math.pi/2), [8, 10])
         self.assertEqual(utils.ellipse_bounding_box(5, 0.6, 3 * math.pi/2), [8, 10])
 
+    def test_rotated_ellipse_bounding_box(self):
+        # width and height of a rotated ellipse are 2 * sqrt(a^2 * cos^2 + b^2 * sin^2) and 2 * sqrt(a^2 * sin^2 + b^2 * cos^2)
+        for theta in [0.3, 1, 2, 4, 5.5]:
+            width, height = utils.ellipse_bounding_box(5, 0.6, theta)
+            self.assertAlmostEqual(width, 2 * math.sqrt(25 * math.cos(theta) ** 2 + 16 * math.sin(theta) ** 2))
+            self.assertAlmostEqual(height, 2 * math.sqrt(25 * math.sin(theta) ** 2 + 16 * math.cos(theta) ** 2))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,3 +1,977 @@
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase, TransactionTestCase, LiveServerTestCase, AsyncRequestFactory, override_settings
 
 # Create your tests here.
+import asyncio
+from importlib.util import find_spec
+from unittest import skipUnless
+import io
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+import numpy as np
+from django.urls import reverse, resolve, clear_url_caches
+from asgiref.sync import sync_to_async, iscoroutinefunction
+from django.core.management import call_command
+from .utils import process_maneuver_data, process_maneuver_pareto, plan_maneuvers, best_strategy, input_orbit, Orbit, PLANNER_VERSION
+from .batch import process_maneuver_batch, maneuver_to_dict, process_pareto_batch, pareto_to_dict, maneuver_costs
+from .cache import ResultCache, maneuver_cache, maneuver_key, cached_process_maneuver_data
+from .store import INPUT_FIELDS, result_store, prune_results
+from .models import ManeuverResult
+from .table import ManeuverTable
+from .sweep import run_sweep, load_sweep, is_complete
+from .ephemeris import maneuver_ephemeris, solve_kepler, MU
+from .packing import PACKED_CONTENT_TYPE, pack_arrays, unpack_arrays
+from .benchmarks import run_benchmarks, maneuver_workloads, startup_benchmark
+from . import utils
+from .metrics import PlannerMetrics
+from .pool import compute_pool
+from .views import submit_orbit_form_async, submit_maneuver_form_async, orbit_data_async, maneuver_data_async, maneuver_timeline_stream_async
+from .views import submit_maneuver_batch_async, submit_maneuver_pareto_async, submit_maneuver_search_async, submit_ephemeris_form_async
+from .views import submit_constellation_async
+from .timeline import maneuver_timeline, timeline_end_time
+from .urls import urlpatterns, url_patterns, use_async_views
+from .search import process_maneuver_search, TIME_TOLERANCE
+from .constellation import solve_assignment, cost_matrix, plan_constellation
+from .loadtest import request_mix, run_load, run_load_tests, parse_server, tuning_report
+
+
+def random_maneuver_inputs(count, seed=0):
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(count):
+        start_axis, end_axis = rng.randint(6531, 50000), rng.randint(6531, 50000)
+        start_ecc = rng.choice([0, round(rng.uniform(0, 1 - 6531/start_axis), 3)])
+        end_ecc = rng.choice([0, round(rng.uniform(0, 1 - 6531/end_axis), 3)])
+        inputs.append((start_axis, start_ecc, rng.randint(0, 359), end_axis, end_ecc, rng.randint(0, 359), rng.randint(0, 1)))
+    return inputs
+
+
+class TestBatch(SimpleTestCase):
+    def test_matches_process_maneuver_data(self):
+        inputs = random_maneuver_inputs(500)
+        results = process_maneuver_batch(*np.array(inputs).T)
+        for (start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization), result in zip(inputs, results):
+            expected = process_maneuver_data({"axis": start_axis, "ecc": start_ecc, "arg": start_arg},
+                                             {"axis": end_axis, "ecc": end_ecc, "arg": end_arg}, optimization)
+            self.assertEqual(maneuver_to_dict(result), expected)
+            self.assertEqual(result["total_delta_v"], expected["total_delta_v_list"][expected["strat_id"]])
+            self.assertEqual(result["total_delta_t"], expected["total_delta_t_list"][expected["strat_id"]])
+
+    def test_maneuver_costs(self):
+        inputs = np.array(random_maneuver_inputs(300, seed=2)).T
+        costs, results = maneuver_costs(*inputs), process_maneuver_batch(*inputs)
+        for field in ["strat_id", "total_delta_v", "total_delta_t"]:
+            self.assertTrue(np.array_equal(costs[field], results[field]))
+        self.assertEqual(maneuver_costs(15168, 0.569, 39, [[9660], [20000]], 0.226, [0, 137, 200], 1).shape, (2, 3))
+
+    def test_broadcasting(self):
+        results = process_maneuver_batch(15168, 0.569, 39, [9660, 20000, 30000], 0.226, 137, 1)
+        self.assertEqual(results.shape, (3,))
+        self.assertEqual(maneuver_to_dict(results[0])["strat_id"],
+                         process_maneuver_data({"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": 9660, "ecc": 0.226, "arg": 137}, 1)["strat_id"])
+
+
+def boundary_orbit_pairs(count, seed=0):
+    # orbit pairs (axis, ecc, arg in radians) where apsides or args coincide by construction, the boundary cases of
+    # the planner's comparisons
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        axis, ecc, arg = rng.randint(8000, 40000), round(rng.uniform(0, 0.15), 3), rng.randint(0, 359)
+        periapsis, apoapsis = axis * (1 - ecc), axis * (1 + ecc)
+        case = rng.randrange(6)
+        if case == 0: # same apoapsis
+            r = rng.uniform(6600, apoapsis - 100)
+            end = ((r + apoapsis)/2, (apoapsis - r)/(apoapsis + r), arg + rng.choice([0, 180, rng.randint(0, 359)]))
+        elif case == 1: # periapsis of the end orbit at the apoapsis of the start orbit
+            R = apoapsis + rng.uniform(100, 20000)
+            end = ((apoapsis + R)/2, (R - apoapsis)/(R + apoapsis), arg + rng.choice([0, 180]))
+        elif case == 2: # circle through an apsis of the start orbit
+            end = (rng.choice([periapsis, apoapsis]), 0, rng.randint(0, 359))
+        elif case == 3: # start circle, periapsis of the end orbit on it
+            ecc, R = 0, axis + rng.uniform(100, 20000)
+            end = ((axis + R)/2, (R - axis)/(R + axis), rng.randint(0, 359))
+        elif case == 4: # same orbit rotated by 180 degrees
+            end = (axis, ecc, arg + 180)
+        else: # same orbit
+            end = (axis, ecc, arg)
+        pairs.append(((axis, ecc, math.radians(arg)), (end[0], end[1], math.radians(end[2] % 360))))
+    return pairs
+
+def perturbed(rng, orbit, size):
+    # relative perturbation of the axis, absolute ones of the eccentricity (circles may become very slightly elliptic) and arg
+    axis, ecc, arg = orbit
+    return (axis * (1 + rng.uniform(-size, size)), max(ecc + rng.uniform(-size, size), 0) if ecc else rng.choice([0, rng.uniform(0, size)]),
+            arg + rng.uniform(-size, size))
+
+
+class TestTolerances(SimpleTestCase):
+    def test_stable_under_perturbations(self):
+        rng = random.Random(1)
+        pairs = boundary_orbit_pairs(400) + [((a1, e1, math.radians(g1)), (a2, e2, math.radians(g2)))
+                                             for a1, e1, g1, a2, e2, g2, _ in random_maneuver_inputs(200, seed=6)]
+        for start, end in pairs:
+            maneuvers = plan_maneuvers(Orbit.create(*start), Orbit.create(*end))
+            for size in [1e-15, 1e-12, 1e-9]:
+                perturbed_maneuvers = plan_maneuvers(Orbit.create(*perturbed(rng, start, size)), Orbit.create(*perturbed(rng, end, size)))
+                for maneuver, perturbed_maneuver in zip(maneuvers, perturbed_maneuvers):
+                    # same branches in every strategy, the burns can only move across a rounding boundary
+                    self.assertEqual(len(perturbed_maneuver.orbits), len(maneuver.orbits))
+                    self.assertTrue(all(abs(burn1 - burn2) <= 1 for burn1, burn2 in zip(maneuver.burns, perturbed_maneuver.burns)))
+                for optimization in [0, 1]:
+                    strat_id, perturbed_strat_id = best_strategy(maneuvers, optimization), best_strategy(perturbed_maneuvers, optimization)
+                    if strat_id != perturbed_strat_id: # only between strategies that are tied up to the rounding
+                        best, other = maneuvers[strat_id], maneuvers[perturbed_strat_id]
+                        self.assertLessEqual(abs(best.total_delta_v - other.total_delta_v), len(best.burns) + len(other.burns))
+                        self.assertLessEqual(abs(best.total_delta_t - other.total_delta_t), 1)
+
+    def test_batch_matches_on_boundaries(self):
+        # inputs of the form whose apsides coincide up to the precision errors, e.g. 10000 * 1.2 and 8000 * 1.5
+        inputs = []
+        for start_axis, start_ecc in [(10000, 0.2), (12000, 0), (9000, 0.5), (8000, 0.5)]:
+            for end_axis, end_ecc in [(8000, 0.5), (12000, 0), (10000, 0.2), (15000, 0.2), (18000, 0.5), (9000, 0.5)]:
+                for start_arg, end_arg in [(0, 0), (30, 30), (30, 210), (90, 270), (45, 100)]:
+                    inputs += [(start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization) for optimization in [0, 1]]
+        results = process_maneuver_batch(*np.array(inputs).T)
+        for (start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization), result in zip(inputs, results):
+            expected = process_maneuver_data({"axis": start_axis, "ecc": start_ecc, "arg": start_arg},
+                                             {"axis": end_axis, "ecc": end_ecc, "arg": end_arg}, optimization)
+            self.assertEqual(maneuver_to_dict(result), expected)
+
+
+class TestOrbitModel(SimpleTestCase):
+    def test_inputs_are_not_modified(self):
+        start_orbit, end_orbit = {"axis": "15168", "ecc": "0.569", "arg": "39"}, {"axis": "9660", "ecc": "0.226", "arg": "137"}
+        process_maneuver_data(start_orbit, end_orbit, "1")
+        self.assertEqual(start_orbit, {"axis": "15168", "ecc": "0.569", "arg": "39"})
+        self.assertEqual(end_orbit, {"axis": "9660", "ecc": "0.226", "arg": "137"})
+
+    def test_orbit(self):
+        orbit = input_orbit({"axis": 10000, "ecc": 0.2, "arg": 90})
+        self.assertEqual((orbit.periapsis, orbit.apoapsis), (8000, 12000))
+        self.assertAlmostEqual(orbit.period, 2 * np.pi * np.sqrt(1e21/MU))
+        self.assertEqual(Orbit.from_dict(orbit.to_dict()), orbit)
+        self.assertNotIn("end_arg", orbit.to_dict())
+        with self.assertRaises(AttributeError):
+            orbit.axis = 20000
+
+        # end_arg is never smaller than start_arg
+        self.assertEqual(orbit._replace(start_arg=np.pi).with_end_arg(1).end_arg, 1 + 2 * np.pi)
+
+    def test_maneuvers(self):
+        maneuvers = plan_maneuvers(input_orbit({"axis": 15168, "ecc": 0.569, "arg": 39}), input_orbit({"axis": 9660, "ecc": 0.226, "arg": 137}))
+        expected = process_maneuver_data({"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": 9660, "ecc": 0.226, "arg": 137}, 1)
+        self.assertEqual([maneuver.total_delta_v for maneuver in maneuvers], expected["total_delta_v_list"])
+        for maneuver in maneuvers:
+            self.assertEqual(len(maneuver.burns), len(maneuver.orbits) - 1)
+            self.assertEqual(maneuver.total_delta_v, sum(map(abs, maneuver.burns)))
+
+
+class TestPareto(SimpleTestCase):
+    def test_front(self):
+        for start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, _ in random_maneuver_inputs(300, seed=4):
+            start_orbit = {"axis": start_axis, "ecc": start_ecc, "arg": start_arg}
+            end_orbit = {"axis": end_axis, "ecc": end_ecc, "arg": end_arg}
+            result = process_maneuver_pareto(start_orbit, end_orbit)
+            totals = list(zip(result["total_delta_v_list"], result["total_delta_t_list"]))
+            front = [candidate["strat_id"] for candidate in result["candidates"]]
+            for strat, (delta_v, delta_t) in enumerate(totals):
+                dominated = any(v <= delta_v and t <= delta_t and (v, t) != (delta_v, delta_t) for v, t in totals)
+                self.assertTrue(dominated or (delta_v, delta_t) in [totals[id] for id in front])
+            self.assertEqual(len(set(totals[id] for id in front)), len(front))
+            for optimization, strat_id in [(1, result["fuel_strat_id"]), (0, result["time_strat_id"])]:
+                expected = process_maneuver_data(dict(start_orbit), dict(end_orbit), optimization)
+                self.assertEqual(strat_id, expected["strat_id"])
+                self.assertIn(strat_id, front)
+                candidate = result["candidates"][front.index(strat_id)]
+                self.assertEqual((candidate["orbits"], candidate["burns"]), (expected["orbits"], expected["burns"]))
+
+    def test_batch_matches_process_maneuver_pareto(self):
+        inputs = random_maneuver_inputs(500, seed=5)
+        results = process_pareto_batch(*np.array(inputs).T[:6])
+        for (start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, _), result in zip(inputs, results):
+            expected = process_maneuver_pareto({"axis": start_axis, "ecc": start_ecc, "arg": start_arg},
+                                               {"axis": end_axis, "ecc": end_ecc, "arg": end_arg})
+            self.assertEqual(pareto_to_dict(result), expected)
+
+    def test_views(self):
+        response = self.client.post(reverse("submit_maneuver_pareto"), TestEphemeris.maneuver_form)
+        expected = process_maneuver_pareto({"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": 9660, "ecc": 0.226, "arg": 137})
+        self.assertEqual(response.json(), json.loads(json.dumps(expected)))
+
+        maneuver = {"start_orbit": {"axis": 15168, "ecc": 0.569, "arg": 39}, "end_orbit": {"axis": 9660, "ecc": 0.226, "arg": 137}}
+        response = self.client.post(reverse("submit_maneuver_batch") + "?pareto=1", json.dumps([maneuver] * 2), content_type="application/json")
+        results = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([result.pop("index") for result in results], [0, 1])
+        self.assertEqual(results[1], json.loads(json.dumps(expected)))
+
+
+class TestManeuverBatchView(SimpleTestCase):
+    maneuver = {"start_orbit": {"axis": 15168, "ecc": 0.569, "arg": 39}, "end_orbit": {"axis": 9660, "ecc": 0.226, "arg": 137}, "optimization": 1}
+
+    def read_ndjson(self, response):
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_json_array(self):
+        response = self.client.post(reverse("submit_maneuver_batch"), json.dumps([self.maneuver] * 3), content_type="application/json")
+        results = self.read_ndjson(response)
+        expected = process_maneuver_data(dict(self.maneuver["start_orbit"]), dict(self.maneuver["end_orbit"]), 1)
+        self.assertEqual([result.pop("index") for result in results], [0, 1, 2])
+        self.assertEqual(results[0], json.loads(json.dumps(expected)))
+
+    def test_ndjson_with_invalid_lines(self):
+        body = "\n".join([json.dumps(self.maneuver), "not json", json.dumps({"start_orbit": {}}), json.dumps(self.maneuver)])
+        response = self.client.post(reverse("submit_maneuver_batch"), body, content_type="application/x-ndjson")
+        results = self.read_ndjson(response)
+        self.assertEqual([("error" in result) for result in results], [False, True, True, False])
+        self.assertEqual(results[3]["index"], 3)
+
+    def test_out_of_range_orbits(self):
+        # each invalid orbit is an error of its own item, the valid items around it are still computed
+        invalid = [{"axis": 15168, "ecc": 1}, {"axis": 0, "ecc": 0.2}, {"axis": -5, "ecc": 0.2}, {"axis": 15168, "ecc": -0.1},
+                   {"axis": 15168, "ecc": math.nan}, {"axis": 15168, "ecc": 0.2, "arg": math.inf}]
+        maneuvers = [self.maneuver]
+        for orbit in invalid:
+            maneuvers += [{**self.maneuver, "end_orbit": {"arg": 0, **orbit}}, self.maneuver]
+        response = self.client.post(reverse("submit_maneuver_batch"), json.dumps(maneuvers), content_type="application/json")
+        results = self.read_ndjson(response)
+        self.assertEqual([result["index"] for result in results], list(range(len(maneuvers))))
+        self.assertEqual([("error" in result) for result in results], [False] + [True, False] * len(invalid))
+
+    def test_invalid_body(self):
+        response = self.client.post(reverse("submit_maneuver_batch"), "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestResultCache(SimpleTestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = ResultCache("test", maxsize=2)
+        calls = []
+        def compute(value):
+            calls.append(value)
+            return {"value": [value]}
+
+        cache.get_or_compute((1,), lambda: compute(1))
+        cache.get_or_compute((2,), lambda: compute(2))
+        cache.get_or_compute((1,), lambda: compute(1)) # (2,) is now the least recently used
+        cache.get_or_compute((3,), lambda: compute(3))
+        cache.get_or_compute((2,), lambda: compute(2))
+        self.assertEqual(calls, [1, 2, 3, 2])
+        self.assertEqual(cache.info(), {"hits": 1, "misses": 4, "evictions": 2, "size": 2, "maxsize": 2})
+
+    def test_defensive_copies(self):
+        cache = ResultCache("test", maxsize=2)
+        cache.get_or_compute((1,), lambda: {"value": [1]})["value"].append(2)
+        cache.get_or_compute((1,), lambda: {"value": [1]})["value"].append(3)
+        self.assertEqual(cache.get_or_compute((1,), lambda: {"value": [1]}), {"value": [1]})
+
+    @override_settings(CACHES={"shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_shared_backend(self):
+        worker_1 = ResultCache("test", maxsize=2, backend_alias="shared")
+        worker_2 = ResultCache("test", maxsize=2, backend_alias="shared")
+        worker_1.get_or_compute((1,), lambda: {"value": 1})
+        self.assertEqual(worker_2.get_or_compute((1,), lambda: {"value": 2}), {"value": 1})
+        self.assertEqual(worker_2.info()["hits"], 1)
+
+    def test_disabled(self):
+        cache = ResultCache("test", maxsize=0)
+        cache.get_or_compute((1,), lambda: {"value": 1})
+        self.assertEqual(cache.info()["size"], 0)
+
+
+class TestResultStore(TransactionTestCase):
+    # TransactionTestCase since the results are written by the thread of the store, with its own connection
+    def setUp(self):
+        maneuver_cache.clear()
+        result_store.enabled = True
+        result_store.flush_interval = 0.01
+
+    def tearDown(self):
+        maneuver_cache.clear()
+        result_store.enabled = False
+        result_store.flush_interval = 1.0
+
+    def test_write_behind_and_read_through(self):
+        start_orbit, end_orbit = {"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": 9660, "ecc": 0.226, "arg": 137}
+        processed_data = cached_process_maneuver_data(start_orbit, end_orbit, 1)
+        cached_process_maneuver_data(start_orbit, end_orbit, 1) # from maneuver_cache, not stored twice
+        result_store.flush()
+        self.assertEqual(ManeuverResult.objects.count(), 1)
+        key = maneuver_key(start_orbit, end_orbit, 1)
+        self.assertEqual(result_store.get(key), json.loads(json.dumps(processed_data)))
+
+        # another worker, or this one after a restart, reads the stored result instead of computing it
+        maneuver_cache.clear()
+        ManeuverResult.objects.update(data={"stored": True})
+        self.assertEqual(cached_process_maneuver_data(start_orbit, end_orbit, 1), {"stored": True})
+
+    def test_duplicates_and_pruning(self):
+        for axis in range(8000, 8005):
+            result_store.put((axis, 0.1, 0, 9000, 0.2, 0, 1), {"axis": axis})
+        result_store.put((8000, 0.1, 0, 9000, 0.2, 0, 1), {"axis": 8000})
+        result_store.flush()
+        self.assertEqual(ManeuverResult.objects.count(), 5)
+        self.assertEqual(prune_results(2), 3)
+        self.assertEqual(sorted(ManeuverResult.objects.values_list("start_axis", flat=True)), [8003, 8004])
+        self.assertEqual(prune_results(2), 0)
+
+    def test_planner_version(self):
+        # the results of another planner version are never read and are pruned
+        key = (8000, 0.1, 0, 9000, 0.2, 0, 1)
+        ManeuverResult.objects.create(**dict(zip(INPUT_FIELDS, key)), planner_version=PLANNER_VERSION - 1, data={"old": True})
+        self.assertIsNone(result_store.get(key))
+        result_store.put(key, {"new": True})
+        result_store.flush()
+        self.assertEqual(result_store.get(key), {"new": True})
+        self.assertEqual(prune_results(2), 1)
+        self.assertEqual(list(ManeuverResult.objects.values_list("planner_version", flat=True)), [PLANNER_VERSION])
+
+
+class TestManeuverTable(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        call_command("precompute_maneuvers", cls.directory.name, "--start-axis", "7000", "27000", "10000", "--start-ecc", "0", "0.5", "0.25",
+                     "--start-arg", "0", "180", "90", "--end-axis", "9660", "9660", "1", "--end-ecc", "0", "0.226", "0.226",
+                     "--end-arg", "137", "317", "180", stdout=io.StringIO())
+        cls.table = ManeuverTable.load(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def test_lookup_matches_process_maneuver_data(self):
+        for start_axis in [7000, 17000, 27000]:
+            for start_ecc in [0, 0.25, 0.5]:
+                for end_ecc, end_arg, optimization in [(0, 137, 0), (0.226, 317, 1), (0.226, 137, 0)]:
+                    start_orbit = {"axis": start_axis, "ecc": start_ecc, "arg": 90}
+                    end_orbit = {"axis": 9660, "ecc": end_ecc, "arg": end_arg}
+                    self.assertEqual(self.table.lookup(start_orbit, end_orbit, optimization),
+                                     process_maneuver_data(dict(start_orbit), dict(end_orbit), optimization))
+
+    def test_off_grid(self):
+        end_orbit = {"axis": 9660, "ecc": 0.226, "arg": 137}
+        self.assertIsNone(self.table.lookup({"axis": 7001, "ecc": 0.25, "arg": 90}, end_orbit, 1))
+        self.assertIsNone(self.table.lookup({"axis": 7000, "ecc": 0.2501, "arg": 90}, end_orbit, 1))
+        self.assertIsNone(self.table.lookup({"axis": 7000, "ecc": 0.25, "arg": 270}, end_orbit, 1))
+        for ecc in [math.nan, math.inf, -math.inf]:
+            self.assertIsNone(self.table.lookup({"axis": 7000, "ecc": ecc, "arg": 90}, end_orbit, 1))
+
+    def test_planner_version(self):
+        with open(os.path.join(self.directory.name, "grid.json")) as file:
+            grid = json.load(file)
+        self.assertEqual(grid["planner_version"], PLANNER_VERSION)
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copy(os.path.join(self.directory.name, "maneuvers.npy"), directory)
+            with open(os.path.join(directory, "grid.json"), "w") as file:
+                json.dump({**grid, "planner_version": PLANNER_VERSION - 1}, file)
+            with self.assertRaises(ValueError):
+                ManeuverTable.load(directory)
+
+
+class TestSweep(SimpleTestCase):
+    grid = {"start_axis": [15168, 1, 1], "start_ecc": [569, 1, 1], "start_arg": [39, 1, 1],
+            "end_axis": [7000, 5, 5000], "end_ecc": [0, 4, 100], "end_arg": [137, 1, 1]}
+
+    def test_matches_process_maneuver_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "sweep.npz")
+            call_command("sweep_maneuvers", directory, "--end-axis", "7000", "27000", "5000", "--end-ecc", "0", "0.3", "0.1",
+                         "--chunk-size", "7", "--workers", "2", "--npz", output, stdout=io.StringIO())
+            sweep, results = load_sweep(directory)
+            self.assertEqual(sweep["grid"], self.grid)
+            self.assertEqual(results.shape, (1, 1, 1, 5, 4, 1))
+            for i, end_axis in enumerate(range(7000, 27001, 5000)):
+                for j, end_ecc in enumerate([0, 0.1, 0.2, 0.3]):
+                    expected = process_maneuver_data({"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": end_axis, "ecc": end_ecc, "arg": 137}, 1)
+                    self.assertEqual(results[0, 0, 0, i, j, 0]["strat_id"], expected["strat_id"])
+                    self.assertEqual(results[0, 0, 0, i, j, 0]["total_delta_v_list"].tolist(), expected["total_delta_v_list"])
+
+            with np.load(output) as arrays:
+                self.assertEqual(arrays["end_axis"].tolist(), list(range(7000, 27001, 5000)))
+                self.assertEqual(arrays["total_delta_v"].shape, (5, 4))
+                self.assertTrue(np.array_equal(arrays["total_delta_v"], results["total_delta_v"][0, 0, 0, :, :, 0]))
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            run_sweep(directory, self.grid, 1, chunk_size=6, workers=1)
+            expected = np.array(load_sweep(directory)[1])
+
+            # an interrupted sweep: some chunks are not done and their results are missing
+            done = np.load(os.path.join(directory, "done.npy"), mmap_mode="r+")
+            done[1::2] = False
+            done.flush()
+            results = np.load(os.path.join(directory, "results.npy"), mmap_mode="r+")
+            results[6:12] = np.zeros(6, dtype=results.dtype)
+            results.flush()
+            self.assertFalse(is_complete(directory))
+
+            progress = []
+            _, resumed = run_sweep(directory, self.grid, 1, chunk_size=6, workers=1, progress=lambda done, total: progress.append(done))
+            self.assertEqual(progress, [3, 4])
+            self.assertTrue(np.array_equal(resumed, expected))
+            with self.assertRaises(ValueError):
+                run_sweep(directory, self.grid, 0, chunk_size=6, workers=1)
+
+
+class TestEphemeris(SimpleTestCase):
+    maneuver_form = {"maneuver-axis-1-value": "15168", "maneuver-ecc-1-value": "0.569", "maneuver-arg-1-value": "39", "maneuver-axis-2-value": "9660",
+                     "maneuver-ecc-2-value": "0.226", "maneuver-arg-2-value": "137", "optimization-toggle": "1"}
+
+    def test_solve_kepler(self):
+        mean_anomaly = np.linspace(0, 20, 10001)
+        for ecc in [0, 0.3, 0.869]:
+            E, iterations = solve_kepler(mean_anomaly, ecc)
+            self.assertLess(np.abs(E - ecc * np.sin(E) - np.mod(mean_anomaly, 2 * np.pi)).max(), 1e-14)
+            self.assertLess(iterations, 50)
+
+    def test_maneuver_ephemeris(self):
+        for start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization in random_maneuver_inputs(50, seed=1):
+            orbits = process_maneuver_data({"axis": start_axis, "ecc": start_ecc, "arg": start_arg},
+                                           {"axis": end_axis, "ecc": end_ecc, "arg": end_arg}, optimization)["orbits"]
+            ephemeris = maneuver_ephemeris(orbits, step=600)
+
+            # vis-viva: the samples are on their orbits
+            r = np.linalg.norm(ephemeris["position"], axis=1) * 1000
+            v = np.linalg.norm(ephemeris["velocity"], axis=1)
+            axis = np.array([orbit["axis"] for orbit in orbits])[ephemeris["orbit_id"]] * 1000
+            np.testing.assert_allclose(v ** 2/2 - MU/r, -MU/(2 * axis), rtol=1e-9)
+
+            # the satellite doesn't jump when it switches orbit
+            before = maneuver_ephemeris(orbits, times=ephemeris["burn_times"] - 1e-3)["position"]
+            after = maneuver_ephemeris(orbits, times=ephemeris["burn_times"])["position"]
+            self.assertLess(np.abs(before - after).max(), 0.1)
+
+    def test_view(self):
+        response = self.client.post(reverse("submit_ephemeris_form"), {**self.maneuver_form, "ephemeris-step": "3600"})
+        data = response.json()
+        self.assertEqual(len(data["ephemeris"]["t"]), len(data["ephemeris"]["position"]))
+        self.assertEqual(data["ephemeris"]["t"][1], 3600)
+
+    def test_invalid_view_inputs(self):
+        for fields in [{"ephemeris-step": "abc"}, {"ephemeris-step": "nan"}, {"maneuver-axis-2-value": "0"}, {"maneuver-ecc-2-value": "1"}]:
+            response = self.client.post(reverse("submit_ephemeris_form"), {**self.maneuver_form, **fields})
+            self.assertEqual(response.status_code, 400)
+
+    @override_settings(EPHEMERIS_MAX_SAMPLES=50)
+    def test_max_samples(self):
+        data = self.client.post(reverse("submit_ephemeris_form"), {**self.maneuver_form, "ephemeris-step": "1"}).json()
+        self.assertLessEqual(len(data["ephemeris"]["t"]), 50)
+        # the samples still cover the whole maneuver and one period of the end orbit
+        self.assertGreater(data["ephemeris"]["t"][-1], data["ephemeris"]["burn_times"][-1])
+
+
+def parse_server_sent_events(content: str) -> list:
+    events = []
+    for block in content.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestTimeline(SimpleTestCase):
+    query = "start_axis=15168&start_ecc=0.569&start_arg=39&end_axis=9660&end_ecc=0.226&end_arg=137&optimization=1"
+
+    def setUp(self):
+        self.processed_data = process_maneuver_data({"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": 9660, "ecc": 0.226, "arg": 137}, 1)
+
+    def test_same_states_as_ephemeris(self):
+        events = list(maneuver_timeline(self.processed_data, 60))
+        states = [event for event in events if event["type"] == "state"]
+        ephemeris = maneuver_ephemeris(self.processed_data["orbits"], 60, times=[state["t"] for state in states])
+        self.assertTrue(np.allclose([state["position"] for state in states], ephemeris["position"], rtol=0, atol=1e-6))
+        self.assertTrue(np.allclose([state["velocity"] for state in states], ephemeris["velocity"], rtol=0, atol=1e-9))
+        self.assertEqual([state["orbit_id"] for state in states], ephemeris["orbit_id"].tolist())
+        burns = [event for event in events if event["type"] == "burn"]
+        self.assertTrue(np.allclose([burn["t"] for burn in burns], ephemeris["burn_times"]))
+        self.assertEqual([burn["delta_v"] for burn in burns], self.processed_data["burns"])
+
+    def test_order(self):
+        events = list(maneuver_timeline(self.processed_data, 600))
+        self.assertEqual([event["type"] for event in events if event["type"] != "state"],
+                         ["orbit"] + ["burn", "orbit"] * len(self.processed_data["burns"]) + ["end"])
+        times = [event["t"] for event in events]
+        self.assertEqual(times, sorted(times))
+
+    def test_lazy(self):
+        # a thousand years in the end orbit sampled every second, only the first events are generated
+        events = maneuver_timeline(self.processed_data, 1, end_orbit_duration=1000 * 365 * 24 * 3600)
+        self.assertEqual([next(events)["type"] for _ in range(3)], ["orbit", "state", "state"])
+
+    def test_stream(self):
+        response = self.client.get(reverse("maneuver_timeline") + "?" + self.query + "&step=600&time_scale=0")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = parse_server_sent_events(b"".join(response.streaming_content).decode())
+        self.assertEqual(events, [(event["type"], json.loads(json.dumps(event))) for event in maneuver_timeline(self.processed_data, 600)])
+
+    def test_time_scale(self):
+        # the maneuver and one period in the end orbit take about 11 h, streamed at 4 days/s
+        start = time.monotonic()
+        response = self.client.get(reverse("maneuver_timeline") + "?" + self.query + "&step=36000&time_scale=345600")
+        events = parse_server_sent_events(b"".join(response.streaming_content).decode())
+        self.assertGreaterEqual(time.monotonic() - start, events[-1][1]["t"]/345600)
+
+    @override_settings(TIMELINE_MAX_DURATION=0.2)
+    def test_max_duration(self):
+        # the sync view streams the 11 h of the maneuver in 0.2 s instead of 11 s at 1 h/s
+        start = time.monotonic()
+        response = self.client.get(reverse("maneuver_timeline") + "?" + self.query + "&step=600&time_scale=3600")
+        events = parse_server_sent_events(b"".join(response.streaming_content).decode())
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(events[-1][1]["t"], timeline_end_time(self.processed_data))
+
+    def test_invalid_query(self):
+        for query in ["start_axis=15168", self.query + "&time_scale=-1", self.query + "&step=nan"]:
+            self.assertEqual(self.client.get(reverse("maneuver_timeline") + "?" + query).status_code, 400)
+
+
+class TestPacking(SimpleTestCase):
+    def test_round_trip(self):
+        arrays = {"scalar": 1.5, "vector": [1, 2, 3], "matrix": np.arange(6.0).reshape(3, 2), "empty": np.zeros((0, 2))}
+        unpacked = unpack_arrays(pack_arrays(arrays))
+        self.assertEqual(list(unpacked), list(arrays))
+        for name, array in arrays.items():
+            np.testing.assert_array_equal(unpacked[name], array)
+
+    def test_maneuver_form(self):
+        json_response = self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form)
+        packed_response = self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form, HTTP_ACCEPT=PACKED_CONTENT_TYPE)
+        self.assertEqual(json_response["Content-Type"], "application/json")
+        self.assertEqual(packed_response["Content-Type"], PACKED_CONTENT_TYPE)
+        self.assertIn("Accept", packed_response["Vary"])
+
+        data = json_response.json()
+        arrays = unpack_arrays(packed_response.content)
+        self.assertEqual(arrays["burns"].tolist(), data["burns"])
+        self.assertEqual(arrays["strat_id"], data["strat_id"])
+        self.assertEqual(arrays["orbits"][:, 0].tolist(), [orbit["axis"] for orbit in data["orbits"]])
+
+    def test_ephemeris_form(self):
+        form = {**TestEphemeris.maneuver_form, "ephemeris-step": "600"}
+        data = self.client.post(reverse("submit_ephemeris_form"), form).json()
+        arrays = unpack_arrays(self.client.post(reverse("submit_ephemeris_form"), form, HTTP_ACCEPT=PACKED_CONTENT_TYPE).content)
+        self.assertEqual(arrays["ephemeris_position"].tolist(), data["ephemeris"]["position"])
+
+
+class TestCacheableViews(SimpleTestCase):
+    query = "start_axis=15168&start_ecc=0.569&start_arg=39&end_axis=9660&end_ecc=0.226&end_arg=137&optimization=1"
+
+    def test_maneuver_data(self):
+        response = self.client.get(reverse("maneuver_data") + "?" + self.query)
+        expected = self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+        self.assertIn("Accept", response["Vary"])
+        self.assertFalse(response["ETag"].startswith("W/"))
+
+        packed = self.client.get(reverse("maneuver_data") + "?" + self.query, HTTP_ACCEPT=PACKED_CONTENT_TYPE)
+        self.assertEqual(packed.content, self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form,
+                                                          HTTP_ACCEPT=PACKED_CONTENT_TYPE).content)
+        self.assertNotEqual(packed["ETag"], response["ETag"])
+
+        not_modified = self.client.get(reverse("maneuver_data") + "?" + self.query, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+
+    def test_orbit_data(self):
+        response = self.client.get(reverse("orbit_data") + "?axis=15168&ecc=0&arg=39")
+        expected = self.client.post(reverse("submit_orbit_form"), {"orbit-axis-value": "15168", "orbit-ecc-value": "0", "orbit-arg-value": "39"})
+        self.assertEqual(response.json(), expected.json())
+        self.assertIn("ETag", response)
+
+    def test_canonical_query(self):
+        response = self.client.get(reverse("orbit_data") + "?arg=39&ecc=0.50&axis=15168&extra=1")
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], reverse("orbit_data") + "?axis=15168&ecc=0.5&arg=39")
+        self.assertIn("max-age", response["Cache-Control"])
+
+    def test_invalid_query(self):
+        for query in ["axis=15168&ecc=0.5", "axis=15168.5&ecc=0.5&arg=39", "axis=15168&ecc=nan&arg=39"]:
+            self.assertEqual(self.client.get(reverse("orbit_data") + "?" + query).status_code, 400)
+        self.assertEqual(self.client.get(reverse("maneuver_data") + "?" + self.query.replace("optimization=1", "optimization=2")).status_code, 400)
+        self.assertEqual(self.client.post(reverse("maneuver_data") + "?" + self.query).status_code, 405)
+
+    def test_out_of_range_query(self):
+        # orbits the planner can't compute, the canonical spelling would be redirected first
+        for axis, ecc in [(15168, 1), (15168, 2), (15168, -0.1), (0, 0.5), (-5, 0.5)]:
+            response = self.client.get(reverse("orbit_data") + f"?axis={axis}&ecc={ecc}&arg=39")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.json())
+            self.assertNotIn("Cache-Control", response)
+            query = self.query.replace("end_axis=9660&end_ecc=0.226", f"end_axis={axis}&end_ecc={ecc}")
+            self.assertEqual(self.client.get(reverse("maneuver_data") + "?" + query).status_code, 400)
+            self.assertEqual(self.client.get(reverse("maneuver_timeline") + "?" + query).status_code, 400)
+
+
+class TestBenchmarks(SimpleTestCase):
+    def test_workloads_are_seeded(self):
+        self.assertEqual(maneuver_workloads(5, seed=3), maneuver_workloads(5, seed=3))
+        self.assertNotEqual(maneuver_workloads(5, seed=3), maneuver_workloads(5, seed=4))
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(count=3)
+        self.assertEqual(results["process_maneuver_data/circular/fuel"]["calls"], 3)
+        self.assertEqual(results["http/submit_maneuver_form/equal_orbits/time"]["calls"], 3)
+        self.assertGreater(results["process_orbit_data"]["p99_us"], 0)
+
+    def test_startup_without_numpy(self):
+        # the workers boot and load the views with the standard library only, numpy is imported lazily
+        results = startup_benchmark(repeat=1)
+        self.assertEqual(results["heavy_modules"], [])
+        self.assertGreater(results["max_rss_kb"], 0)
+
+
+class TestMetrics(SimpleTestCase):
+    def setUp(self):
+        maneuver_cache.clear()
+        utils.instrumentation = PlannerMetrics()
+
+    def tearDown(self):
+        maneuver_cache.clear()
+        utils.instrumentation = None
+
+    def test_same_results(self):
+        for start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization in random_maneuver_inputs(50):
+            start_orbit, end_orbit = {"axis": start_axis, "ecc": start_ecc, "arg": start_arg}, {"axis": end_axis, "ecc": end_ecc, "arg": end_arg}
+            instrumented = process_maneuver_data(start_orbit, end_orbit, optimization)
+            utils.instrumentation, metrics = None, utils.instrumentation
+            self.assertEqual(instrumented, process_maneuver_data(start_orbit, end_orbit, optimization))
+            utils.instrumentation = metrics
+        self.assertEqual(sum(utils.instrumentation.selected), 50)
+        self.assertEqual(sum(utils.instrumentation.strategies[0].counts), 50)
+
+    def test_metrics_endpoint(self):
+        self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form)
+        lines = self.client.get(reverse("metrics")).content.decode().splitlines()
+        self.assertIn('planner_phase_seconds_count{phase="strategies"} 1', lines)
+        self.assertIn('planner_phase_seconds_bucket{phase="selection",le="+Inf"} 1', lines)
+        self.assertIn('result_cache_misses_total{cache="maneuver"} 1', lines)
+
+    def test_server_timing(self):
+        response = self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form)
+        self.assertNotIn("Server-Timing", response)
+
+        response = self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form, HTTP_X_PLANNER_TIMING="1")
+        self.assertEqual(response["Server-Timing"].split(";")[0], "total") # cached result
+
+        maneuver_cache.clear()
+        with override_settings(PLANNER_TIMING=True):
+            response = self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form)
+        names = [timing.split(";")[0] for timing in response["Server-Timing"].split(", ")]
+        self.assertEqual(names, ["strategies", "selection", "max_length_earth_pos"] + [f"strategy-{strat}" for strat in range(8)] + ["total"])
+
+        utils.instrumentation = None
+        with override_settings(PLANNER_TIMING=True):
+            response = self.client.post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form)
+        self.assertNotIn("Server-Timing", response)
+
+
+class TestAsyncViews(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        compute_pool.workers = 2
+        compute_pool.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        compute_pool.shutdown()
+        super().tearDownClass()
+
+    def setUp(self):
+        maneuver_cache.clear()
+        compute_pool.rejected = 0
+
+    async def test_maneuver_form(self):
+        request = AsyncRequestFactory().post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form)
+        response = await submit_maneuver_form_async(request)
+        self.assertEqual(json.loads(response.content), process_maneuver_data(
+            {"axis": 15168, "ecc": 0.569, "arg": 39}, {"axis": 9660, "ecc": 0.226, "arg": 137}, 1))
+        self.assertEqual(compute_pool.info()["pending"], 0)
+
+    async def test_planner_metrics(self):
+        # the planner runs in the pool's processes, its timings are recorded by this process
+        utils.instrumentation = PlannerMetrics()
+        try:
+            request = AsyncRequestFactory().post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form, headers={"X-Planner-Timing": "1"})
+            response = await submit_maneuver_form_async(request)
+            metrics = utils.instrumentation
+        finally:
+            utils.instrumentation = None
+        names = [timing.split(";")[0] for timing in response["Server-Timing"].split(", ")]
+        self.assertEqual(names, ["strategies", "selection", "max_length_earth_pos"] + [f"strategy-{strat}" for strat in range(8)] + ["total"])
+        self.assertEqual(sum(metrics.selected), 1)
+        self.assertEqual(sum(metrics.phases["strategies"].counts), 1)
+
+    async def test_orbit_form(self):
+        request = AsyncRequestFactory().post(reverse("submit_orbit_form"), {"orbit-axis-value": "10000", "orbit-ecc-value": "0.2", "orbit-arg-value": "45"})
+        response = await submit_orbit_form_async(request)
+        self.assertIn("max_length", json.loads(response.content))
+
+    async def test_get_views(self):
+        request = AsyncRequestFactory().get(reverse("maneuver_data") + "?" + TestCacheableViews.query)
+        response = await maneuver_data_async(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+        expected = await sync_to_async(self.client.get)(reverse("maneuver_data") + "?" + TestCacheableViews.query)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response["ETag"], expected["ETag"])
+
+        request = AsyncRequestFactory().get(reverse("orbit_data") + "?arg=39&ecc=0.50&axis=15168")
+        self.assertEqual((await orbit_data_async(request)).status_code, 301)
+        request = AsyncRequestFactory().get(reverse("orbit_data") + "?axis=15168&ecc=1&arg=39")
+        self.assertEqual((await orbit_data_async(request)).status_code, 400)
+        request = AsyncRequestFactory().get(reverse("orbit_data") + "?axis=15168&ecc=0.5&arg=39")
+        self.assertIn("max_length", json.loads((await orbit_data_async(request)).content))
+
+    async def test_timeline_stream(self):
+        request = AsyncRequestFactory().get(reverse("maneuver_timeline") + "?" + TestTimeline.query + "&step=600&time_scale=0")
+        response = await maneuver_timeline_stream_async(request)
+        content = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(parse_server_sent_events(content)[-1][0], "end")
+
+    async def test_start_when_running(self):
+        # the processes are started in a thread, the event loop keeps running meanwhile
+        compute_pool.shutdown()
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while not compute_pool.started:
+                ticks += 1
+                await asyncio.sleep(0.001)
+        ticker = asyncio.create_task(tick())
+        self.assertEqual(await compute_pool.run(abs, -1), 1)
+        await ticker
+        self.assertGreater(ticks, 1)
+
+    def test_use_async_views(self):
+        self.assertFalse(iscoroutinefunction(resolve(reverse("maneuver_data")).func))
+        try:
+            use_async_views()
+            self.assertTrue(iscoroutinefunction(resolve(reverse("maneuver_data")).func))
+            self.assertTrue(iscoroutinefunction(resolve(reverse("submit_maneuver_form")).func))
+            self.assertTrue(iscoroutinefunction(resolve(reverse("submit_maneuver_batch")).func))
+            for name in ["submit_maneuver_pareto", "submit_maneuver_search", "submit_ephemeris_form", "submit_constellation"]:
+                self.assertTrue(iscoroutinefunction(resolve(reverse(name)).func))
+            self.assertFalse(iscoroutinefunction(resolve(reverse("metrics")).func))
+        finally:
+            urlpatterns[:] = url_patterns()
+            clear_url_caches()
+
+    async def test_backpressure(self):
+        max_pending, compute_pool.max_pending = compute_pool.max_pending, 0
+        try:
+            request = AsyncRequestFactory().post(reverse("submit_maneuver_form"), TestEphemeris.maneuver_form)
+            response = await submit_maneuver_form_async(request)
+        finally:
+            compute_pool.max_pending = max_pending
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    async def test_maneuver_batch(self):
+        # 600 maneuvers are 3 chunks computed by the pool, same results as the sync view
+        maneuvers = [TestManeuverBatchView.maneuver, {"start_orbit": {}}] * 300
+        request = AsyncRequestFactory().post(reverse("submit_maneuver_batch") + "?pareto=1", json.dumps(maneuvers), content_type="application/json")
+        response = await submit_maneuver_batch_async(request)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        expected = await sync_to_async(self.client.post)(reverse("submit_maneuver_batch") + "?pareto=1", json.dumps(maneuvers), content_type="application/json")
+        self.assertEqual(content, b"".join(expected.streaming_content))
+        self.assertEqual(len(content.splitlines()), 600)
+        self.assertEqual(compute_pool.info()["pending"], 0)
+
+        max_pending, compute_pool.max_pending = compute_pool.max_pending, 0
+        try:
+            request = AsyncRequestFactory().post(reverse("submit_maneuver_batch"), json.dumps(maneuvers), content_type="application/json")
+            self.assertEqual((await submit_maneuver_batch_async(request)).status_code, 503)
+        finally:
+            compute_pool.max_pending = max_pending
+
+    async def test_pool_views(self):
+        # same responses as the sync views, and 503 when the pool is full
+        search_form = dict(TestEphemeris.maneuver_form, **{"maneuver-anomaly-2-value": "90"})
+        satellites = [{"axis": axis, "ecc": ecc, "arg": arg} for axis, ecc, arg, *_ in random_maneuver_inputs(20, 5)]
+        constellation = json.dumps({"satellites": satellites[:10], "slots": satellites[10:], "optimization": 1})
+        requests = [(submit_maneuver_pareto_async, "submit_maneuver_pareto", TestEphemeris.maneuver_form, None),
+                    (submit_maneuver_search_async, "submit_maneuver_search", search_form, None),
+                    (submit_maneuver_search_async, "submit_maneuver_search", dict(search_form, **{"arrival-time-value": "100"}), None),
+                    (submit_ephemeris_form_async, "submit_ephemeris_form", dict(TestEphemeris.maneuver_form, **{"ephemeris-step": "600"}), None),
+                    (submit_ephemeris_form_async, "submit_ephemeris_form", dict(TestEphemeris.maneuver_form, **{"ephemeris-step": "nan"}), None),
+                    (submit_constellation_async, "submit_constellation", constellation, "application/json")]
+        for view, name, data, content_type in requests:
+            extra = {} if content_type is None else {"content_type": content_type}
+            response = await view(AsyncRequestFactory().post(reverse(name), data, **extra))
+            expected = await sync_to_async(self.client.post)(reverse(name), data, **extra)
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+
+        maneuver_cache.clear()
+        max_pending, compute_pool.max_pending = compute_pool.max_pending, 0
+        try:
+            for view, name, data, content_type in requests[:2] + requests[3:4] + requests[5:]:
+                extra = {} if content_type is None else {"content_type": content_type}
+                self.assertEqual((await view(AsyncRequestFactory().post(reverse(name), data, **extra))).status_code, 503)
+        finally:
+            compute_pool.max_pending = max_pending
+
+    async def test_get_view_backpressure(self):
+        max_pending, compute_pool.max_pending = compute_pool.max_pending, 0
+        try:
+            request = AsyncRequestFactory().get(reverse("maneuver_data") + "?" + TestCacheableViews.query)
+            response = await maneuver_data_async(request)
+        finally:
+            compute_pool.max_pending = max_pending
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn("Cache-Control", response)
+        self.assertEqual(compute_pool.info()["rejected"], 1)
+
+
+class TestConstellation(SimpleTestCase):
+    def orbits(self, count, seed):
+        return [{"axis": axis, "ecc": ecc, "arg": arg} for axis, ecc, arg, *_ in random_maneuver_inputs(count, seed)]
+
+    def test_assignment_is_optimal(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            n = int(rng.integers(1, 7))
+            cost, tie_cost = rng.integers(0, 5, (n, n)), rng.integers(0, 100, (n, n))
+            best = min(itertools.permutations(range(n)), key=lambda columns: (sum(cost[range(n), columns]), sum(tie_cost[range(n), columns])))
+            columns = solve_assignment(cost, tie_cost)
+            self.assertEqual(sorted(columns), list(range(n)))
+            self.assertEqual((cost[range(n), columns].sum(), tie_cost[range(n), columns].sum()),
+                             (cost[range(n), best].sum(), tie_cost[range(n), best].sum()))
+
+    def test_same_maneuvers_as_process_maneuver_data(self):
+        satellites, slots = self.orbits(5, 1), self.orbits(5, 2)
+        for optimization in [0, 1]:
+            plans = {columns: [process_maneuver_data(dict(satellite), dict(slots[slot]), optimization) for satellite, slot in zip(satellites, columns)]
+                     for columns in itertools.permutations(range(5))}
+            first, second = ("total_delta_v", "total_delta_t") if optimization else ("total_delta_t", "total_delta_v")
+            totals = {columns: tuple(sum(plan[total + "_list"][plan["strat_id"]] for plan in maneuvers) for total in (first, second))
+                      for columns, maneuvers in plans.items()}
+            result = plan_constellation(satellites, slots, optimization, workers=1)
+            self.assertEqual(totals[tuple(result["slots"])], min(totals.values()))
+            self.assertEqual(result["maneuvers"], plans[tuple(result["slots"])])
+
+    def test_parallel_costs(self):
+        satellites, slots = self.orbits(40, 3), self.orbits(40, 4)
+        self.assertTrue(np.array_equal(cost_matrix(satellites, slots, 1, chunk_size=100, workers=2), cost_matrix(satellites, slots, 1, workers=1)))
+
+    def test_view(self):
+        body = {"satellites": self.orbits(20, 5), "slots": self.orbits(20, 6), "optimization": 1}
+        response = self.client.post(reverse("submit_constellation"), body, content_type="application/json")
+        self.assertEqual(sorted(response.json()["slots"]), list(range(20)))
+        self.assertEqual(len(response.json()["maneuvers"]), 20)
+        body["slots"] = body["slots"][:-1]
+        self.assertEqual(self.client.post(reverse("submit_constellation"), body, content_type="application/json").status_code, 400)
+
+    def test_out_of_range_orbits(self):
+        for orbit in [{"axis": 0, "ecc": 0.2, "arg": 0}, {"axis": 15000, "ecc": 1, "arg": 0}, {"axis": 15000, "ecc": 1.5, "arg": 0}]:
+            body = {"satellites": self.orbits(3, 7), "slots": self.orbits(2, 8) + [orbit], "optimization": 1}
+            response = self.client.post(reverse("submit_constellation"), body, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            with self.assertRaises(ValueError):
+                plan_constellation(body["slots"], body["satellites"], 1, workers=1)
+
+
+class TestSearch(SimpleTestCase):
+    start_orbit = {"axis": 15168, "ecc": 0.569, "arg": 39}
+    end_orbit = {"axis": 9660, "ecc": 0.226, "arg": 137}
+
+    def test_never_worse_than_strategies(self):
+        for start_axis, start_ecc, start_arg, end_axis, end_ecc, end_arg, optimization in random_maneuver_inputs(200, seed=3):
+            start_orbit = {"axis": start_axis, "ecc": start_ecc, "arg": start_arg}
+            end_orbit = {"axis": end_axis, "ecc": end_ecc, "arg": end_arg}
+            expected = process_maneuver_data(dict(start_orbit), dict(end_orbit), optimization)
+            result = process_maneuver_search(start_orbit, end_orbit, optimization)
+            strat_id = result["strat_id"]
+            chosen = (result["total_delta_v_list"][strat_id], result["total_delta_t_list"][strat_id])
+            best = (expected["total_delta_v_list"][expected["strat_id"]], expected["total_delta_t_list"][expected["strat_id"]])
+            if optimization:
+                self.assertLessEqual(chosen, best)
+            else:
+                self.assertLessEqual(chosen[::-1], best[::-1])
+            self.assertEqual(len(result["burns"]), len(result["orbits"]) - 1)
+
+    def test_target_anomaly_and_arrival_time(self):
+        earliest = process_maneuver_search(self.start_orbit, self.end_orbit, 1, 0, 90)
+        self.assertEqual(earliest["strat_id"], 8)
+        arrival_time = earliest["search"]["arrival_time"] + 20000
+        result = process_maneuver_search(self.start_orbit, self.end_orbit, 1, 0, 90, arrival_time)
+        self.assertAlmostEqual(result["search"]["arrival_time"], arrival_time, delta=TIME_TOLERANCE)
+        self.assertEqual(len(result["burns"]), len(result["orbits"]) - 1)
+        self.assertEqual(result["orbits"][-1]["axis"], self.end_orbit["axis"])
+
+        with self.assertRaises(ValueError):
+            process_maneuver_search(self.start_orbit, self.end_orbit, 1, 0, 90, 100)
+
+    def test_view(self):
+        form = dict(TestEphemeris.maneuver_form, **{"maneuver-anomaly-2-value": "90"})
+        response = self.client.post(reverse("submit_maneuver_search"), form)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["total_delta_v_list"]), 9)
+
+        response = self.client.post(reverse("submit_maneuver_search"), dict(form, **{"arrival-time-value": "100"}))
+        self.assertEqual(response.status_code, 400)
+
+    def test_form_fields(self):
+        # the maneuver form of the page has the optional fields of the search
+        content = self.client.get(reverse("home")).content.decode()
+        for name in ["maneuver-anomaly-1-value", "maneuver-anomaly-2-value", "arrival-time-value"]:
+            self.assertIn(f'name="{name}"', content)
+
+
+class TestLoadTest(LiveServerTestCase):
+    def test_request_mix(self):
+        requests = request_mix(200, seed=1)
+        self.assertEqual(requests, request_mix(200, seed=1))
+        self.assertNotEqual(requests, request_mix(200, seed=2))
+        self.assertEqual({kind for kind, *_ in request_mix(50, mix={"orbit-data": 1})}, {"orbit-data"})
+        # half of the requests are for the popular inputs
+        paths = [path for _, method, path, _ in requests if method == "GET"]
+        self.assertLess(len(set(paths)), len(paths))
+
+    def test_run_load(self):
+        requests = request_mix(60, seed=3)
+        result = run_load(self.live_server_url, requests, concurrency=4)
+        self.assertEqual(result["requests"], 60)
+        self.assertEqual(result["statuses"], {"200": 60})
+        self.assertEqual(result["error_rate"], 0)
+        self.assertEqual(sum(sum(histogram["counts"]) for histogram in result["histograms"].values()), 60)
+
+        results = run_load_tests([("live", self.live_server_url)], [1, 2], requests, warmup=20)
+        self.assertEqual([(run["concurrency"], run["requests"]) for run in results], [(1, 20), (2, 20)])
+        self.assertIn("Best: live at concurrency", tuning_report(results, slo_ms=10000))
+        self.assertIn("No run kept its p99 under 0 ms", tuning_report(results, slo_ms=0))
+
+        result = run_load(self.live_server_url + "/missing", requests[:5], concurrency=2)
+        self.assertEqual(result["error_rate"], 1)
+
+        report = tuning_report(results)
+        for kind in {kind for kind, *_ in requests[20:]}:
+            self.assertIn(f"| live | 1 | {kind} |", report)
+
+    @skipUnless(find_spec("gunicorn") and find_spec("uvicorn"), "needs gunicorn and uvicorn")
+    def test_local_servers(self):
+        # the sync views under the gunicorn worker classes, the async ones under uvicorn
+        servers = [parse_server(spec) for spec in ["sync:1", "gthread:1:2", "uvicorn:1"]]
+        results = run_load_tests(servers, [2], request_mix(40, seed=4), warmup=0)
+        self.assertEqual([run["target"] for run in results], ["sync:1", "gthread:1:2", "uvicorn:1"])
+        for run in results:
+            self.assertEqual(run["statuses"], {"200": 40})
+
+    def test_parse_server(self):
+        self.assertEqual(parse_server("gthread:2:8"), {"name": "gthread:2:8", "kind": "gthread", "workers": 2, "threads": 8})
+        self.assertEqual(parse_server("uvicorn:3")["workers"], 3)
+        for spec in ["sync", "sync:2:4", "eventlet:2", "uvicorn:two"]:
+            with self.assertRaises(ValueError):
+                parse_server(spec)
@@ -0,0 +1,57 @@
+import math
+from .ephemeris import mean_motion, orbit_state, true_anomaly
+
+# Timeline of a maneuver, generated lazily in order of simulated time so that a maneuver is never fully in memory,
+# however many revolutions it takes. Same motion as core/ephemeris.py and the canvas simulation, the states are
+# computed with the ephemeris functions CHUNK_SAMPLES at a time. The events are dicts with a type and a time t (s):
+# orbit: the satellite enters the orbit orbit_id (the orbit is the one of process_maneuver_data)
+# burn: the burn delta_v (m/s) at the end of the orbit orbit_id
+# state: position (km) and velocity (m/s) from the center of the earth and true anomaly, every step seconds
+# end: last event, end_orbit_duration seconds (one period by default) after the arrival in the end orbit
+# At a burn time the burn comes first, then the next orbit and then the state, which is already in the next orbit
+
+CHUNK_SAMPLES = 256
+
+
+def orbit_states(orbit: dict, times: list, start_time: float):
+    n = mean_motion(orbit["axis"])
+    mean_anomalies = [orbit.get("start_arg", 0) + float(n) * (t - start_time) for t in times]
+    positions, velocities, E = orbit_state(orbit["axis"], orbit["ecc"], orbit["arg"], mean_anomalies)
+    return zip(positions.tolist(), velocities.tolist(), true_anomaly(E, orbit["ecc"]).tolist())
+
+
+def timeline_end_time(processed_data: dict, end_orbit_duration: float = None) -> float:
+    # time of the end event
+    orbits = processed_data["orbits"]
+    n = mean_motion([orbit["axis"] for orbit in orbits]).tolist()
+    end_time = sum((orbit["end_arg"] - orbit["start_arg"])/n[orbit_id] for orbit_id, orbit in enumerate(orbits[:-1]))
+    return end_time + (2 * math.pi/n[-1] if end_orbit_duration is None else end_orbit_duration)
+
+
+def maneuver_timeline(processed_data: dict, step: float = 60, end_orbit_duration: float = None):
+    # processed_data is the output of process_maneuver_data, the states are sampled at the multiples of step
+    orbits, burns = processed_data["orbits"], processed_data["burns"]
+    sample = 0
+    start_time = 0.0
+    for orbit_id, orbit in enumerate(orbits):
+        n = float(mean_motion(orbit["axis"]))
+        last = orbit_id == len(orbits) - 1
+        if not last:
+            end_time = start_time + (orbit["end_arg"] - orbit["start_arg"])/n
+        else:
+            end_time = start_time + (2 * math.pi/n if end_orbit_duration is None else end_orbit_duration)
+        yield {"type": "orbit", "t": start_time, "orbit_id": orbit_id, "orbit": orbit}
+
+        # the last orbit includes its end time
+        while sample * step < end_time or (last and sample * step <= end_time):
+            times = []
+            while len(times) < CHUNK_SAMPLES and (sample * step < end_time or (last and sample * step <= end_time)):
+                times.append(sample * step)
+                sample += 1
+            for t, (position, velocity, theta) in zip(times, orbit_states(orbit, times, start_time)):
+                yield {"type": "state", "t": t, "orbit_id": orbit_id, "position": position, "velocity": velocity, "true_anomaly": theta}
+
+        if not last:
+            yield {"type": "burn", "t": end_time, "orbit_id": orbit_id, "delta_v": burns[orbit_id]}
+        start_time = end_time
+    yield {"type": "end", "t": start_time}
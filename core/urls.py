@@ -1,8 +1,39 @@
-from django.urls import path
-from .views import home, submit_orbit_form, submit_maneuver_form
-
-urlpatterns = [
-    path('', home, name='home'),
-    path('submit-orbit-form/', submit_orbit_form, name='submit_orbit_form'),
-    path('submit-maneuver-form/', submit_maneuver_form, name='submit_maneuver_form')
-]
+from django.urls import path, clear_url_caches
+from .views import home, submit_orbit_form, submit_maneuver_form, submit_maneuver_batch, submit_ephemeris_form, metrics
+from .views import submit_constellation
+from .views import submit_maneuver_search, submit_maneuver_pareto, orbit_data, maneuver_data, maneuver_timeline_stream
+from .views import submit_orbit_form_async, submit_maneuver_form_async, orbit_data_async, maneuver_data_async, maneuver_timeline_stream_async
+from .views import submit_maneuver_batch_async, submit_maneuver_pareto_async, submit_maneuver_search_async, submit_ephemeris_form_async
+from .views import submit_constellation_async
+
+# async versions of the views, used by the ASGI application once it has started the process pool, see use_async_views
+ASYNC_VIEWS = {submit_orbit_form: submit_orbit_form_async, submit_maneuver_form: submit_maneuver_form_async,
+               orbit_data: orbit_data_async, maneuver_data: maneuver_data_async, maneuver_timeline_stream: maneuver_timeline_stream_async,
+               submit_maneuver_batch: submit_maneuver_batch_async, submit_maneuver_pareto: submit_maneuver_pareto_async,
+               submit_maneuver_search: submit_maneuver_search_async, submit_ephemeris_form: submit_ephemeris_form_async,
+               submit_constellation: submit_constellation_async}
+
+def url_patterns(asynchronous: bool = False) -> list:
+    view = (lambda view: ASYNC_VIEWS.get(view, view)) if asynchronous else (lambda view: view)
+    return [
+        path('', home, name='home'),
+        path('submit-orbit-form/', view(submit_orbit_form), name='submit_orbit_form'),
+        path('submit-maneuver-form/', view(submit_maneuver_form), name='submit_maneuver_form'),
+        path('orbit-data/', view(orbit_data), name='orbit_data'),
+        path('maneuver-data/', view(maneuver_data), name='maneuver_data'),
+        path('maneuver-timeline/', view(maneuver_timeline_stream), name='maneuver_timeline'),
+        path('submit-maneuver-pareto/', view(submit_maneuver_pareto), name='submit_maneuver_pareto'),
+        path('submit-maneuver-search/', view(submit_maneuver_search), name='submit_maneuver_search'),
+        path('submit-maneuver-batch/', view(submit_maneuver_batch), name='submit_maneuver_batch'),
+        path('submit-ephemeris-form/', view(submit_ephemeris_form), name='submit_ephemeris_form'),
+        path('submit-constellation/', view(submit_constellation), name='submit_constellation'),
+        path('metrics/', metrics, name='metrics')
+    ]
+
+urlpatterns = url_patterns()
+
+def use_async_views():
+    # called by orbital_maneuver_simulator/asgi.py after starting the process pool, whether or not the URLconf was
+    # already loaded
+    urlpatterns[:] = url_patterns(asynchronous=True)
+    clear_url_caches()
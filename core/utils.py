@@ -1,16 +1,41 @@
 import math
-import numpy as np
+from typing import NamedTuple, Optional
 
 G = 6.67430e-11
 EARTH_MASS = 5.972e24
+MU = G * EARTH_MASS
 
 def normalize_angle(angle):
     return angle % (2 * math.pi)
 
+# version of the results of the planner, to be increased by every change that changes the results of
+# process_maneuver_data: the results stored by core/store.py, in the shared cache and in the tables of core/table.py
+# with another version are ignored
+PLANNER_VERSION = 1
+
 # to make up for small precision errors when adding and subtracting angles
 def standardize_angle(angle):
     return round(angle * (10 ** 15))/(10 ** 15) 
 
+# Tolerances of every comparison of the planner (and of core/batch.py, which has the same comparisons on arrays)
+# two apsides are the same if they differ by at most APSIS_ABS_TOL km or APSIS_REL_TOL of the largest one, an orbit is
+# a circle if its apsides are the same and two angles are the same if they differ by at most ANGLE_TOL modulo 2 pi
+# so the branches taken by a strategy don't change with the precision errors of the inputs or of the computations
+APSIS_ABS_TOL = 0.5 # km
+APSIS_REL_TOL = 1e-9
+ANGLE_TOL = 1e-6 # rad, less than 0.2 km along the largest orbits
+
+def same_apsis(r1, r2):
+    return math.isclose(r1, r2, rel_tol=APSIS_REL_TOL, abs_tol=APSIS_ABS_TOL)
+
+def same_angle(angle1, angle2):
+    delta = normalize_angle(angle1 - angle2)
+    return delta <= ANGLE_TOL or delta >= 2 * math.pi - ANGLE_TOL
+
+def nonzero_arg(angle):
+    # you don't want the end arg of an orbit to be 0 since it would skip the orbit entirely
+    return 2 * math.pi if same_angle(angle, 0) else angle
+
 def ellipse_bounding_box(a, e, theta):
 
     #semi minor axis
@@ -25,23 +50,22 @@ def ellipse_bounding_box(a, e, theta):
 
     # finding min, max values of x, y of the ellipse using derivatives of parametric equations
     # this is done to perfectly fit the elliptical orbit in the simulation
+    # only scalars here, so math is used instead of numpy which has a big overhead on every call with python floats
 
     # parametric equations of ellipse
+    # x(t) = a * cos(theta) * cos(t) - b * sin(theta) * sin(t)
+    # y(t) = a * sin(theta) * cos(t) + b * cos(theta) * sin(t)
     # t represents eccentric anomaly technically here since an ellipse function is just a compressed/stretched circle function
-    def x(t):
-        return a * np.cos(theta) * np.cos(t) - b * np.sin(theta) * np.sin(t)
-    def y(t):
-        return a * np.sin(theta) * np.cos(t) + b * np.cos(theta) * np.sin(t)
-    
-    # function that returns the roots (t) of the derivatives of the parametric equations
-    def dx_dt_0(k: int):
-        return np.arctan(-b * np.tan(theta)/a) + k * np.pi
-    def dy_dt_0(k: int):
-        return np.arctan((b * np.cos(theta))/(a * np.sin(theta))) + k * np.pi
-    
-    x_dx_0 = [x(dx_dt_0(0)), x(dx_dt_0(1))]
-    y_dy_0 = [y(dy_dt_0(0)), y(dy_dt_0(1))]
-    
+    cos_theta = math.cos(theta)
+    sin_theta = math.sin(theta)
+
+    # roots (t) of the derivatives of the parametric equations are t_x + k * pi and t_y + k * pi
+    t_x = math.atan(-b * math.tan(theta)/a)
+    t_y = math.atan((b * cos_theta)/(a * sin_theta))
+
+    x_dx_0 = [a * cos_theta * math.cos(t) - b * sin_theta * math.sin(t) for t in (t_x, t_x + math.pi)]
+    y_dy_0 = [a * sin_theta * math.cos(t) + b * cos_theta * math.sin(t) for t in (t_y, t_y + math.pi)]
+
     return [abs(x_dx_0[0] - x_dx_0[1]), abs(y_dy_0[0] - y_dy_0[1])]
 
 def max_length_earth_pos(orbits):
@@ -50,13 +74,13 @@ def max_length_earth_pos(orbits):
     y_bottom = []
     y_top = []
     for orbit in orbits: 
-        bounding_box = ellipse_bounding_box(orbit["axis"], orbit["ecc"], orbit["arg"])
-        semi_minor_axis =  orbit["axis"] * math.sqrt(1 - (orbit["ecc"] ** 2))
-        focal_distance = math.sqrt(orbit["axis"] ** 2 - semi_minor_axis ** 2)
+        bounding_box = ellipse_bounding_box(orbit.axis, orbit.ecc, orbit.arg)
+        semi_minor_axis =  orbit.axis * math.sqrt(1 - (orbit.ecc ** 2))
+        focal_distance = math.sqrt(orbit.axis ** 2 - semi_minor_axis ** 2)
 
         # we can use the focal distance because the center of the ellipse is centered in the bounding box
-        focal_distance_x = math.cos(orbit["arg"]) * focal_distance
-        focal_distance_y = math.sin(orbit["arg"]) * focal_distance
+        focal_distance_x = math.cos(orbit.arg) * focal_distance
+        focal_distance_y = math.sin(orbit.arg) * focal_distance
         x_left.append(bounding_box[0]/2 + focal_distance_x)
         x_right.append(bounding_box[0]/2 - focal_distance_x)
         y_bottom.append(bounding_box[1]/2 + focal_distance_y)
@@ -86,330 +110,294 @@ def process_orbit_data(semi_major_axis: int, ecc: float, arg: int) -> dict:
 
     return {"max_length": max_length}
 
-def process_maneuver_data(start_orbit: dict, end_orbit: dict, optimization) -> dict:
-    # conversion to right primitives
-    start_orbit["axis"] = int(start_orbit["axis"])
-    start_orbit["ecc"] = float(start_orbit["ecc"])
-    start_orbit["arg"] = math.radians(int(start_orbit["arg"]))
-
-    end_orbit["axis"] = int(end_orbit["axis"])
-    end_orbit["ecc"] = float(end_orbit["ecc"])
-    end_orbit["arg"] = math.radians(int(end_orbit["arg"]))
-
-    optimization = int(optimization) # 1 is to save fuel, 0 is to save time
-
-    def periapsis(orbit):
-        return orbit["axis"] * (1 - orbit["ecc"])
-
-    def apoapsis(orbit):
-        return orbit["axis"] * (1 + orbit["ecc"])
-
-    def eccentricity(periapsis, apoapsis):
-        return (apoapsis - periapsis)/(apoapsis + periapsis)
-    
-    def axis(periapsis, apoapsis):
-        return (periapsis + apoapsis)/2
-    
-    def isEqual(orbit1, orbit2):
-        return orbit1["axis"] == orbit2["axis"] and orbit1["ecc"] == orbit2["ecc"] and standardize_angle(orbit1["arg"]) == standardize_angle(orbit2["arg"])
-    
-    def velocity(r, semi_major_axis): # m/s
-        return math.sqrt(G * EARTH_MASS * (2/(r * 1000) - 1/(semi_major_axis * 1000)))
-    
-    def compute_total_delta_t(orbits):
+def velocity(r, semi_major_axis): # m/s
+    return math.sqrt(MU * (2/(r * 1000) - 1/(semi_major_axis * 1000)))
+
+def ecc_from_apsides(periapsis, apoapsis):
+    return (apoapsis - periapsis)/(apoapsis + periapsis)
+
+def axis_from_apsides(periapsis, apoapsis):
+    return (periapsis + apoapsis)/2
+
+class Orbit(NamedTuple):
+    # immutable orbit of the planner, axis and apsides in km, arg (argument of periapsis), start_arg and end_arg in radians
+    # apsides, velocities at the apsides (m/s) and seconds per radian of mean anomaly are computed once, by create()
+    axis: float
+    ecc: float
+    arg: float
+    start_arg: float
+    end_arg: Optional[float] # None for the end orbit
+    periapsis: float
+    apoapsis: float
+    v_periapsis: float
+    v_apoapsis: float
+    seconds_per_radian: float
+
+    @classmethod
+    def create(cls, axis, ecc, arg, start_arg=0, end_arg=None):
+        # same formulas as velocity(), inlined since this is called for every orbit of every strategy
+        periapsis = axis * (1 - ecc)
+        apoapsis = axis * (1 + ecc)
+        v_periapsis = math.sqrt(MU * (2/(periapsis * 1000) - 1/(axis * 1000)))
+        v_apoapsis = v_periapsis if ecc == 0 else math.sqrt(MU * (2/(apoapsis * 1000) - 1/(axis * 1000)))
+        return cls(axis, ecc, arg, start_arg, end_arg, periapsis, apoapsis, v_periapsis, v_apoapsis,
+                   math.sqrt(((axis * 1000) ** 3)/MU))
+
+    @classmethod
+    def from_dict(cls, orbit: dict):
+        return cls.create(orbit["axis"], orbit["ecc"], orbit["arg"], orbit.get("start_arg", 0), orbit.get("end_arg"))
+
+    @property
+    def period(self): # s
+        return 2 * math.pi * self.seconds_per_radian
+
+    def with_end_arg(self, end_arg):
+        # fix in case normalize_angle makes end_arg be smaller than start_arg
+        if (end_arg < self.start_arg):
+            end_arg = end_arg + 2 * math.pi
+        return Orbit(self.axis, self.ecc, self.arg, self.start_arg, end_arg, *self[5:])
+
+    def with_start_arg(self, start_arg):
+        return Orbit(self.axis, self.ecc, self.arg, start_arg, *self[4:])
+
+    @property
+    def is_circle(self) -> bool:
+        return same_apsis(self.periapsis, self.apoapsis)
+
+    def to_dict(self) -> dict:
+        orbit = {"axis": self.axis, "ecc": self.ecc, "arg": self.arg, "start_arg": self.start_arg}
+        if self.end_arg is not None:
+            orbit["end_arg"] = self.end_arg
+        return orbit
+
+class Maneuver(NamedTuple):
+    # orbits of a strategy, from the start orbit to the end orbit, and the burns (m/s) between them
+    orbits: tuple
+    burns: tuple
+    total_delta_v: int
+    total_delta_t: int
+
+    @classmethod
+    def create(cls, orbits, burns):
         total_delta_t = 0
         for orbit in orbits[1:-1]: # time in transfer orbits only
-            angle_in_orbit = orbit["end_arg"] - orbit["start_arg"]
-            total_delta_t += angle_in_orbit * math.sqrt(((orbit["axis"] * 1000) ** 3)/(G * EARTH_MASS))
-        return round(total_delta_t)
-    
-    # fix in case normalize_angle makes end_arg be smaller than start_arg
-    def fixEndArg(orbit):
-        if (orbit['end_arg'] < orbit['start_arg']):
-            orbit['end_arg'] = orbit['end_arg'] + 2 * math.pi
-
-    # No end_arg can be equal to 0 since it will skip the orbit entirely so it has to be 2 * math.pi
-    # 8 Strategies. Choose the one that gives you the smallest total delta v or smallest total delta t
-    # Strategy 1: Start with apoapsis := apoapsis
-    # Strategy 2: Start with periapsis := apoapsis
-    # Strategy 3: Start with periapsis := periapsis
-    # Strategy 4: Start with apoapsis := periapsis
-    # Strategy 5: Start by circularizing the orbit at the current periapsis; Strategy 1 (1 or 2 yields the same result since orbits[-1] will be circular)
-    # Strategy 6: Start by circularizing the orbit at the current apoapsis; Strategy 1
-    # Strategy 7: Start by circularizing the orbit at the current periapsis; Strategy 3 (3 or 4 yields the same result)
-    # Strategy 8: Start by circularizing the orbit at the current apoapsis; Strategy 3
-
-
-    strat_outputs = []
-
-    for strat in range(8):
-        orbits = [start_orbit.copy()]
-        orbits[0]["start_arg"] = 0
-        burns = []
-
-        # STEP 0
-        if (orbits[-1]['ecc'] != 0 and end_orbit['ecc'] != 0 and (strat in [4, 5, 6, 7])):
-            if (strat == 4 or strat == 6):
-                step0 = {
-                    "apsis": periapsis(orbits[-1]),
-                    "end_arg": 2 * math.pi,
-                    "arg_offset": 0
-                }
-            elif (strat == 5 or strat == 7):
-                step0 = {
-                    "apsis": apoapsis(orbits[-1]),
-                    "end_arg": math.pi,
-                    "arg_offset": math.pi
-                }
-
-            newOrbit = {
-                "axis": step0['apsis'],
-                "ecc": 0,
-                "arg": normalize_angle(orbits[-1]['arg'] + step0['arg_offset']),
-                "start_arg" : 0
-            }
-            orbits[-1]['end_arg'] = step0['end_arg']
-
-            v1 = velocity(step0["apsis"], orbits[-1]["axis"])
-            v2 = velocity(step0["apsis"], newOrbit["axis"])
-
-            burns.append(round((v2-v1)))
-            orbits.append(newOrbit)
-    
-            if (isEqual(orbits[-1], end_orbit)):
-                total_delta_v = sum(map(abs, burns))
-                total_delta_t = compute_total_delta_t(orbits)
-                strat_outputs.append({'orbits':orbits, 'burns': burns, 'total_delta_v': total_delta_v, 'total_delta_t': total_delta_t})
-                continue
-                
-
-        # STEP 1
-        if (((strat in [0 ,4, 5]) and (round(apoapsis(orbits[-1])) != round(apoapsis(end_orbit)))) or 
-            (strat == 1 and (round(periapsis(orbits[-1])) != round(apoapsis(end_orbit)))) or
-            ((strat in [2, 6, 7]) and (round(periapsis(orbits[-1])) != round(periapsis(end_orbit)))) or 
-            (strat == 3 and (round(apoapsis(orbits[-1])) != round(periapsis(end_orbit))))):
-        
-            # Reach end_orbit's apoapsis
-            if (((strat in [0 ,4, 5]) and (round(apoapsis(orbits[-1])) != round(apoapsis(end_orbit)))) or (strat == 1 and round((periapsis(orbits[-1])) != round(apoapsis(end_orbit))))):
-                newOrbit = {}
-
-                # if orbits[-1] is a circle, then do the rotation of the orbit and the same time of this burn, same for strat 1 and 2
-                if (round(periapsis(orbits[-1])) == round(apoapsis(orbits[-1]))):
-                    tempArg = normalize_angle(end_orbit["arg"] - orbits[-1]['arg'])
-                    orbits[-1]["end_arg"] = tempArg if tempArg != 0 else 2 * math.pi # you don't want the end arg of an orbit to be 0 
-                    if (periapsis(orbits[-1]) < apoapsis(end_orbit)): # newOrbit can't be a circle, that's why not <=
-                        newOrbit["arg"] = end_orbit["arg"]
-                    else: # newOrbit's periapsis and apoapsis switch sides
-                        newOrbit["arg"] = normalize_angle(end_orbit["arg"] + math.pi)
-                
-                # STRATEGY 1: apoapsis := apoapsis
-                if ((strat in [0 ,4, 5]) and (round(apoapsis(orbits[-1])) != round(apoapsis(end_orbit)))):
-                    newOrbit["axis"] = axis(periapsis(orbits[-1]), apoapsis(end_orbit)) 
-
-                    if (round(periapsis(orbits[-1])) != round(apoapsis(orbits[-1]))):
-                        orbits[-1]["end_arg"] = 2 * math.pi
-                        if (periapsis(orbits[-1]) <= apoapsis(end_orbit)): # newOrbit is a circle or newOrbit's periapsis and apoapsis stay on the same sides
-                            newOrbit["arg"] = orbits[-1]["arg"]
-                        else: # newOrbit's periapsis and apoapsis switch sides
-                            newOrbit["arg"] = normalize_angle(orbits[-1]["arg"] + math.pi)
-
-                    if (periapsis(orbits[-1]) <= apoapsis(end_orbit)):
-                        newOrbit["ecc"] = eccentricity(periapsis(orbits[-1]), apoapsis(end_orbit))
-                        newOrbit["start_arg"] = 0
-                    else:
-                        newOrbit["ecc"] = eccentricity(apoapsis(end_orbit), periapsis(orbits[-1]))
-                        newOrbit["start_arg"] = math.pi
-
-                    v1 = velocity(periapsis(orbits[-1]), orbits[-1]["axis"])
-                    v2 = velocity(periapsis(orbits[-1]), newOrbit["axis"])
-                
-                # STRATEGY 2: periapsis := apoapsis
-                elif (strat == 1 and (round(periapsis(orbits[-1])) != round(apoapsis(end_orbit)))):
-                    newOrbit["axis"] = axis(apoapsis(orbits[-1]), apoapsis(end_orbit)) 
-                    
-                    if (round(periapsis(orbits[-1])) != round(apoapsis(orbits[-1]))):
-                        orbits[-1]["end_arg"] = math.pi
-                        if (apoapsis(orbits[-1]) <= apoapsis(end_orbit)): 
-                            newOrbit["arg"] = normalize_angle(orbits[-1]["arg"] + math.pi) 
-                        else: 
-                            newOrbit["arg"] = orbits[-1]["arg"]
-
-                    if (apoapsis(orbits[-1]) <= apoapsis(end_orbit)):
-                        newOrbit["ecc"] = eccentricity(apoapsis(orbits[-1]), apoapsis(end_orbit))
-                        newOrbit["start_arg"] = 0
-                    else:
-                        newOrbit["ecc"] = eccentricity(apoapsis(end_orbit), apoapsis(orbits[-1]))
-                        newOrbit["start_arg"] = math.pi
-
-                    v1 = velocity(apoapsis(orbits[-1]), orbits[-1]["axis"])
-                    v2 = velocity(apoapsis(orbits[-1]), newOrbit["axis"])
-            
-            # Reach end_orbit's periapsis
-            elif (((strat in [2, 6, 7]) and (round(periapsis(orbits[-1])) != round(periapsis(end_orbit)))) or (strat == 3 and (round(apoapsis(orbits[-1])) != round(periapsis(end_orbit))))):
-                newOrbit = {}
-
-                if (round(periapsis(orbits[-1])) == round(apoapsis(orbits[-1]))):
-                    tempArg = normalize_angle(end_orbit["arg"] - orbits[-1]['arg'] + math.pi)
-                    orbits[-1]["end_arg"] = tempArg if tempArg != 0 else 2 * math.pi 
-                    if (apoapsis(orbits[-1]) < periapsis(end_orbit)): # newOrbit can't be a circle, that's why not <=
-                        newOrbit["arg"] = normalize_angle(end_orbit["arg"] + math.pi)
-                    else: 
-                        newOrbit["arg"] = end_orbit["arg"]
-
-                # STRATEGY 3: periapsis := periapsis
-                if ((strat in [2, 6, 7]) and (round(periapsis(orbits[-1])) != round(periapsis(end_orbit)))): 
-                    newOrbit["axis"] = axis(apoapsis(orbits[-1]), periapsis(end_orbit))
-                    
-                    if (round(periapsis(orbits[-1])) != round(apoapsis(orbits[-1]))):
-                        orbits[-1]["end_arg"] = math.pi
-                        if (apoapsis(orbits[-1]) <= periapsis(end_orbit)):
-                            newOrbit["arg"] = normalize_angle(orbits[-1]["arg"] + math.pi)
-                        else: 
-                            newOrbit["arg"] = orbits[-1]["arg"]
-
-                    if (apoapsis(orbits[-1]) <= periapsis(end_orbit)):
-                        newOrbit["ecc"] = eccentricity(apoapsis(orbits[-1]), periapsis(end_orbit))
-                        newOrbit["start_arg"] = 0
-                    else:
-                        newOrbit["ecc"] = eccentricity(periapsis(end_orbit), apoapsis(orbits[-1]))
-                        newOrbit["start_arg"] = math.pi
-
-                    v1 = velocity(apoapsis(orbits[-1]), orbits[-1]["axis"])
-                    v2 = velocity(apoapsis(orbits[-1]), newOrbit["axis"])
-                
-                # STRATEGY 4: apoapsis := periapsis
-                elif (strat == 3 and (round(apoapsis(orbits[-1])) != round(periapsis(end_orbit)))):
-                    newOrbit["axis"] = axis(periapsis(orbits[-1]), periapsis(end_orbit))
-                    
-                    if (round(periapsis(orbits[-1])) != round(apoapsis(orbits[-1]))):
-                        orbits[-1]["end_arg"] = 2 * math.pi
-                        if (periapsis(orbits[-1]) <= periapsis(end_orbit)): 
-                            newOrbit["arg"] = orbits[-1]["arg"]
-                        else: 
-                            newOrbit["arg"] = normalize_angle(orbits[-1]["arg"] + math.pi) 
-
-                    if (periapsis(orbits[-1]) <= periapsis(end_orbit)):
-                        newOrbit["ecc"] = eccentricity(periapsis(orbits[-1]), periapsis(end_orbit))
-                        newOrbit["start_arg"] = 0
-                    else:
-                        newOrbit["ecc"] = eccentricity(periapsis(end_orbit), periapsis(orbits[-1]))
-                        newOrbit["start_arg"] = math.pi
-                    
-                    v1 = velocity(periapsis(orbits[-1]), orbits[-1]["axis"])
-                    v2 = velocity(periapsis(orbits[-1]), newOrbit["axis"])
-
-            burns.append(round((v2-v1)))
-            fixEndArg(orbits[-1])
-            orbits.append(newOrbit)
-    
-            if (isEqual(orbits[-1], end_orbit)):
-                total_delta_v = sum(map(abs, burns))
-                total_delta_t = compute_total_delta_t(orbits)
-                strat_outputs.append({'orbits':orbits, 'burns': burns, 'total_delta_v': total_delta_v, 'total_delta_t': total_delta_t})
-                continue
-
-        # STEP 2: Make the orbit circular if you need to change arg later
-        # if end_orbit is a circle, you should skip this step since it will not give the correct start and end arg, unlike STEP 3 
-        if (strat in [0, 1, 4, 5]):
-            step2 = {
-                "correct_apsis": apoapsis(end_orbit),
-                "angle_offset_1": math.pi,
-                "angle_offset_2": 0
-            }
-        elif (strat in [2, 3, 6, 7]):
-            step2 = {
-                "correct_apsis": periapsis(end_orbit),
-                "angle_offset_1": 0,
-                "angle_offset_2": math.pi
-            }
-
-        if (strat in [0, 1, 2, 3] and
-            not (round(periapsis(orbits[-1])) == round(step2["correct_apsis"]) and standardize_angle(normalize_angle(orbits[-1]["arg"] + step2["angle_offset_1"])) == standardize_angle(normalize_angle(end_orbit["arg"]))) and 
-            not (round(apoapsis(orbits[-1])) == round(step2["correct_apsis"]) and standardize_angle(normalize_angle(orbits[-1]["arg"] + step2["angle_offset_2"])) == standardize_angle(normalize_angle(end_orbit["arg"]))) and 
-            orbits[-1]["ecc"] != 0 and end_orbit["ecc"] != 0):
-
-            newOrbit = {}
-            newOrbit["ecc"] = 0
-            newOrbit["axis"] = step2["correct_apsis"]
-            newOrbit["start_arg"] = 0
-            if (abs(apoapsis(orbits[-1]) - newOrbit["axis"]) < abs(periapsis(orbits[-1]) - newOrbit["axis"])): # check where new circular orbit intersects orbits[-1]
-                orbits[-1]["end_arg"] = math.pi
-                newOrbit["arg"] = normalize_angle(orbits[-1]["arg"] + math.pi)
-            
-            else:
-                orbits[-1]["end_arg"] = 2 * math.pi
-                newOrbit["arg"] = orbits[-1]["arg"]
-
-            v1 = velocity(newOrbit["axis"], orbits[-1]["axis"])
-            v2 = velocity(newOrbit["axis"], newOrbit["axis"]) # same r and axis because circular orbit
-            
-            burns.append(round((v2-v1)))
-            fixEndArg(orbits[-1])
-            orbits.append(newOrbit)
-            # It is impossible that orbits[-1] is equal to end_orbit, so no need for isEqual check
-
-
-        # STEP 3: Reach end_orbit's remaining correct apsis
-        if (strat in [0, 1, 4, 5]):
-            step3 = {
-                "correct_apsis": apoapsis(end_orbit),
-                "start_arg": math.pi
-            }
-        elif (strat in [2, 3, 6, 7]):
-            step3 = {
-                "correct_apsis": periapsis(end_orbit),
-                "start_arg": 0
-            }
-
-        newOrbit = end_orbit.copy()
-
-        if (orbits[-1]["ecc"] == 0):
-            tempArg = normalize_angle(end_orbit['arg'] - orbits[-1]['arg'] + step3["start_arg"])
-            orbits[-1]["end_arg"] = tempArg if tempArg != 0 else 2 * math.pi
-            newOrbit["start_arg"] = step3["start_arg"]
+            total_delta_t += (orbit.end_arg - orbit.start_arg) * orbit.seconds_per_radian
+        return cls(tuple(orbits), tuple(burns), sum(map(abs, burns)), round(total_delta_t))
+
+def is_equal(orbit1, orbit2):
+    # the arg of a circle doesn't matter
+    return (same_apsis(orbit1.periapsis, orbit2.periapsis) and same_apsis(orbit1.apoapsis, orbit2.apoapsis) and
+            (orbit1.is_circle or same_angle(orbit1.arg, orbit2.arg)))
+
+# No end_arg can be equal to 0 since it will skip the orbit entirely so it has to be 2 * math.pi
+# 8 Strategies. Choose the one that gives you the smallest total delta v or smallest total delta t
+# Strategy 1: Start with apoapsis := apoapsis
+# Strategy 2: Start with periapsis := apoapsis
+# Strategy 3: Start with periapsis := periapsis
+# Strategy 4: Start with apoapsis := periapsis
+# Strategy 5: Start by circularizing the orbit at the current periapsis; Strategy 1 (1 or 2 yields the same result since orbits[-1] will be circular)
+# Strategy 6: Start by circularizing the orbit at the current apoapsis; Strategy 1
+# Strategy 7: Start by circularizing the orbit at the current periapsis; Strategy 3 (3 or 4 yields the same result)
+# Strategy 8: Start by circularizing the orbit at the current apoapsis; Strategy 3
+
+def plan_strategy(strat: int, start_orbit: Orbit, end_orbit: Orbit) -> Maneuver:
+    orbits = [start_orbit]
+    burns = []
+
+    # STEP 0
+    if (not start_orbit.is_circle and not end_orbit.is_circle and (strat in [4, 5, 6, 7])):
+        if (strat == 4 or strat == 6):
+            apsis, end_arg, arg_offset, v1 = start_orbit.periapsis, 2 * math.pi, 0, start_orbit.v_periapsis
         else:
-            if (abs(apoapsis(orbits[-1]) - step3["correct_apsis"]) < abs(periapsis(orbits[-1]) - step3["correct_apsis"])): 
-            # apoapsis of orbits[-1] is equal to end_orbit apoapsis; this comparison is done instead of an equality check because of precision errors
-                orbits[-1]["end_arg"] = math.pi
-                if (end_orbit["ecc"] != 0): 
-                    newOrbit["start_arg"] = step3["start_arg"]
-                else: 
-                    newOrbit["start_arg"] = normalize_angle(orbits[-1]['arg'] - end_orbit['arg'] + math.pi)
-            else: # periapsis of orbits[-1] is equal to end_orbit apoapsis
-                orbits[-1]["end_arg"] = 2 * math.pi
-                if (end_orbit["ecc"] != 0): 
-                    newOrbit["start_arg"] = step3["start_arg"]
-                else: 
-                    newOrbit["start_arg"] = normalize_angle(orbits[-1]['arg'] - end_orbit['arg'])
-
-
-        v1 = velocity(step3["correct_apsis"], orbits[-1]["axis"])
-        v2 = velocity(step3["correct_apsis"], end_orbit["axis"])
-        
-        burns.append(round((v2-v1)))
-        fixEndArg(orbits[-1])
+            apsis, end_arg, arg_offset, v1 = start_orbit.apoapsis, math.pi, math.pi, start_orbit.v_apoapsis
+
+        newOrbit = Orbit.create(apsis, 0, normalize_angle(start_orbit.arg + arg_offset))
+        orbits[-1] = start_orbit.with_end_arg(end_arg)
+        burns.append(round(velocity(apsis, newOrbit.axis) - v1))
         orbits.append(newOrbit)
+        # a circular orbit can't be equal to end_orbit since end_orbit isn't circular
+
+    # STEP 1
+    # Strategies 1 and 4 burn at the periapsis of orbits[-1], Strategies 2 and 3 at its apoapsis
+    # Strategies 1 and 2 reach end_orbit's apoapsis, Strategies 3 and 4 reach its periapsis
+    # the step is skipped if the other apsis of orbits[-1] is already at the apsis to reach
+    current = orbits[-1]
+    reach_apoapsis = strat in [0, 1, 4, 5]
+    burn_at_periapsis = strat in [0, 3, 4, 5]
+    if burn_at_periapsis:
+        r, other_apsis, v1 = current.periapsis, current.apoapsis, current.v_periapsis
+    else:
+        r, other_apsis, v1 = current.apoapsis, current.periapsis, current.v_apoapsis
+    target = end_orbit.apoapsis if reach_apoapsis else end_orbit.periapsis
+
+    if (not same_apsis(other_apsis, target)):
+        # if orbits[-1] is a circle, then do the rotation of the orbit at the same time of this burn
+        if (current.is_circle):
+            if reach_apoapsis:
+                tempArg = normalize_angle(end_orbit.arg - current.arg)
+                if (current.periapsis < end_orbit.apoapsis): # newOrbit can't be a circle, that's why not <=
+                    arg = end_orbit.arg
+                else: # newOrbit's periapsis and apoapsis switch sides
+                    arg = normalize_angle(end_orbit.arg + math.pi)
+            else:
+                tempArg = normalize_angle(end_orbit.arg - current.arg + math.pi)
+                if (current.apoapsis < end_orbit.periapsis):
+                    arg = normalize_angle(end_orbit.arg + math.pi)
+                else:
+                    arg = end_orbit.arg
+            end_arg = nonzero_arg(tempArg)
+        elif burn_at_periapsis:
+            end_arg = 2 * math.pi
+            if (r <= target or same_apsis(r, target)): # newOrbit is a circle or newOrbit's periapsis and apoapsis stay on the same sides
+                arg = current.arg
+            else: # newOrbit's periapsis and apoapsis switch sides
+                arg = normalize_angle(current.arg + math.pi)
+        else:
+            end_arg = math.pi
+            if (r <= target or same_apsis(r, target)):
+                arg = normalize_angle(current.arg + math.pi)
+            else:
+                arg = current.arg
 
-        total_delta_v = sum(map(abs, burns))
-        total_delta_t = compute_total_delta_t(orbits)
-        strat_outputs.append({'orbits':orbits, 'burns': burns, 'total_delta_v': total_delta_v, 'total_delta_t': total_delta_t})
+        if (r <= target or same_apsis(r, target)):
+            newOrbit = Orbit.create(axis_from_apsides(r, target), ecc_from_apsides(r, target), arg, 0)
+        else:
+            newOrbit = Orbit.create(axis_from_apsides(target, r), ecc_from_apsides(target, r), arg, math.pi)
 
+        burns.append(round(velocity(r, newOrbit.axis) - v1))
+        orbits[-1] = current.with_end_arg(end_arg)
+        orbits.append(newOrbit)
 
-    # first and second criterion for sorting when finding min
-    sortingKeys = ['total_delta_v', 'total_delta_t'] if optimization else ['total_delta_t', 'total_delta_v']
+        if (is_equal(newOrbit, end_orbit)):
+            return Maneuver.create(orbits, burns)
 
-    optFunction = lambda x : (x[1][sortingKeys[0]], x[1][sortingKeys[1]], len(x[1]["orbits"]))
-    strat_id, best_strat = min(enumerate(strat_outputs), key = optFunction)
-    total_delta_v_list = [output['total_delta_v'] for output in strat_outputs]
-    total_delta_t_list = [output['total_delta_t'] for output in strat_outputs]
+    # STEP 2: Make the orbit circular if you need to change arg later
+    # if end_orbit is a circle, you should skip this step since it will not give the correct start and end arg, unlike STEP 3
+    current = orbits[-1]
+    if reach_apoapsis:
+        correct_apsis, angle_offset_1, angle_offset_2 = end_orbit.apoapsis, math.pi, 0
+    else:
+        correct_apsis, angle_offset_1, angle_offset_2 = end_orbit.periapsis, 0, math.pi
 
+    if (strat in [0, 1, 2, 3] and
+        not (same_apsis(current.periapsis, correct_apsis) and same_angle(current.arg + angle_offset_1, end_orbit.arg)) and
+        not (same_apsis(current.apoapsis, correct_apsis) and same_angle(current.arg + angle_offset_2, end_orbit.arg)) and
+        not current.is_circle and not end_orbit.is_circle):
 
-    # test strategies
-    # test_id = 5
-    # strat_id, best_strat = test_id, strat_outputs[test_id]
+        if (abs(current.apoapsis - correct_apsis) < abs(current.periapsis - correct_apsis)): # check where new circular orbit intersects orbits[-1]
+            end_arg, arg = math.pi, normalize_angle(current.arg + math.pi)
+        else:
+            end_arg, arg = 2 * math.pi, current.arg
+        newOrbit = Orbit.create(correct_apsis, 0, arg)
 
+        burns.append(round(newOrbit.v_periapsis - velocity(correct_apsis, current.axis))) # newOrbit is circular
+        orbits[-1] = current.with_end_arg(end_arg)
+        orbits.append(newOrbit)
+        # It is impossible that orbits[-1] is equal to end_orbit, so no need for is_equal check
+
+    # STEP 3: Reach end_orbit's remaining correct apsis
+    current = orbits[-1]
+    step3_start_arg = math.pi if reach_apoapsis else 0
+
+    if (current.is_circle):
+        end_arg = nonzero_arg(normalize_angle(end_orbit.arg - current.arg + step3_start_arg))
+        start_arg = step3_start_arg
+    elif (abs(current.apoapsis - correct_apsis) < abs(current.periapsis - correct_apsis)):
+        # apoapsis of orbits[-1] is equal to end_orbit apoapsis; this comparison is done instead of an equality check because of precision errors
+        end_arg = math.pi
+        start_arg = step3_start_arg if not end_orbit.is_circle else normalize_angle(current.arg - end_orbit.arg + math.pi)
+    else: # periapsis of orbits[-1] is equal to end_orbit apoapsis
+        end_arg = 2 * math.pi
+        start_arg = step3_start_arg if not end_orbit.is_circle else normalize_angle(current.arg - end_orbit.arg)
+
+    burns.append(round(velocity(correct_apsis, end_orbit.axis) - velocity(correct_apsis, current.axis)))
+    orbits[-1] = current.with_end_arg(end_arg)
+    orbits.append(end_orbit.with_start_arg(start_arg))
+    return Maneuver.create(orbits, burns)
+
+STRATEGY_COUNT = 8
+
+def plan_maneuvers(start_orbit: Orbit, end_orbit: Orbit) -> list:
+    # the 8 strategies, in order
+    return [plan_strategy(strat, start_orbit, end_orbit) for strat in range(STRATEGY_COUNT)]
+
+def best_strategy(maneuvers: list, optimization) -> int:
+    # first and second criterion for sorting when finding min
+    if optimization: # save fuel
+        optFunction = lambda strat: (maneuvers[strat].total_delta_v, maneuvers[strat].total_delta_t, len(maneuvers[strat].orbits))
+    else: # save time
+        optFunction = lambda strat: (maneuvers[strat].total_delta_t, maneuvers[strat].total_delta_v, len(maneuvers[strat].orbits))
+    return min(range(len(maneuvers)), key = optFunction)
+
+def valid_orbit(axis, ecc) -> bool:
+    # orbits the planner can compute: a positive axis and an ellipse, False for nan and infinities
+    return math.isfinite(axis) and axis > 0 and 0 <= ecc < 1
+
+def input_orbit(orbit: dict) -> Orbit:
+    # conversion to right primitives, arg is in degrees, raises ValueError when the orbit can't be computed
+    axis, ecc = int(orbit["axis"]), float(orbit["ecc"])
+    if not valid_orbit(axis, ecc):
+        raise ValueError("invalid orbit")
+    return Orbit.create(axis, ecc, math.radians(int(orbit["arg"])))
 
-    max_length, earth_pos = max_length_earth_pos(best_strat['orbits']).values()
-    return {"orbits": best_strat['orbits'], "burns": best_strat['burns'], "max_length": max_length, 
-            "earth_pos": earth_pos, "total_delta_v_list": total_delta_v_list, 
-            "total_delta_t_list": total_delta_t_list, "strat_id": strat_id}
\ No newline at end of file
+def process_maneuver_data(start_orbit: dict, end_orbit: dict, optimization) -> dict:
+    optimization = int(optimization) # 1 is to save fuel, 0 is to save time
+    start_orbit, end_orbit = input_orbit(start_orbit), input_orbit(end_orbit)
+    if instrumentation is not None:
+        maneuvers, strat_id, max_length, earth_pos = instrumentation.plan(start_orbit, end_orbit, optimization)
+    else:
+        maneuvers = plan_maneuvers(start_orbit, end_orbit)
+        strat_id = best_strategy(maneuvers, optimization)
+
+        # test strategies
+        # strat_id = 5
+
+        max_length, earth_pos = max_length_earth_pos(maneuvers[strat_id].orbits).values()
+    best_strat = maneuvers[strat_id]
+    return {"orbits": [orbit.to_dict() for orbit in best_strat.orbits], "burns": list(best_strat.burns), "max_length": max_length,
+            "earth_pos": earth_pos, "total_delta_v_list": [maneuver.total_delta_v for maneuver in maneuvers],
+            "total_delta_t_list": [maneuver.total_delta_t for maneuver in maneuvers], "strat_id": strat_id}
+
+def pareto_front(maneuvers: list) -> list:
+    # ids of the maneuvers that no other maneuver beats on both total delta-v and total delta-t, by increasing delta-v
+    # maneuvers with the same totals are kept once, with the same tie breaking as best_strategy
+    front = []
+    for strat in sorted(range(len(maneuvers)), key = lambda strat: (maneuvers[strat].total_delta_v,
+                        maneuvers[strat].total_delta_t, len(maneuvers[strat].orbits))):
+        if not front or maneuvers[strat].total_delta_t < maneuvers[front[-1]].total_delta_t:
+            front.append(strat)
+    return front
+
+def process_maneuver_pareto(start_orbit: dict, end_orbit: dict) -> dict:
+    # every strategy is planned once for both optimization criteria, the candidates are the Pareto front of
+    # process_maneuver_data's strategies, with one distance scale and earth position for all of their orbits
+    start_orbit, end_orbit = input_orbit(start_orbit), input_orbit(end_orbit)
+    maneuvers = plan_maneuvers(start_orbit, end_orbit)
+    front = pareto_front(maneuvers)
+    max_length, earth_pos = max_length_earth_pos([orbit for strat in front for orbit in maneuvers[strat].orbits]).values()
+    return {"candidates": [{"strat_id": strat, "orbits": [orbit.to_dict() for orbit in maneuvers[strat].orbits],
+                            "burns": list(maneuvers[strat].burns), "total_delta_v": maneuvers[strat].total_delta_v,
+                            "total_delta_t": maneuvers[strat].total_delta_t} for strat in front],
+            "max_length": max_length, "earth_pos": earth_pos,
+            "total_delta_v_list": [maneuver.total_delta_v for maneuver in maneuvers],
+            "total_delta_t_list": [maneuver.total_delta_t for maneuver in maneuvers],
+            "fuel_strat_id": best_strategy(maneuvers, 1), "time_strat_id": best_strategy(maneuvers, 0)}
+
+# optional PlannerMetrics (see core/metrics.py), installed when the app starts if PLANNER_METRICS or PLANNER_TIMING is set
+instrumentation = None
+
+# precomputed ManeuverTable (see core/table.py), loaded when the app starts if MANEUVER_TABLE_PATH is set
+maneuver_table = None
+
+def table_maneuver_data(start_orbit: dict, end_orbit: dict, optimization):
+    # None when there is no table or when the inputs are not on its grid
+    if maneuver_table is None:
+        return None
+    return maneuver_table.lookup(start_orbit, end_orbit, optimization)
+
+def lookup_maneuver_data(start_orbit: dict, end_orbit: dict, optimization) -> dict:
+    # O(1) when the inputs are on the grid of the precomputed table, otherwise the maneuver is computed
+    processed_data = table_maneuver_data(start_orbit, end_orbit, optimization)
+    if processed_data is not None:
+        return processed_data
+    return process_maneuver_data(start_orbit, end_orbit, optimization)
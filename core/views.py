@@ -1,26 +1,36 @@
+import hashlib
+import json
+import asyncio
+import math
+import time
+from itertools import islice
+from urllib.parse import urlencode
+from django.conf import settings
 from django.shortcuts import render, HttpResponse
-from django.views.decorators.http import require_POST
-from django.http import JsonResponse
-from .utils import process_orbit_data, process_maneuver_data
+from django.views.decorators.http import require_POST, require_GET
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponsePermanentRedirect
+from .cache import cached_process_orbit_data, cached_process_maneuver_data, acached_process_orbit_data, acached_process_maneuver_data
+from .cache import cached_process_maneuver_search, cached_process_maneuver_pareto, acached_process_maneuver_search, acached_process_maneuver_pareto
+from .pool import PoolFull, compute_pool
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import patch_vary_headers, patch_cache_control, get_conditional_response
+from django.utils.http import quote_etag
+from .packing import PACKED_CONTENT_TYPE, pack_arrays, maneuver_arrays, accepts_packed
+from .metrics import server_timing, render_metrics
+from .utils import valid_orbit
 
 # Create your views here.
 
 def home(request):
     return render(request, 'index.html')
 
-@require_POST
-@csrf_exempt
-def submit_orbit_form(request):
+def orbit_form_inputs(request):
     axis = request.POST.get('orbit-axis-value')
     ecc = request.POST.get('orbit-ecc-value')
     arg = request.POST.get('orbit-arg-value')
-    processed_data = process_orbit_data(axis, ecc, arg)
-    return JsonResponse(processed_data)
+    return axis, ecc, arg
 
-@require_POST
-@csrf_exempt
-def submit_maneuver_form(request):
+def maneuver_form_inputs(request):
     startAxis = request.POST.get('maneuver-axis-1-value')
     startEcc = request.POST.get('maneuver-ecc-1-value')
     startArg = request.POST.get('maneuver-arg-1-value')
@@ -28,7 +38,452 @@ def submit_maneuver_form(request):
     endEcc = request.POST.get('maneuver-ecc-2-value')
     endArg = request.POST.get('maneuver-arg-2-value')
     optimization = request.POST.get('optimization-toggle')
-    processed_data = process_maneuver_data({"axis": startAxis, "ecc": startEcc, "arg": startArg}, {"axis": endAxis, "ecc": endEcc, "arg": endArg}, optimization)
-    return JsonResponse(processed_data)
+    return {"axis": startAxis, "ecc": startEcc, "arg": startArg}, {"axis": endAxis, "ecc": endEcc, "arg": endArg}, optimization
+
+@require_POST
+@csrf_exempt
+def submit_orbit_form(request):
+    processed_data = cached_process_orbit_data(*orbit_form_inputs(request))
+    return negotiated_response(request, processed_data, lambda: processed_data)
+
+@require_POST
+@csrf_exempt
+@server_timing
+def submit_maneuver_form(request):
+    processed_data = cached_process_maneuver_data(*maneuver_form_inputs(request))
+    return negotiated_response(request, processed_data, lambda: maneuver_arrays(processed_data))
+
+@require_POST
+@csrf_exempt
+def submit_maneuver_pareto(request):
+    # same fields as the maneuver form, the optimization toggle is ignored
+    # returns every strategy that is not worse than another one on both total delta-v and total delta-t
+    start_orbit, end_orbit, _ = maneuver_form_inputs(request)
+    return JsonResponse(cached_process_maneuver_pareto(start_orbit, end_orbit))
+
+@require_POST
+@csrf_exempt
+def submit_maneuver_search(request):
+    # same fields as the maneuver form, plus the optional initial and target true anomalies (deg) and arrival time (s)
+    # searches the burn sequences of core/search.py instead of only comparing the 8 strategies
+    constraints = [request.POST.get(name) for name in ('maneuver-anomaly-1-value', 'maneuver-anomaly-2-value', 'arrival-time-value')]
+    try:
+        processed_data = cached_process_maneuver_search(*maneuver_form_inputs(request), *constraints)
+    except ValueError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    return negotiated_response(request, processed_data, lambda: maneuver_arrays(processed_data))
+
+# GET versions of the form views, their responses only depend on the query so they can be cached by nginx
+# (see nginx/default.conf) and by the browsers. Any other spelling of the query (order of the parameters, extra
+# parameters, 0.50 instead of 0.5...) is redirected to the canonical query so that each result has a single URL
+# RESULT_MAX_AGE: lifetime of the responses in the caches in seconds (default 1 year)
+
+ORBIT_QUERY = [("axis", int), ("ecc", float), ("arg", int)]
+MANEUVER_QUERY = [("start_axis", int), ("start_ecc", float), ("start_arg", int), ("end_axis", int), ("end_ecc", float),
+                  ("end_arg", int), ("optimization", int)]
+
+def canonical_number(value) -> str:
+    # same as String() of the number in javascript for the values of the forms, e.g. 0 and 0.5
+    return str(value).removesuffix(".0")
+
+def canonical_query(request, fields):
+    # raises KeyError or ValueError when a parameter is missing or invalid
+    values = [convert(request.GET[name]) for name, convert in fields]
+    if not all(map(math.isfinite, values)):
+        raise ValueError()
+    return values, urlencode([(name, canonical_number(value)) for (name, _), value in zip(fields, values)])
+
+def orbit_query(request):
+    # raises KeyError or ValueError, also when the orbit can't be computed
+    values, query = canonical_query(request, ORBIT_QUERY)
+    if not valid_orbit(*values[:2]):
+        raise ValueError()
+    return values, query
+
+def maneuver_query(request):
+    values, query = canonical_query(request, MANEUVER_QUERY)
+    if not (valid_orbit(*values[0:2]) and valid_orbit(*values[3:5])) or values[6] not in (0, 1):
+        raise ValueError()
+    return values, query
+
+def query_error(fields):
+    return JsonResponse({"error": "expected the query parameters " + ", ".join(name for name, _ in fields) +
+                         " with axis > 0 and 0 <= ecc < 1"}, status=400)
+
+def redirect_response(request, query, fields):
+    # error for an invalid query, redirect for another spelling of the canonical query, None for the canonical query
+    if query is None:
+        return query_error(fields)
+    if request.META.get('QUERY_STRING') != query:
+        return cached_response(request, HttpResponsePermanentRedirect(request.path + "?" + query))
+    return None
+
+def cached_response(request, response):
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'RESULT_MAX_AGE', 365 * 24 * 3600), immutable=True)
+    return get_conditional_response(request, etag=response.get('ETag'), response=response)
+
+def tagged_response(request, response):
+    # strong ETag of the exact bytes of the response (JSON and packed responses have different ones)
+    response['ETag'] = quote_etag(hashlib.sha256(response.content).hexdigest()[:32])
+    return cached_response(request, response)
+
+def cacheable_response(request, query, fields, get_response):
+    return redirect_response(request, query, fields) or tagged_response(request, get_response())
+
+async def acacheable_response(request, query, fields, get_response):
+    return redirect_response(request, query, fields) or tagged_response(request, await get_response())
+
+@require_GET
+def orbit_data(request):
+    try:
+        values, query = orbit_query(request)
+    except (KeyError, ValueError):
+        values = query = None
+
+    def get_response():
+        processed_data = cached_process_orbit_data(*values)
+        return negotiated_response(request, processed_data, lambda: processed_data)
+
+    return cacheable_response(request, query, ORBIT_QUERY, get_response)
+
+@require_GET
+def maneuver_data(request):
+    try:
+        values, query = maneuver_query(request)
+    except (KeyError, ValueError):
+        values = query = None
+
+    def get_response():
+        start_orbit = {"axis": values[0], "ecc": values[1], "arg": values[2]}
+        end_orbit = {"axis": values[3], "ecc": values[4], "arg": values[5]}
+        processed_data = cached_process_maneuver_data(start_orbit, end_orbit, values[6])
+        return negotiated_response(request, processed_data, lambda: maneuver_arrays(processed_data))
+
+    return cacheable_response(request, query, MANEUVER_QUERY, get_response)
+
+# Server-Sent Events stream of the timeline of a maneuver (see core/timeline.py), one event per timeline event
+# same query parameters as maneuver_data, plus the optional step (s) between the states (default 60) and time_scale,
+# the simulated seconds per second (default TIMELINE_TIME_SCALE or 3600, 1 h/s like the simulation), 0 sends the
+# events as fast as possible. The stream ends with the end event, that's when the clients should close the EventSource
+# The sync view holds a worker while it waits, so it speeds up the time scale to end the stream within
+# TIMELINE_MAX_DURATION seconds (default 20, under gunicorn's 30 s timeout), the async view has no limit
+
+def timeline_inputs(request):
+    # raises KeyError or ValueError when a parameter is missing or invalid
+    values, _ = maneuver_query(request)
+    step = max(float(request.GET.get('step', 60)), 1)
+    time_scale = float(request.GET.get('time_scale', getattr(settings, 'TIMELINE_TIME_SCALE', 3600)))
+    if not (math.isfinite(step) and math.isfinite(time_scale) and time_scale >= 0):
+        raise ValueError()
+    start_orbit = {"axis": values[0], "ecc": values[1], "arg": values[2]}
+    end_orbit = {"axis": values[3], "ecc": values[4], "arg": values[5]}
+    return (start_orbit, end_orbit, values[6]), step, time_scale
+
+def server_sent_event(event_id: int, event: dict) -> str:
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # let nginx send the events as they are generated
+    return response
+
+def timeline_input_error():
+    return JsonResponse({"error": "expected the query parameters " + ", ".join(name for name, _ in MANEUVER_QUERY) +
+                         " with axis > 0 and 0 <= ecc < 1, and optionally step and time_scale"}, status=400)
+
+@require_GET
+def maneuver_timeline_stream(request):
+    # each event waits until its simulated time, this view holds a sync worker for the whole stream
+    try:
+        inputs, step, time_scale = timeline_inputs(request)
+    except (KeyError, ValueError):
+        return timeline_input_error()
+    processed_data = cached_process_maneuver_data(*inputs)
+    from .timeline import maneuver_timeline, timeline_end_time # imports numpy, see the comment in submit_maneuver_batch
+    if time_scale:
+        time_scale = max(time_scale, timeline_end_time(processed_data)/getattr(settings, 'TIMELINE_MAX_DURATION', 20))
+
+    def events():
+        start = time.monotonic()
+        for event_id, event in enumerate(maneuver_timeline(processed_data, step)):
+            if time_scale:
+                delay = event["t"]/time_scale - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield server_sent_event(event_id, event)
+
+    return event_stream_response(events())
+
+# Async versions of the form and GET views, used when running under ASGI (see core/urls.py)
+# the maneuvers are computed by the process pool of core/pool.py, the response is 503 when too many are pending
+
+def pool_full_response():
+    response = JsonResponse({"error": "too many pending requests"}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+@require_POST
+@csrf_exempt
+async def submit_orbit_form_async(request):
+    processed_data = await acached_process_orbit_data(*orbit_form_inputs(request))
+    return negotiated_response(request, processed_data, lambda: processed_data)
+
+@require_POST
+@csrf_exempt
+@server_timing
+async def submit_maneuver_form_async(request):
+    try:
+        processed_data = await acached_process_maneuver_data(*maneuver_form_inputs(request))
+    except PoolFull:
+        return pool_full_response()
+    return negotiated_response(request, processed_data, lambda: maneuver_arrays(processed_data))
+
+@require_GET
+async def orbit_data_async(request):
+    try:
+        values, query = orbit_query(request)
+    except (KeyError, ValueError):
+        values = query = None
+
+    async def get_response():
+        processed_data = await acached_process_orbit_data(*values)
+        return negotiated_response(request, processed_data, lambda: processed_data)
+
+    return await acacheable_response(request, query, ORBIT_QUERY, get_response)
+
+@require_GET
+async def maneuver_data_async(request):
+    try:
+        values, query = maneuver_query(request)
+    except (KeyError, ValueError):
+        values = query = None
+
+    async def get_response():
+        start_orbit = {"axis": values[0], "ecc": values[1], "arg": values[2]}
+        end_orbit = {"axis": values[3], "ecc": values[4], "arg": values[5]}
+        processed_data = await acached_process_maneuver_data(start_orbit, end_orbit, values[6])
+        return negotiated_response(request, processed_data, lambda: maneuver_arrays(processed_data))
+
+    try:
+        return await acacheable_response(request, query, MANEUVER_QUERY, get_response)
+    except PoolFull:
+        return pool_full_response() # not cached
+
+@require_GET
+async def maneuver_timeline_stream_async(request):
+    # the event loop waits between the events instead of a thread
+    try:
+        inputs, step, time_scale = timeline_inputs(request)
+    except (KeyError, ValueError):
+        return timeline_input_error()
+    try:
+        processed_data = await acached_process_maneuver_data(*inputs)
+    except PoolFull:
+        return pool_full_response()
+    from .timeline import maneuver_timeline # imports numpy, see the comment in submit_maneuver_batch
+
+    async def events():
+        start = time.monotonic()
+        for event_id, event in enumerate(maneuver_timeline(processed_data, step)):
+            if time_scale:
+                delay = event["t"]/time_scale - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield server_sent_event(event_id, event)
+
+    return event_stream_response(events())
+
+@require_POST
+@csrf_exempt
+async def submit_maneuver_batch_async(request):
+    # the chunks of the batch are computed by the process pool one after the other while the results are sent
+    # the first chunk is computed before the response starts so that a full pool answers 503, the next ones wait
+    from .batch import STREAM_CHUNK_SIZE, process_maneuver_chunk # imports numpy, see the comment in submit_maneuver_batch
+    try:
+        maneuvers = iter(batch_requests(request))
+    except ValueError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    pareto = request.GET.get('pareto') == '1'
+    chunk = list(islice(maneuvers, STREAM_CHUNK_SIZE))
+    try:
+        results = await compute_pool.run(process_maneuver_chunk, chunk, pareto) if chunk else []
+    except PoolFull:
+        return pool_full_response()
+
+    async def lines(results):
+        index = 0
+        while results:
+            yield "".join(json.dumps(result) + "\n" for result in results)
+            index += len(results)
+            chunk = list(islice(maneuvers, STREAM_CHUNK_SIZE))
+            results = await compute_pool.run_queued(process_maneuver_chunk, chunk, pareto, index) if chunk else []
+
+    return batch_response(lines(results))
+
+@require_POST
+@csrf_exempt
+async def submit_maneuver_pareto_async(request):
+    start_orbit, end_orbit, _ = maneuver_form_inputs(request)
+    try:
+        return JsonResponse(await acached_process_maneuver_pareto(start_orbit, end_orbit))
+    except PoolFull:
+        return pool_full_response()
+
+@require_POST
+@csrf_exempt
+async def submit_maneuver_search_async(request):
+    constraints = [request.POST.get(name) for name in ('maneuver-anomaly-1-value', 'maneuver-anomaly-2-value', 'arrival-time-value')]
+    try:
+        processed_data = await acached_process_maneuver_search(*maneuver_form_inputs(request), *constraints)
+    except ValueError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    except PoolFull:
+        return pool_full_response()
+    return negotiated_response(request, processed_data, lambda: maneuver_arrays(processed_data))
+
+@require_POST
+@csrf_exempt
+@server_timing
+async def submit_ephemeris_form_async(request):
+    # the maneuver and then its ephemeris are computed by the process pool
+    from .ephemeris import maneuver_ephemeris # imports numpy, see the comment in submit_maneuver_batch
+    try:
+        step = ephemeris_step(request)
+        processed_data = await acached_process_maneuver_data(*maneuver_form_inputs(request))
+        ephemeris = await compute_pool.run(maneuver_ephemeris, processed_data["orbits"], step, None, None,
+                                           getattr(settings, 'EPHEMERIS_MAX_SAMPLES', 100000))
+    except (TypeError, ValueError):
+        return ephemeris_input_error()
+    except PoolFull:
+        return pool_full_response()
+    return ephemeris_response(request, processed_data, ephemeris)
+
+@require_POST
+@csrf_exempt
+async def submit_constellation_async(request):
+    # the whole plan is computed in a process of the pool, which starts CONSTELLATION_WORKERS processes for the costs
+    from .constellation import plan_constellation # imports numpy, see the comment in submit_maneuver_batch
+    try:
+        body = json.loads(request.body)
+        satellites, slots = body["satellites"], body["slots"]
+        if len(satellites) > getattr(settings, 'CONSTELLATION_MAX_SIZE', 5000):
+            return JsonResponse({"error": "too many satellites"}, status=400)
+        result = await compute_pool.run(plan_constellation, satellites, slots, body.get("optimization", 1),
+                                        getattr(settings, 'CONSTELLATION_WORKERS', None))
+    except (ValueError, KeyError, TypeError):
+        return constellation_input_error()
+    except PoolFull:
+        return pool_full_response()
+    return JsonResponse(result)
+
+@require_POST
+@csrf_exempt
+@server_timing
+def submit_ephemeris_form(request):
+    # same fields as the maneuver form, plus the time between samples in seconds
+    # EPHEMERIS_MAX_SAMPLES: max number of samples, the step is increased to stay under it (default 100000)
+    from .ephemeris import maneuver_ephemeris # imports numpy, see the comment in submit_maneuver_batch
+    try:
+        step = ephemeris_step(request)
+        processed_data = cached_process_maneuver_data(*maneuver_form_inputs(request))
+    except (TypeError, ValueError):
+        return ephemeris_input_error()
+    ephemeris = maneuver_ephemeris(processed_data["orbits"], step, max_samples=getattr(settings, 'EPHEMERIS_MAX_SAMPLES', 100000))
+    return ephemeris_response(request, processed_data, ephemeris)
+
+def ephemeris_step(request) -> float:
+    # raises ValueError when the step is invalid
+    step = max(float(request.POST.get('ephemeris-step', 60)), 1)
+    if not math.isfinite(step):
+        raise ValueError()
+    return step
+
+def ephemeris_input_error():
+    return JsonResponse({"error": "expected the fields of the maneuver form and a number of seconds ephemeris-step"}, status=400)
+
+def ephemeris_response(request, processed_data, ephemeris):
+    def ephemeris_arrays():
+        # the ephemeris arrays are packed as they are, without converting them to python floats
+        arrays = maneuver_arrays(processed_data)
+        arrays.update({"ephemeris_" + key: value for key, value in ephemeris.items()})
+        return arrays
+
+    if not accepts_packed(request):
+        processed_data["ephemeris"] = {key: value.tolist() for key, value in ephemeris.items()}
+    return negotiated_response(request, processed_data, ephemeris_arrays)
+
+def negotiated_response(request, processed_data, get_arrays):
+    # JSON by default, packed arrays (see core/packing.py) if the client asks for them
+    if accepts_packed(request):
+        response = HttpResponse(pack_arrays(get_arrays()), content_type=PACKED_CONTENT_TYPE)
+    else:
+        response = JsonResponse(processed_data)
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+def parse_ndjson_lines(lines):
+    for line in lines:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None # reported as an invalid maneuver request in the results
+
+def batch_requests(request):
+    # body is either a JSON array of maneuver requests or NDJSON (one maneuver request per line)
+    # NDJSON is read line by line so that the body is never fully loaded in memory, raises ValueError for invalid bodies
+    if request.content_type == 'application/x-ndjson':
+        return parse_ndjson_lines(request)
+    try:
+        maneuvers = json.loads(request.body)
+    except ValueError:
+        raise ValueError("invalid JSON")
+    if not isinstance(maneuvers, list):
+        raise ValueError("expected a JSON array of maneuver requests")
+    return maneuvers
+
+def batch_response(lines):
+    response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    response['X-Accel-Buffering'] = 'no' # let nginx send the results as they are computed
+    return response
+
+@require_POST
+@csrf_exempt
+def submit_maneuver_batch(request):
+    # with ?pareto=1 the results are the Pareto fronts of the maneuvers and the optimization can be omitted
+    # numpy is only imported by the first request that needs it, so that the workers start faster and the form
+    # endpoints only use the standard library
+    from .batch import process_maneuver_stream
+    try:
+        maneuvers = batch_requests(request)
+    except ValueError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    return batch_response(json.dumps(result) + "\n" for result in process_maneuver_stream(maneuvers, pareto=request.GET.get('pareto') == '1'))
+
+@require_POST
+@csrf_exempt
+def submit_constellation(request):
+    # body is a JSON object with the satellites and the slots (lists of {"axis", "ecc", "arg"} of the same length) and
+    # the optimization, returns the slot of each satellite and its maneuver, see core/constellation.py
+    # CONSTELLATION_MAX_SIZE: max number of satellites (default 5000)
+    # CONSTELLATION_WORKERS: number of processes computing the costs (default os.cpu_count())
+    from .constellation import plan_constellation # imports numpy, see the comment in submit_maneuver_batch
+    try:
+        body = json.loads(request.body)
+        satellites, slots = body["satellites"], body["slots"]
+        if len(satellites) > getattr(settings, 'CONSTELLATION_MAX_SIZE', 5000):
+            return JsonResponse({"error": "too many satellites"}, status=400)
+        result = plan_constellation(satellites, slots, body.get("optimization", 1), getattr(settings, 'CONSTELLATION_WORKERS', None))
+    except (ValueError, KeyError, TypeError):
+        return constellation_input_error()
+    return JsonResponse(result)
 
+def constellation_input_error():
+    return JsonResponse({"error": "expected a JSON object with lists of as many satellites and slots "
+                         "({\"axis\", \"ecc\", \"arg\"}) and the optimization"}, status=400)
 
+@require_GET
+def metrics(request):
+    # Prometheus text format, see core/metrics.py
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -3,4 +3,5 @@
 python manage.py migrate --no-input
 python manage.py collectstatic --no-input
 
-gunicorn orbital_maneuver_simulator.wsgi:application --bind 0.0.0.0:8000
+# one event loop, every view that computes maneuvers is async and uses the process pool (COMPUTE_POOL_WORKERS processes)
+uvicorn orbital_maneuver_simulator.asgi:application --host 0.0.0.0 --port 8000
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orbital_maneuver_simulator.settings')
 
 application = get_asgi_application()
+
+# starts and warms up the process pool of the async views before the first request (see core/pool.py), then serves
+# the form and GET views with their async versions
+from core.pool import compute_pool
+from core.urls import use_async_views
+compute_pool.start()
+use_async_views()